@@ -1,4 +1,5 @@
 import os
+import sys
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
@@ -8,7 +9,15 @@ from kivy.uix.popup import Popup
 from kivy.clock import Clock
 from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.textinput import TextInput
-from kivy.network.urlrequest import UrlRequest
+
+try:
+    from settings_store import get_settings
+except ImportError:
+    # Running on its own: the ZOS modules live two folders up.
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from settings_store import get_settings
+from net import check_city
+from tasks import runtime
 
 # Path to the settings file
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "settings.txt")
@@ -50,7 +59,10 @@ class FileBrowserPopup(Popup):
 
 class SettingsApp(App):
     def build(self, app_args={}):
-        self.settings = self.load_settings()
+        self.store = get_settings(SETTINGS_FILE)
+        # Only the keys edited on this screen, handed to the store on Save
+        # (None means remove), so settings changed elsewhere meanwhile stay.
+        self.edits = {}
         
         layout = BoxLayout(orientation='vertical', spacing=20, padding=40)
         layout.add_widget(Label(text="Settings", font_size='24sp'))
@@ -59,7 +71,7 @@ class SettingsApp(App):
         city_box = BoxLayout(orientation='horizontal', size_hint_y=None, height=50)
         city_box.add_widget(Label(text="Enter City for Weather:"))
         self.city_input = TextInput(
-            text=self.settings.get('city', ''),
+            text=self.store.get('city', ''),
             size_hint=(0.7, 1),
             multiline=False
         )
@@ -81,7 +93,7 @@ class SettingsApp(App):
         
         wallpaper_buttons_box = BoxLayout(orientation='horizontal', spacing=10)
         
-        self.wallpaper_path_label = Label(text=self.settings.get('custom_wallpaper_path', 'No custom wallpaper set.'), font_size='14sp', shorten=True, text_size=(Window.width * 0.3, None))
+        self.wallpaper_path_label = Label(text=self.store.get('custom_wallpaper_path', 'No custom wallpaper set.'), font_size='14sp', shorten=True, text_size=(Window.width * 0.3, None))
         wallpaper_buttons_box.add_widget(self.wallpaper_path_label)
         
         choose_btn = Button(text="Choose")
@@ -103,18 +115,6 @@ class SettingsApp(App):
 
         return layout
 
-    def load_settings(self):
-        settings = {}
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                for line in f.readlines():
-                    try:
-                        key, value = line.strip().split('=', 1)
-                        settings[key] = value
-                    except ValueError:
-                        pass
-        return settings
-
     def validate_city(self, instance):
         city = instance.text.strip()
         if not city:
@@ -128,33 +128,27 @@ class SettingsApp(App):
         
         # Replace spaces with hyphens to improve server recognition for multi-word cities
         formatted_city = city.replace(' ', '-')
-        url = f"https://wttr.in/{formatted_city}?format=j1"
-
-        UrlRequest(
-            url, 
-            on_success=self.on_city_valid, 
-            on_failure=self.on_connection_failed, 
-            on_error=self.on_city_not_found, 
-            timeout=5
-        )
+        check_city(formatted_city, runtime.ui_callback(lambda is_valid: self.on_city_checked(city, is_valid), owner=self))
 
-    def on_city_valid(self, req, result):
-        if not isinstance(result, dict) or 'current_condition' not in result:
-            self.on_city_not_found(req, result)
+    def on_city_checked(self, city, is_valid):
+        if is_valid is None:
+            self.on_connection_failed()
+        elif not is_valid:
+            self.on_city_not_found()
         else:
-            self.settings['city'] = self.city_input.text.strip()
+            self.edits['city'] = city
             self.validation_status_label.text = "City is valid! Set successfully."
             self.validation_status_label.color = (0, 1, 0, 1)
             self.city_input.focus = True
             self.city_input.text = ''
 
-    def on_connection_failed(self, req, result):
+    def on_connection_failed(self):
         self.validation_status_label.text = "Network connection failed. Try again."
         self.validation_status_label.color = (1, 0, 0, 1)
         self.city_input.focus = True
         self.city_input.text = ''
 
-    def on_city_not_found(self, req, result):
+    def on_city_not_found(self):
         self.validation_status_label.text = "City not found."
         self.validation_status_label.color = (1, 0, 0, 1)
         self.city_input.focus = True
@@ -166,17 +160,19 @@ class SettingsApp(App):
         self.city_input.focus = True
 
     def on_file_selected(self, filepath):
-        self.settings['custom_wallpaper_path'] = filepath
+        self.edits['custom_wallpaper_path'] = filepath
         self.wallpaper_path_label.text = filepath
 
     def reset_wallpaper(self, instance):
-        self.settings.pop('custom_wallpaper_path', None)
+        self.edits['custom_wallpaper_path'] = None
         self.wallpaper_path_label.text = 'No custom wallpaper set.'
 
     def save_settings(self, instance):
-        with open(SETTINGS_FILE, 'w') as f:
-            for key, value in self.settings.items():
-                f.write(f"{key}={value}\n")
+        edits, self.edits = self.edits, {}
+        self.store.update({key: value for key, value in edits.items() if value is not None})
+        for key, value in edits.items():
+            if value is None:
+                self.store.remove(key)
         
         status_label = Label(text="Settings saved!", color=(0,1,0,1))
         
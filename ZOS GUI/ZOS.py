@@ -1,14 +1,10 @@
 import os
 import sys
 import subprocess
-import threading
-import importlib.util
 import datetime
-import requests
-import tarfile
-import tempfile
-import shutil
 import hashlib
+# Imported before Kivy: it takes --profile-startup out of sys.argv.
+from startup import profiler
 from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, Screen, FadeTransition
 from kivy.uix.floatlayout import FloatLayout
@@ -17,16 +13,25 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.image import Image
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.clock import Clock
-from kivy.graphics import Color, Ellipse, Rectangle
+from kivy.graphics import Color, Rectangle
 from kivy.core.window import Window
 from kivy.core.text import LabelBase
 from kivy.animation import Animation
-from kivy.uix.widget import Widget
-from kivy.uix.textinput import TextInput
-from kivy.uix.popup import Popup
+from zpkg import CACHE_DIR, extraction_cache, find_entry_script, load_manifest
+from appindex import AppIndex
+from settings_store import get_settings
+from thumbs import thumbnail_cache
+from ticker import ticker, set_text, MINUTE
+from tracing import tracer, NULL_SPAN
+from tasks import runtime
+
+# Modules only some screens need (TextInput, Popup, the console, requests)
+# are imported where they are used, keeping them off the path to the splash.
+# So are the ones only launching apps (sessions, supervisor, zygote,
+# modcache, ...) or the weather (net) need.
+profiler.mark('imports')
 
 # ---------------- Fonts ----------------
 try:
@@ -40,9 +45,9 @@ class ImageButton(ButtonBehavior, Image):
 
 # ---------------- Splash Screen ----------------
 class SplashScreen(Screen):
-    def __init__(self, duration, next_callback, **kwargs):
+    # Stays up only until the login screen is ready; see ZOSApp.start_screens.
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.next_callback = next_callback
         layout = FloatLayout()
         
         with layout.canvas.before:
@@ -61,7 +66,6 @@ class SplashScreen(Screen):
             layout.add_widget(error_label)
         
         self.add_widget(layout)
-        Clock.schedule_once(lambda dt: self.next_callback(), duration)
 
     def _update_bg_rect(self, instance, value):
         self.bg_rect.pos = instance.pos
@@ -70,6 +74,7 @@ class SplashScreen(Screen):
 # ---------------- Login Screen ----------------
 class LoginScreen(Screen):
     def __init__(self, zos_app_instance, **kwargs):
+        from kivy.uix.textinput import TextInput
         super().__init__(**kwargs)
         self.zos_app = zos_app_instance
         self.unlock_callback = self.zos_app.login
@@ -100,8 +105,18 @@ class LoginScreen(Screen):
                                         size_hint=(1, None), height=40,
                                         background_color=(0.2, 0.2, 0.2, 1), foreground_color=(1, 1, 1, 1))
         self.password_input.bind(on_text_validate=self.check_password)
-        
+        self.set_unlock_mode()
+
+        self.swipe_start_y = None
+        self.weather_last_update = None
+        # Nothing on this screen changes faster than once a minute.
+        ticker.subscribe(self, self.update_clock, unit=MINUTE)
+        self.zos_app.settings_store.subscribe(self.on_settings_changed, keys=['city', 'password'])
+
+    def set_unlock_mode(self):
         self.use_password = 'password' in self.zos_app.settings
+        self.unlock_container.clear_widgets()
+        Animation.cancel_all(self.swipe_hint)
         
         if self.use_password:
             self.unlock_container.add_widget(self.password_input)
@@ -109,9 +124,17 @@ class LoginScreen(Screen):
             self.unlock_container.add_widget(self.swipe_hint)
             self.add_animation()
 
-        self.swipe_start_y = None
-        self.weather_last_update = None
-        Clock.schedule_interval(self.update_clock, 1)
+    def on_settings_changed(self, changes):
+        if 'password' in changes:
+            self.set_unlock_mode()
+        if 'city' in changes:
+            self.weather_last_update = datetime.datetime.now()
+            self.fetch_weather(changes['city'])
+
+    def detach(self):
+        self.zos_app.settings_store.unsubscribe(self.on_settings_changed)
+        ticker.unsubscribe(self)
+        runtime.cancel_owner(self)
 
     def on_enter(self):
         """Called when the screen becomes the current screen."""
@@ -145,29 +168,24 @@ class LoginScreen(Screen):
             self.unlock_callback()
         return super().on_touch_up(touch)
 
-    def update_clock(self, dt):
-        now = datetime.datetime.now()
-        self.time_label.text = now.strftime("%I:%M")
-        self.date_label.text = now.strftime("%A, %B %d, %Y")
+    def update_clock(self, now):
+        set_text(self.time_label, now.strftime("%I:%M"))
+        set_text(self.date_label, now.strftime("%A, %B %d, %Y"))
         
         city = self.zos_app.settings.get('city')
 
-        if self.weather_last_update is None or (datetime.datetime.now()-self.weather_last_update).total_seconds()>600:
-            self.weather_last_update = datetime.datetime.now()
-            threading.Thread(target=self.fetch_weather, args=(city,)).start()
+        if self.weather_last_update is None or (now-self.weather_last_update).total_seconds()>=600:
+            self.weather_last_update = now
+            self.fetch_weather(city)
 
     def fetch_weather(self, city=None):
-        if not city:
-            city = "Erbil"
-        
-        try:
-            weather_info = requests.get(f"https://wttr.in/{city}?format=%C+%t",timeout=3).text
-            Clock.schedule_once(lambda dt: self.update_weather_label(weather_info))
-        except Exception as e:
-            Clock.schedule_once(lambda dt: self.update_weather_label("Weather N/A"))
+        from net import get_weather
+        # Answers from the cache straight away when it can, and refreshes in
+        # the background when the cached weather is old.
+        get_weather(city, runtime.ui_callback(self.update_weather_label, owner=self))
             
     def update_weather_label(self, text):
-        self.weather_label.text = text
+        set_text(self.weather_label, text)
 
     def update_rect(self, instance, value):
         self.rect.size = instance.size
@@ -176,6 +194,7 @@ class LoginScreen(Screen):
 # ---------------- Setup Screen ----------------
 class SetupScreen(Screen):
     def __init__(self, zos_app_instance, **kwargs):
+        from kivy.uix.textinput import TextInput
         super().__init__(**kwargs)
         self.zos_app = zos_app_instance
         
@@ -204,20 +223,13 @@ class SetupScreen(Screen):
         self.add_widget(layout)
 
     def check_city(self, instance):
+        from net import check_city
         city = self.city_input.text.strip().replace(' ', '-')
         if not city:
             self.city_status_label.text = ""
             return
             
-        def fetch_thread():
-            try:
-                response = requests.get(f"https://wttr.in/{city}?format=%C+%t", timeout=5)
-                is_valid = "Unknown location" not in response.text
-                Clock.schedule_once(lambda dt: self.update_status(is_valid))
-            except Exception:
-                Clock.schedule_once(lambda dt: self.update_status(False))
-
-        threading.Thread(target=fetch_thread).start()
+        check_city(city, runtime.ui_callback(lambda is_valid: self.update_status(bool(is_valid)), owner=self))
     
     def update_status(self, is_valid):
         if is_valid:
@@ -241,7 +253,7 @@ class SetupScreen(Screen):
         if password:
             settings['password'] = hashlib.sha256(password.encode()).hexdigest()
         
-        self.zos_app.settings = settings
+        self.zos_app.settings_store.replace(settings)
         self.zos_app.save_settings()
         self.zos_app.on_setup_complete()
 
@@ -249,14 +261,26 @@ class SetupScreen(Screen):
 class ZOSApp(App):
     def build(self):
         self.logged_in = False
-        self.current_process = None
+        self.foreground_task = None
+        self.reap_event = None
+        self.task_popup = None
+        self.session = None
+        self.launch_span = NULL_SPAN
         self.apps_dir = "Apps"
         self.settings_dir = os.path.join(self.apps_dir, 'Settings')
         self.settings_file = os.path.join(self.settings_dir, "settings.txt")
+        self.settings_store = get_settings(self.settings_file)
+        self.profile_file = os.path.join(CACHE_DIR, 'startup_profile.json')
+        self.startup_steps = []
+        self.app_index = AppIndex(self.apps_dir)
+        self.app_index.load()
+        self.shown_apps = None
+        self.app_tiles = {}
         
         self.main_layout = FloatLayout()
         
         self.wallpaper = Image(allow_stretch=True, keep_ratio=False)
+        self.wallpaper_source = None
         self.main_layout.add_widget(self.wallpaper)
         
         self.overlay = FloatLayout()
@@ -266,110 +290,164 @@ class ZOSApp(App):
         self.overlay.add_widget(self.sm)
         
         self.load_settings()
+        self.start_zygote_pool()
+        self.apply_trace_settings(self.settings)
+        self.settings_store.subscribe(self.apply_trace_settings, keys=['tracing', 'profile_launch'])
+        self.settings_store.subscribe(self.on_keep_loaded_changed, keys=['keep_apps_loaded'])
 
         # Check for first-time run before adding any screens
-        if not os.path.exists(self.settings_file):
+        if not self.settings_store.exists():
             print("Settings file not found. Showing setup screen.")
             self.setup_screen = SetupScreen(zos_app_instance=self, name='setup')
             self.sm.add_widget(self.setup_screen)
             self.sm.current = 'setup'
+            Clock.schedule_once(lambda dt: profiler.finish(self.profile_file))
         else:
             print("Settings file found. Showing splash screen.")
-            self.splash = SplashScreen(duration=3, next_callback=self.show_login, name='splash')
-            self.login = LoginScreen(zos_app_instance=self, name='login')
-            self.main = Screen(name='main')
-            self.app_screen = Screen(name='app')
-
-            self.sm.add_widget(self.splash)
-            self.sm.add_widget(self.login)
-            self.sm.add_widget(self.main)
-            self.sm.add_widget(self.app_screen)
-
-            self.setup_main_screen()
-            self.setup_app_screen()
-            
-            self.sm.current = 'splash'
+            self.start_screens()
 
-        self.sm.bind(current=self.on_screen_change)
+        self.settings_store.subscribe(lambda changes: self.load_and_apply_wallpaper(), keys=['custom_wallpaper_path'])
         self.load_and_apply_wallpaper()
+        profiler.mark('build')
         
         return self.main_layout
 
-    def on_setup_complete(self):
-        print("Setup complete. Initializing main screens.")
-        # We need to re-initialize the other screens after setup is done
-        self.splash = SplashScreen(duration=3, next_callback=self.show_login, name='splash')
-        self.login = LoginScreen(zos_app_instance=self, name='login')
-        self.main = Screen(name='main')
-        self.app_screen = Screen(name='app')
-        
-        # Clear existing screens to prevent duplicates
-        self.sm.clear_widgets()
+    def start_screens(self):
+        # Only the splash is built up front. The other screens are built one
+        # per frame behind it, and the splash goes away as soon as the login
+        # screen is ready.
+        self.splash = SplashScreen(name='splash')
         self.sm.add_widget(self.splash)
+        self.sm.current = 'splash'
+        self.startup_steps = [self.build_login_screen, self.build_main_screen, self.build_app_screen]
+        Clock.schedule_once(self.run_startup_step)
+
+    def run_startup_step(self, dt=None):
+        if not self.startup_steps:
+            return
+        step = self.startup_steps.pop(0)
+        step()
+        profiler.mark(step.__name__)
+        if self.startup_steps:
+            Clock.schedule_once(self.run_startup_step)
+        else:
+            Clock.schedule_once(lambda dt: profiler.finish(self.profile_file))
+
+    def finish_startup(self):
+        while self.startup_steps:
+            self.run_startup_step()
+
+    def build_login_screen(self):
+        self.login = LoginScreen(zos_app_instance=self, name='login')
         self.sm.add_widget(self.login)
-        self.sm.add_widget(self.main)
-        self.sm.add_widget(self.app_screen)
+        self.show_login()
 
+    def build_main_screen(self):
+        self.main = Screen(name='main')
+        self.sm.add_widget(self.main)
         self.setup_main_screen()
+
+    def build_app_screen(self):
+        self.app_screen = Screen(name='app')
+        self.sm.add_widget(self.app_screen)
         self.setup_app_screen()
 
-        self.sm.current = 'splash'
+    def start_zygote_pool(self):
+        # Opt-in: keeps warm interpreters around so CLI apps start faster.
+        self.zygote_pool = None
+        if self.settings.get('zygote') == '1':
+            from zygote import ZygotePool, DEFAULT_PRELOAD
+            preload = self.settings.get('zygote_preload')
+            self.zygote_pool = ZygotePool(
+                size=int(self.settings.get('zygote_pool_size', 2)),
+                max_runs=int(self.settings.get('zygote_max_runs', 20)),
+                preload=preload.split(',') if preload else DEFAULT_PRELOAD)
+            self.zygote_pool.start()
+
+    def on_stop(self):
+        from sessions import session_manager
+        from supervisor import supervisor
+        session_manager.close_all()
+        self.settings_store.flush_pending()
+        # Apps left running would outlive ZOS with nothing watching them.
+        supervisor.stop_all()
+        if self.zygote_pool:
+            self.zygote_pool.shutdown()
+        runtime.shutdown()
+        if tracer.enabled:
+            tracer.export()
+
+    def apply_trace_settings(self, changes):
+        # tracing=1 records spans from now on; turning it off again writes
+        # them out under Cache/traces. profile_launch=cprofile (or sample)
+        # profiles the next launch only, so the key is cleared once taken.
+        if 'tracing' in changes:
+            if changes['tracing'] == '1':
+                tracer.enable()
+            elif tracer.enabled:
+                tracer.disable()
+        mode = changes.get('profile_launch')
+        if mode:
+            try:
+                tracer.profile_next(mode)
+            except ValueError as e:
+                print(f"Error in profile_launch setting: {e}", file=sys.stderr)
+            Clock.schedule_once(lambda dt: self.settings_store.remove('profile_launch'))
+
+    def on_setup_complete(self):
+        print("Setup complete. Initializing main screens.")
+        if isinstance(getattr(self, 'login', None), LoginScreen):
+            self.login.detach()
+        runtime.cancel_owner(self.setup_screen)
+        if getattr(self, 'main', None) is not None:
+            ticker.unsubscribe(self.main)
+        # We need to re-initialize the other screens after setup is done
+        # Clear existing screens to prevent duplicates
+        self.sm.clear_widgets()
+        self.start_screens()
         self.load_and_apply_wallpaper()
 
     def load_and_apply_wallpaper(self):
-        settings = self.load_settings()
-        custom_wallpaper_path = settings.get('custom_wallpaper_path')
+        custom_wallpaper_path = self.settings.get('custom_wallpaper_path')
         
         if custom_wallpaper_path and os.path.exists(custom_wallpaper_path):
             wallpaper_source = custom_wallpaper_path
         else:
             wallpaper_source = 'Assets/wallpaper.jpg'
-            
-        try:
-            self.wallpaper.source = wallpaper_source
-        except Exception as e:
-            print(f"Error: Could not load '{wallpaper_source}'\nDetails: {e}")
+
+        if self.wallpaper_source == wallpaper_source:
+            return
+        self.wallpaper_source = wallpaper_source
+        # Decoded off the UI thread and scaled down to the window once.
+        thumbnail_cache.request(wallpaper_source, Window.size, self.set_wallpaper_texture)
+
+    def set_wallpaper_texture(self, texture):
+        if texture is None:
+            print(f"Error: Could not load '{self.wallpaper_source}'")
             self.wallpaper.source = 'atlas://data/images/defaulttheme/bad-image'
-    
-    def on_screen_change(self, instance, value):
-        if value == 'main':
-            self.load_and_apply_wallpaper()
+        else:
+            self.wallpaper.texture = texture
 
     def load_settings(self):
-        settings = {}
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r') as f:
-                    for line in f.readlines():
-                        try:
-                            key, value = line.strip().split('=', 1)
-                            settings[key] = value
-                        except ValueError:
-                            pass
-            except IOError as e:
-                print(f"Error loading settings: {e}")
-                settings = {}
-        self.settings = settings
+        # Served from memory; the store only reads the file once.
+        self.settings = self.settings_store.load()
         return self.settings
 
     def save_settings(self):
-        if not os.path.exists(self.settings_dir):
-            os.makedirs(self.settings_dir)
-        try:
-            with open(self.settings_file, 'w') as f:
-                for key, value in self.settings.items():
-                    f.write(f"{key}={value}\n")
-        except IOError as e:
-            print(f"Error saving settings: {e}")
+        self.settings_store.flush()
 
     def show_login(self):
         self.sm.current = 'login'
 
     def login(self):
         self.logged_in = True
+        # The user may unlock before the rest of the screens were built.
+        self.finish_startup()
         self.sm.current = 'main'
 
     def setup_main_screen(self):
+        self.shown_apps = None
+        self.app_tiles = {}
         layout = FloatLayout()
 
         self.app_grid = GridLayout(cols=3, spacing=60, padding=40, size_hint=(1,0.8), pos_hint={'center_x':0.5,'center_y':0.55})
@@ -377,143 +455,211 @@ class ZOSApp(App):
 
         self.main_label = Label(text="", font_size='20sp', color=(0.5,1,0.5,1), font_name='RobotoThin', size_hint=(1,0.1), pos_hint={'top':1})
         layout.add_widget(self.main_label)
-        Clock.schedule_interval(self.update_main_time,1)
+        ticker.subscribe(self.main, self.update_main_time, unit=MINUTE)
 
         logout_btn = Button(text="Logout", size_hint=(0.2,0.08), pos_hint={'right':1,'top':1}, background_color=(0.5,1,0.5,1), font_name='RobotoThin')
         logout_btn.bind(on_press=self.logout)
         layout.add_widget(logout_btn)
 
+        tasks_btn = Button(text="Tasks", size_hint=(0.2,0.08), pos_hint={'right':0.8,'top':1}, background_color=(0.5,1,0.5,1), font_name='RobotoThin')
+        tasks_btn.bind(on_press=self.show_task_switcher)
+        layout.add_widget(tasks_btn)
+
         self.main.add_widget(layout)
         self.load_apps_menu()
 
-    def update_main_time(self, dt):
-        now = datetime.datetime.now()
+    def update_main_time(self, now):
         date = now.strftime("%A, %B %d, %Y")
         time = now.strftime("%I:%M %p")
-        self.main_label.text = f"{date} | {time}"
+        set_text(self.main_label, f"{date} | {time}")
 
     def load_apps_menu(self):
-        self.app_grid.clear_widgets()
-        apps_list = []
-        if os.path.isdir(self.apps_dir):
-            for folder in sorted(os.listdir(self.apps_dir)):
-                folder_path = os.path.join(self.apps_dir, folder)
-                if os.path.isdir(folder_path) and folder.lower() not in ['gallery', 'settings']:
-                    icon_path = os.path.join(folder_path,'icon.png')
-                    if not os.path.exists(icon_path):
-                        icon_path = 'Assets/icon.png'
-                    for file in sorted(os.listdir(folder_path)):
-                        if file.endswith((".py", ".zpkg")):
-                            app_name = os.path.splitext(file)[0]
-                            apps_list.append({'name': app_name, 'path': os.path.join(folder_path, file), 'icon': icon_path})
-            
-            settings_app = {'name': 'Settings', 'path': os.path.join(self.apps_dir, 'Settings', 'settings.py'), 'icon': os.path.join(self.apps_dir, 'Settings', 'icon.png')}
-            apps_list.append(settings_app)
+        with tracer.span('home screen', 'ui') as span:
+            self.build_apps_menu(span)
+
+    def build_apps_menu(self, span):
+        with tracer.span('app index refresh', 'ui'):
+            apps_list = self.app_index.refresh()
+        if apps_list == self.shown_apps:
+            return
+        self.shown_apps = apps_list
+        built = 0
 
+        # Reuse the tiles of apps that did not change; only new ones get built.
+        tiles = {}
+        self.app_grid.clear_widgets()
         for app in apps_list:
-            box = BoxLayout(orientation='vertical', spacing=5, size_hint=(None,None), size=(120,150))
-            icon = ImageButton(source=app['icon'], size_hint=(None,None), size=(100,100))
-            icon.bind(on_press=lambda instance, path=app['path'], name=app['name']: self.run_app(path,name))
-            label = Label(text=app['name'], font_size='16sp', halign='center', valign='middle', font_name='RobotoThin', size_hint=(1,None), height=30)
-            box.add_widget(icon)
-            box.add_widget(label)
+            key = (app['name'], app['path'], app['icon'])
+            box = self.app_tiles.get(key)
+            if box is None:
+                box = BoxLayout(orientation='vertical', spacing=5, size_hint=(None,None), size=(120,150))
+                icon = ImageButton(size_hint=(None,None), size=(100,100))
+                thumbnail_cache.request(app['icon'], icon.size, lambda texture, icon=icon: setattr(icon, 'texture', texture))
+                icon.bind(on_press=lambda instance, path=app['path'], name=app['name']: self.run_app(path,name))
+                label = Label(text=app['name'], font_size='16sp', halign='center', valign='middle', font_name='RobotoThin', size_hint=(1,None), height=30)
+                box.add_widget(icon)
+                box.add_widget(label)
+                built += 1
+            tiles[key] = box
             self.app_grid.add_widget(box)
+        self.app_tiles = tiles
+        if span.recording:
+            span.args.update(apps=len(apps_list), tiles_built=built)
 
     def setup_app_screen(self):
         layout = BoxLayout(orientation='vertical')
-        back_btn = Button(text="Back", size_hint_y=None, height=50, background_color=(0.4,1,0.4,1), font_name='RobotoThin')
+        top_bar = BoxLayout(size_hint_y=None, height=50)
+        back_btn = Button(text="Back", size_hint_x=0.7, background_color=(0.4,1,0.4,1), font_name='RobotoThin')
         back_btn.bind(on_press=self.go_back)
-        layout.add_widget(back_btn)
+        top_bar.add_widget(back_btn)
+        close_btn = Button(text="Close", size_hint_x=0.3, background_color=(1,0.4,0.4,1), font_name='RobotoThin')
+        close_btn.bind(on_press=self.close_app)
+        top_bar.add_widget(close_btn)
+        layout.add_widget(top_bar)
         self.app_container = BoxLayout()
         layout.add_widget(self.app_container)
         self.app_screen.add_widget(layout)
 
     def go_back(self, instance):
-        if self.current_process and self.current_process.poll() is None:
-            self.current_process.terminate()
-            self.current_process = None
+        # CLI apps keep running in the background; the task switcher brings
+        # them back.
+        self.foreground_task = None
         self.app_container.clear_widgets()
+        self.end_session()
         self.sm.current = 'main'
 
+    def close_app(self, instance):
+        from supervisor import supervisor
+        if self.foreground_task:
+            supervisor.stop(self.foreground_task)
+        self.go_back(instance)
+
+    def end_session(self):
+        # The foreground app leaves the screen. In-process apps are torn down
+        # now; a CLI app that is still running keeps its session until it
+        # exits.
+        session, self.session = self.session, None
+        if session and not session.running:
+            session.close()
+
     def logout(self, instance):
         self.logged_in = False
         self.sm.current = 'login'
 
     def run_app(self, path, name, app_args={}):
+        from sessions import session_manager
+        from modcache import load_module
+        # One 'launch' span per launch, from here to the app's first frame
+        # (or first line of output), with a child span for each phase.
+        self.launch_span.finish(superseded=True)
+        self.launch_span = tracer.begin_launch(name, path=path)
         self.app_container.clear_widgets()
+        self.end_session()
+        # Registered here rather than in build(), to keep sessions off the
+        # path to the splash; watch() ignores repeats.
+        session_manager.watch('screen_manager.current', self.sm, 'current')
+        self.session = session_manager.open(name, path)
         self.sm.current = 'app'
 
         if path.endswith('.zpkg'):
             try:
-                temp_dir = tempfile.mkdtemp()
-                
-                with tarfile.open(path, "r") as tar:
-                    tar.extractall(path=temp_dir)
-                
-                extracted_app_path = None
-                
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        if file.endswith('.py'):
-                            extracted_app_path = os.path.join(root, file)
-                            break
-                    if extracted_app_path:
-                        break
+                with tracer.span('open package', 'launch'):
+                    archive = self.package_archive(path)
+                if archive is not None:
+                    self.launch_package(archive, app_args, name)
+                    return
+
+                with tracer.span('extract', 'launch'):
+                    extracted_dir = self.session.pin(extraction_cache.extract(path))
+                manifest = load_manifest(extracted_dir)
+                if manifest:
+                    extracted_app_path = os.path.join(extracted_dir, manifest['entry'])
+                else:
+                    # Packaged before manifests existed: guess the entry script.
+                    extracted_app_path = find_entry_script(extracted_dir)
 
                 if extracted_app_path and os.path.exists(extracted_app_path):
-                    with open(extracted_app_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    if 'from kivy.app import App' in content or 'kivy.app import App' in content or 'App().run' in content:
-                        self.run_kivy_app(extracted_app_path, app_args)
-                    else:
-                        self.run_cli_app(extracted_app_path)
+                    self.launch_script(extracted_app_path, app_args, name, manifest)
                 else:
                     raise FileNotFoundError("Could not find any .py file after extraction. The archive may be empty or improperly structured.")
-                
-                def cleanup_temp_dir():
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                
-                self.sm.bind(current=lambda instance, value: cleanup_temp_dir() if value == 'main' else None)
 
             except Exception as e:
                 print(f"Failed to open .zpkg app: {e}", file=sys.stderr)
+                self.launch_span.finish(error=str(e))
                 self.app_container.add_widget(Label(text=f"Failed to open .zpkg app:\n{e}"))
+                self.end_session()
                 self.sm.current = 'main'
         
         else:
             try:
                 if name.lower() == 'settings':
-                    spec = importlib.util.spec_from_file_location("settings_app", path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    app_class = module.SettingsApp
-                    app_instance = app_class() 
-                    widget = app_instance.build()
+                    with tracer.span('import', 'launch'):
+                        module = load_module(path, keep_loaded=self.keep_apps_loaded(), session=self.session)
+                    app_instance = self.session.create_app(module.SettingsApp)
+                    with tracer.span('build', 'launch'):
+                        widget = self.session.view = app_instance.build()
                     self.app_container.add_widget(widget)
+                    self.trace_first_frame()
                 else:
-                    with open(path,'r', encoding='utf-8') as f:
-                        content = f.read()
-                    if 'from kivy.app import App' in content or 'kivy.app import App' in content or 'App().run' in content:
-                        self.run_kivy_app(path, app_args)
-                    else:
-                        self.run_cli_app(path)
+                    self.launch_script(path, app_args, name)
             except Exception as e:
                 print(f"Failed to open app: {e}", file=sys.stderr)
+                self.launch_span.finish(error=str(e))
                 self.app_container.add_widget(Label(text=f"Failed to open app:\n{e}"))
             
-    def run_kivy_app(self, path, app_args={}):
+    def package_archive(self, path):
+        from zpkgimport import open_package
+        # Packages with a manifest run straight from the archive, unless
+        # extract_packages=1 (for apps that open their own files by path).
+        if self.settings.get('extract_packages') == '1':
+            return None
+        archive = open_package(path)
+        return archive if archive.entry() else None
+
+    def launch_package(self, archive, app_args={}, name=None):
+        manifest = archive.manifest
+        if manifest.get('kind') == 'kivy':
+            loader = archive.loader(archive.entry())
+            self.run_kivy_app(loader.path, app_args, manifest.get('app_class'), loader)
+        else:
+            self.run_cli_app(archive.path, name, manifest)
+
+    def keep_apps_loaded(self):
+        # Opt-in: relaunching an app reuses its executed module and only
+        # creates a fresh App instance. Kivy caches every EventDispatcher
+        # class it sees for good, so without it each launch re-executes the
+        # module and leaves a copy of the app's classes behind.
+        return self.settings.get('keep_apps_loaded') == '1'
+
+    def on_keep_loaded_changed(self, changes):
+        from modcache import unload_all
+        # Modules kept so far would otherwise stay in memory for good.
+        if not self.keep_apps_loaded():
+            unload_all()
+
+    def launch_script(self, path, app_args={}, name=None, manifest=None):
+        from classifier import classifier
+        if manifest:
+            app_kind = {'kind': manifest['kind'], 'app_class': manifest.get('app_class')}
+        else:
+            with tracer.span('classify', 'launch'):
+                app_kind = classifier.classify(path)
+        if app_kind['kind'] == 'kivy':
+            self.run_kivy_app(path, app_args, app_kind['app_class'])
+        else:
+            self.run_cli_app(path, name, manifest)
+
+    def run_kivy_app(self, path, app_args={}, app_class_name=None, loader=None):
+        from modcache import load_module
+        session = self.session
         try:
-            app_settings = self.load_settings()
+            app_settings = dict(self.settings)
             
-            spec = importlib.util.spec_from_file_location("dynamic_app", path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            app_class = None
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if isinstance(attr, type) and issubclass(attr, App) and attr.__name__ != 'App':
-                    app_class = attr
-                    break
+            with tracer.span('import', 'launch'):
+                module = load_module(path, keep_loaded=self.keep_apps_loaded(), loader=loader, session=session)
+            app_class = getattr(module, app_class_name, None) if app_class_name else None
+            if not (isinstance(app_class, type) and issubclass(app_class, App)):
+                app_class = self.find_app_class(module)
             if app_class:
                 # This is the key change. We check if the app accepts the custom arguments.
                 init_signature = app_class.__init__.__code__
@@ -521,45 +667,184 @@ class ZOSApp(App):
 
                 if 'zos_app_instance' in arg_names and 'settings' in arg_names:
                     # It's an S3 app or a custom app that expects our arguments.
-                    app_instance = app_class(zos_app_instance=self, settings=app_settings, **app_args) 
+                    app_instance = session.create_app(app_class, zos_app_instance=self, settings=app_settings, **app_args) 
                 else:
                     # It's a regular Kivy app, don't pass the custom arguments.
-                    app_instance = app_class(**app_args)
+                    app_instance = session.create_app(app_class, **app_args)
 
-                widget = app_instance.build() 
+                with tracer.span('build', 'launch'):
+                    widget = session.view = app_instance.build() 
                 self.app_container.add_widget(widget)
                 
-                app_instance.bind(on_stop=lambda instance: self.load_apps_menu())
+                session.bind(app_instance, on_stop=lambda instance: self.load_apps_menu())
+                self.trace_first_frame()
 
             else:
                 self.app_container.add_widget(Label(text="Error: No App class found"))
+                self.launch_span.finish(error="No App class found")
         except Exception as e:
             print(f"Kivy app failed: {e}", file=sys.stderr)
+            self.launch_span.finish(error=str(e))
             self.app_container.add_widget(Label(text=f"Kivy app failed:\n{e}"))
             
-    def run_cli_app(self, path):
-        output_scroll = ScrollView(size_hint=(1,0.9))
-        output_label = Label(text="Starting...\n", size_hint_y=None, font_name='RobotoThin', halign='left', valign='top', text_size=(Window.width-50,None))
-        output_label.bind(texture_size=lambda inst, val: setattr(inst,'height',inst.texture_size[1]))
-        output_scroll.add_widget(output_label)
-        self.app_container.add_widget(output_scroll)
-
-        def run_thread():
-            try:
-                process = subprocess.Popen([sys.executable,path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                self.current_process = process
-                for line in process.stdout:
-                    Clock.schedule_once(lambda dt, t=line: output_label.__setattr__('text', output_label.text + t))
-                for line in process.stderr:
-                    Clock.schedule_once(lambda dt, t=line: output_label.__setattr__('text', output_label.text + "Error: " + t))
-                process.wait()
-            except Exception as e:
-                Clock.schedule_once(lambda dt: output_label.__setattr__('text', output_label.text + f"Failed: {e}"))
-            finally:
-                self.current_process = None
-                Clock.schedule_once(lambda dt: self.load_apps_menu())
+    def trace_first_frame(self):
+        launch = self.launch_span
+        if not launch.recording:
+            return
+        start = tracer.now()
+
+        # on_flip fires once a drawn frame is actually on screen.
+        def on_flip(*args):
+            Window.unbind(on_flip=on_flip)
+            tracer.complete('first frame', start, cat='launch')
+            launch.finish()
+        Window.bind(on_flip=on_flip)
+
+    def find_app_class(self, module):
+        # Fallback for apps the classifier could not name a class for.
+        for attr_name in dir(module):
+            attr = getattr(module, attr_name)
+            if isinstance(attr, type) and issubclass(attr, App) and attr.__name__ != 'App':
+                return attr
+        return None
+
+    def run_cli_app(self, path, name=None, manifest=None):
+        from console import ConsoleView, DEFAULT_SCROLLBACK
+        from supervisor import supervisor, ResourcePolicy
+        from zpkgimport import runner_argv
+        scrollback = int(self.settings.get('console_scrollback', DEFAULT_SCROLLBACK))
+        console = ConsoleView(scrollback=scrollback, font_name='RobotoThin', size_hint=(1,0.9))
+        console.write_lines(["Starting..."])
+        self.app_container.add_widget(console)
+        session = self.session
+        session.view = console
+
+        launch = self.launch_span
+        # Limits from settings (app_memory_mb=...), overridden by the app's
+        # own "limits" in its manifest.
+        policy = ResourcePolicy.from_settings(self.settings, (manifest or {}).get('limits'))
+        try:
+            name = name or os.path.basename(path)
+            with tracer.span('process spawn', 'launch') as span:
+                process = self.zygote_pool.launch(path) if self.zygote_pool else None
+                if process:
+                    task = supervisor.adopt(name, path, process, policy)
+                else:
+                    argv = runner_argv(path) if path.endswith('.zpkg') else [sys.executable, path]
+                    task = supervisor.spawn(name, argv, path=path, policy=policy,
+                                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL)
+                if span.recording:
+                    span.args.update(zygote=bool(process), pid=task.pid)
+        except Exception as e:
+            console.write_lines([f"Failed: {e}"])
+            launch.finish(error=str(e))
+            return
+        task.view = console
+        session.task = task
+        spawned = tracer.now()
+
+        def on_first_output():
+            # Called on the pipe reader thread; the launch (and any profile
+            # of it) is finished back on the UI thread.
+            now = tracer.now()
+            tracer.complete('first output', spawned, now, 'launch')
+            runtime.call_on_ui(launch.finish, now)
+
+        console.attach(task.process, on_first_output if launch.recording else None)
+        self.foreground_task = task
+
+        def on_exit(task):
+            # An app that exits without printing anything ends its launch here.
+            launch.finish(returncode=task.returncode)
+            console.write_lines([task.exit_message()])
+            if self.foreground_task is task:
+                self.foreground_task = None
+            # A backgrounded app's session (and its package pins) lives
+            # exactly as long as its process; on screen it goes with Back.
+            if session is not self.session:
+                session.close()
+            self.load_apps_menu()
+
+        task.on_exit.append(on_exit)
+        if self.reap_event is None:
+            self.reap_event = Clock.schedule_interval(self.reap_processes, 0.5)
+
+    def reap_processes(self, dt):
+        from supervisor import supervisor
+        supervisor.reap()
+        if self.task_popup:
+            self.refresh_task_switcher()
+        if not supervisor.running():
+            self.reap_event = None
+            return False
+
+    def switch_to_task(self, task):
+        from sessions import session_manager
+        from supervisor import EXITED
+        if self.task_popup:
+            self.task_popup.dismiss()
+        self.app_container.clear_widgets()
+        self.end_session()
+        if task.view.parent:
+            task.view.parent.remove_widget(task.view)
+        self.app_container.add_widget(task.view)
+        self.foreground_task = task if task.state != EXITED else None
+        self.session = session_manager.for_task(task)
+        self.sm.current = 'app'
 
-        threading.Thread(target=run_thread).start()
+    def show_task_switcher(self, instance):
+        from kivy.uix.scrollview import ScrollView
+        from kivy.uix.popup import Popup
+        self.task_list = BoxLayout(orientation='vertical', spacing=5, size_hint_y=None)
+        self.task_list.bind(minimum_height=self.task_list.setter('height'))
+        scroll = ScrollView()
+        scroll.add_widget(self.task_list)
+        self.task_popup = Popup(title='Tasks', content=scroll, size_hint=(0.9, 0.8))
+        self.task_popup.bind(on_dismiss=lambda popup: setattr(self, 'task_popup', None))
+        self.refresh_task_switcher()
+        self.task_popup.open()
+
+    def refresh_task_switcher(self):
+        from sessions import session_manager
+        from supervisor import supervisor, SUSPENDED, EXITED
+        self.task_list.clear_widgets()
+        self.task_list.add_widget(Label(text=session_manager.summary(), font_size='12sp', size_hint_y=None, height=30))
+        tasks = supervisor.tasks()
+        if not tasks:
+            self.task_list.add_widget(Label(text="No apps running.", size_hint_y=None, height=40))
+        for task in tasks:
+            row = BoxLayout(size_hint_y=None, height=50, spacing=5)
+            usage = f"CPU {task.cpu_time:.1f}s"
+            if task.state != EXITED:
+                usage += f" ({task.cpu_percent:.0f}%)"
+            usage += f"  RSS {task.rss / 1048576:.1f} MB"
+            if task.io_read >= 0:
+                usage += f"  I/O {task.io_read / 1048576:.1f}/{task.io_write / 1048576:.1f} MB"
+            row.add_widget(Label(text=f"{task.name} [{task.state}]\n{usage}  {task.wall_time:.0f}s",
+                                 font_size='14sp', size_hint_x=0.55))
+            open_btn = Button(text="Open", size_hint_x=0.15)
+            open_btn.bind(on_press=lambda instance, task=task: self.switch_to_task(task))
+            row.add_widget(open_btn)
+            if task.state == EXITED:
+                remove_btn = Button(text="Remove", size_hint_x=0.3)
+                remove_btn.bind(on_press=lambda instance, task=task: (supervisor.forget(task), self.refresh_task_switcher()))
+                row.add_widget(remove_btn)
+            else:
+                pause_btn = Button(text="Resume" if task.state == SUSPENDED else "Pause", size_hint_x=0.15)
+                pause_btn.bind(on_press=lambda instance, task=task: self.toggle_task(task))
+                row.add_widget(pause_btn)
+                end_btn = Button(text="End", size_hint_x=0.15)
+                end_btn.bind(on_press=lambda instance, task=task: supervisor.stop(task))
+                row.add_widget(end_btn)
+            self.task_list.add_widget(row)
+
+    def toggle_task(self, task):
+        from supervisor import supervisor, SUSPENDED
+        if task.state == SUSPENDED:
+            supervisor.resume(task)
+        else:
+            supervisor.suspend(task)
+        self.refresh_task_switcher()
 
 if __name__ == '__main__':
     ZOSApp().run()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import json
+
+from zpkg import CACHE_DIR
+
+# Folders that never show up on the home screen grid.
+HIDDEN_FOLDERS = ['gallery', 'settings']
+APP_EXTENSIONS = ('.py', '.zpkg')
+
+# ---------------- App Index ----------------
+class AppIndex:
+    """On-disk index of the apps installed under `apps_dir`.
+
+    Each app folder is stored with the mtime it had when it was last listed.
+    `refresh` only stats the folders and re-lists the ones whose mtime moved,
+    so returning to the home screen costs O(changed apps) directory reads
+    instead of a walk over the whole tree.
+    """
+
+    def __init__(self, apps_dir, index_file=None, default_icon='Assets/icon.png'):
+        self.apps_dir = apps_dir
+        self.index_file = index_file or os.path.join(CACHE_DIR, 'apps.json')
+        self.default_icon = default_icon
+        self.apps_dir_mtime = None
+        self.folders = {}
+
+    def load(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('apps_dir') != os.path.abspath(self.apps_dir):
+            return
+        self.apps_dir_mtime = data.get('apps_dir_mtime')
+        self.folders = data.get('folders', {})
+
+    def save(self):
+        data = {
+            'apps_dir': os.path.abspath(self.apps_dir),
+            'apps_dir_mtime': self.apps_dir_mtime,
+            'folders': self.folders,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+            tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"Error saving app index: {e}")
+
+    def refresh(self):
+        """Revalidates the index against the filesystem and returns the apps."""
+        changed = False
+        try:
+            apps_dir_mtime = os.stat(self.apps_dir).st_mtime_ns
+        except OSError:
+            if self.folders:
+                self.folders = {}
+                self.apps_dir_mtime = None
+                self.save()
+            return []
+
+        if apps_dir_mtime != self.apps_dir_mtime:
+            folder_names = set()
+            for entry in os.scandir(self.apps_dir):
+                # Hidden folders are in-progress downloads (see downloads.py).
+                if entry.is_dir() and not entry.name.startswith('.'):
+                    folder_names.add(entry.name)
+            for name in list(self.folders):
+                if name not in folder_names:
+                    del self.folders[name]
+            for name in folder_names:
+                self.folders.setdefault(name, {'mtime': None, 'apps': []})
+            self.apps_dir_mtime = apps_dir_mtime
+            changed = True
+
+        for name, folder in self.folders.items():
+            folder_path = os.path.join(self.apps_dir, name)
+            try:
+                mtime = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime != folder['mtime']:
+                folder['apps'] = self._scan_folder(folder_path)
+                folder['mtime'] = mtime
+                changed = True
+
+        if changed:
+            self.save()
+        return self.apps()
+
+    def apps(self):
+        apps_list = []
+        settings_app = None
+        for name in sorted(self.folders):
+            if name.lower() == 'settings':
+                for app in self.folders[name]['apps']:
+                    if app['name'].lower() == 'settings':
+                        settings_app = dict(app, name='Settings')
+            if name.lower() in HIDDEN_FOLDERS:
+                continue
+            apps_list.extend(self.folders[name]['apps'])
+
+        if self.apps_dir_mtime is not None:
+            if settings_app is None:
+                settings_app = {'name': 'Settings', 'path': os.path.join(self.apps_dir, 'Settings', 'settings.py'), 'icon': os.path.join(self.apps_dir, 'Settings', 'icon.png'), 'kind': 'py', 'mtime': None}
+            apps_list.append(settings_app)
+        return apps_list
+
+    def _scan_folder(self, folder_path):
+        files = {}
+        for entry in os.scandir(folder_path):
+            if entry.is_file():
+                files[entry.name] = entry
+
+        icon_path = os.path.join(folder_path, 'icon.png')
+        if 'icon.png' not in files:
+            icon_path = self.default_icon
+
+        apps = []
+        for file in sorted(files):
+            if file.endswith(APP_EXTENSIONS):
+                app_name, ext = os.path.splitext(file)
+                apps.append({
+                    'name': app_name,
+                    'path': os.path.join(folder_path, file),
+                    'icon': icon_path,
+                    'kind': ext[1:],
+                    'mtime': files[file].stat().st_mtime_ns,
+                })
+        return apps
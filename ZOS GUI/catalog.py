@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import threading
+
+from zpkg import CACHE_DIR
+from net import http_client
+from tasks import runtime
+from downloads import is_safe_folder
+
+# Point this at a local stub server to exercise ZStore offline.
+CATALOG_URL = os.environ.get('ZOS_CATALOG_URL', 'https://raw.githubusercontent.com/Zhvan14/ZOSApps/main/catalog.json')
+# Written into each app folder ZStore installs, to know what version it is.
+RECEIPT_NAME = 'zstore.json'
+
+ALL = 'all'
+INSTALLED = 'installed'
+UPDATES = 'updates'
+AVAILABLE = 'available'
+
+# What the store offers until the catalog has been fetched once.
+BUILTIN_APPS = [
+    {'id': 'ChessGUI', 'name': 'Sunrise Chess', 'url': 'https://github.com/Zhvan14/ZOSApps/tree/main/ChessGUI'},
+    {'id': 'GuessGameGUI', 'name': 'Guessing Game', 'url': 'https://github.com/Zhvan14/ZOSApps/tree/main/GuessGameGUI'},
+]
+
+class CatalogError(Exception):
+    pass
+
+def version_key(version):
+    """Orders versions like '1.10' after '1.9'; unknown versions sort first."""
+    if not version:
+        return ()
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                 for part in re.split(r'[.\-+]', str(version)))
+
+def read_receipt(app_dir):
+    try:
+        with open(os.path.join(app_dir, RECEIPT_NAME), 'r') as f:
+            receipt = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return receipt if isinstance(receipt, dict) else None
+
+def make_receipt(entry):
+    return json.dumps({'id': entry['id'], 'version': entry.get('version')}).encode('utf-8')
+
+# ---------------- Catalog ----------------
+class Catalog:
+    """The ZStore app listing, cached on disk and revalidated conditionally.
+
+    The remote index is JSON: {"revision": N, "apps": [{"id", "name",
+    "version", "size", "sha256", "icon", "url", "description"}, ...]}.
+    Refreshes send the cached ETag/Last-Modified, so an unchanged index
+    costs a 304, and ask for `?since=<revision>`; a server that supports it
+    may answer with a delta instead, {"revision", "base", "apps": [changed],
+    "removed": [ids]}. Static hosts just ignore the query.
+    """
+
+    def __init__(self, url=None, cache_file=None, client=None):
+        self.url = url or CATALOG_URL
+        self.cache_file = cache_file or os.path.join(CACHE_DIR, 'catalog.json')
+        self.client = client or http_client
+        self.lock = threading.Lock()
+        self.etag = None
+        self.last_modified = None
+        self.revision = None
+        self.apps = {}
+        self.rows = []
+        self.last_search = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data is None or data.get('url') != self.url:
+            self._set_apps({app['id']: app for app in BUILTIN_APPS})
+            return
+        self.etag = data.get('etag')
+        self.last_modified = data.get('last_modified')
+        self.revision = data.get('revision')
+        self._set_apps(data.get('apps', {}))
+
+    def save(self):
+        data = {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'revision': self.revision,
+            'apps': self.apps,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            tmp_file = f"{self.cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Error saving catalog: {e}")
+
+    # ---- Refreshing ----
+    def refresh(self, callback=None, owner=None):
+        """Revalidates in the background; callback(changed) runs on the UI
+        thread, with changed None if the catalog could not be fetched."""
+        def on_error(error):
+            print(f"Catalog refresh failed: {error}")
+            if callback:
+                callback(None)
+        return runtime.submit(self._refresh, owner=owner, key='catalog refresh', on_done=callback, on_error=on_error)
+
+    def _refresh(self, full=False):
+        headers = {}
+        params = None
+        if self.revision is not None and not full:
+            # Only worth asking for a delta when the cache is a real index.
+            params = {'since': self.revision}
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+        response = self.client.request(self.url, headers=headers, params=params)
+        if response is None:
+            return None
+        if response.status_code == 304:
+            return False
+        if response.status_code != 200:
+            print(f"Catalog request failed: HTTP {response.status_code}")
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            print("Catalog is not valid JSON.")
+            return None
+
+        if 'base' in data and data['base'] != self.revision:
+            # A delta against some other revision is no use; ask once for
+            # the whole index instead.
+            if full:
+                raise CatalogError("Server sent a delta when asked for the full catalog.")
+            return self._refresh(full=True)
+        with self.lock:
+            self._apply(data)
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+            self.save()
+        return True
+
+    def _apply(self, data):
+        apps = {} if 'base' not in data else dict(self.apps)
+        for app in data.get('apps', []):
+            if isinstance(app, dict) and app.get('id') and app.get('url'):
+                apps[app['id']] = app
+        for app_id in data.get('removed', []):
+            apps.pop(app_id, None)
+        self.revision = data.get('revision')
+        self._set_apps(apps)
+
+    def _set_apps(self, apps):
+        # An entry's folder (or id) becomes a path under the apps folder, so
+        # one like "../ZOS GUI" is dropped here rather than ever installed.
+        for app_id, app in list(apps.items()):
+            if not is_safe_folder(app.get('folder') or app_id):
+                print(f"Ignoring catalog entry with an unsafe folder name: {app.get('folder') or app_id!r}")
+                del apps[app_id]
+        # Lower-cased search text is built once per refresh, not per keystroke.
+        rows = []
+        for app in sorted(apps.values(), key=lambda app: app.get('name', app['id']).lower()):
+            name = app.get('name', app['id'])
+            text = ' '.join([name, app['id'], app.get('description', '')]).lower()
+            rows.append((name.lower(), text, app))
+        # Swapped in whole, so searches on the UI thread never see a half-built list.
+        self.rows = rows
+        self.apps = apps
+        self.last_search = None
+
+    # ---- Searching ----
+    def search(self, query='', show=ALL, installed=None):
+        """Apps whose name, id or description contain every word of `query`.
+
+        Name-prefix matches come first. Typing one more letter only filters
+        the previous results instead of the whole catalog.
+        """
+        words = query.lower().split()
+        key = ' '.join(words)
+        rows = self.rows
+        last = self.last_search
+        if last and last[0] is rows and last[1] and key.startswith(last[1]):
+            rows = last[2]
+        matches = [row for row in rows if all(word in row[1] for word in words)]
+        self.last_search = (self.rows, key, matches)
+
+        if words:
+            matches = sorted(matches, key=lambda row: not row[0].startswith(words[0]))
+        apps = [row[2] for row in matches]
+        if show == ALL or installed is None:
+            return apps
+        if show == INSTALLED:
+            return [app for app in apps if app['id'] in installed]
+        if show == AVAILABLE:
+            return [app for app in apps if app['id'] not in installed]
+        if show == UPDATES:
+            return [app for app in apps if self.has_update(app, installed)]
+        return apps
+
+    # ---- Installed apps ----
+    def folder(self, app):
+        folder = app.get('folder') or app['id']
+        if not is_safe_folder(folder):
+            raise ValueError(f"Unsafe folder name in catalog entry: {folder!r}")
+        return folder
+
+    def installed_versions(self, app_index):
+        """{app id: installed version (None if unknown)} for catalog apps found
+        in the app index's folders. Only the receipts are read."""
+        installed = {}
+        for app in self.apps.values():
+            folder = self.folder(app)
+            if folder not in app_index.folders:
+                continue
+            receipt = read_receipt(os.path.join(app_index.apps_dir, folder))
+            installed[app['id']] = receipt.get('version') if receipt else None
+        return installed
+
+    def has_update(self, app, installed):
+        if app['id'] not in installed or not app.get('version'):
+            return False
+        # An app that was installed by hand has no receipt; leave it alone.
+        version = installed[app['id']]
+        return version is not None and version_key(app['version']) > version_key(version)
+
+    def updates(self, installed):
+        return [app for app in self.apps.values() if self.has_update(app, installed)]
+
+catalog = None
+
+def get_catalog():
+    """The shared Catalog, created (and its cache read) on first use."""
+    global catalog
+    if catalog is None:
+        catalog = Catalog()
+    return catalog
@@ -0,0 +1,125 @@
+import os
+import ast
+import json
+import hashlib
+
+from zpkg import CACHE_DIR
+
+# Source markers used when a file cannot be parsed (e.g. newer syntax).
+KIVY_MARKERS = ('from kivy.app import App', 'kivy.app import App', 'App().run')
+
+# ---------------- App Classifier ----------------
+def scan_source(source):
+    """Works out whether `source` is a Kivy or a CLI app.
+
+    Returns {'kind': 'kivy' | 'cli', 'app_class': name or None}, where
+    app_class is the App subclass the app would run itself with.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        is_kivy = any(marker in source for marker in KIVY_MARKERS)
+        return {'kind': 'kivy' if is_kivy else 'cli', 'app_class': None}
+
+    # Names the module binds to kivy.app.App, e.g. "App" or "KivyApp".
+    app_names = set()
+    imports_kivy_app = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == 'kivy.app':
+            for alias in node.names:
+                if alias.name == 'App':
+                    app_names.add(alias.asname or 'App')
+                    imports_kivy_app = True
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == 'kivy.app':
+                    imports_kivy_app = True
+
+    app_classes = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for base in node.bases:
+            base_name = _dotted_name(base)
+            if base_name in app_names or base_name.endswith('app.App') or base_name in app_classes:
+                app_classes.append(node.name)
+                break
+
+    # Prefer the class the app actually runs, e.g. "CalculatorApp().run()".
+    app_class = app_classes[0] if app_classes else None
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'run'
+                and isinstance(node.func.value, ast.Call)):
+            runner = _dotted_name(node.func.value.func)
+            if runner in app_classes:
+                app_class = runner
+                break
+
+    is_kivy = imports_kivy_app or bool(app_classes)
+    return {'kind': 'kivy' if is_kivy else 'cli', 'app_class': app_class}
+
+def _dotted_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return f"{_dotted_name(node.value)}.{node.attr}"
+    return ''
+
+class Classifier:
+    """Caches scan_source results by content hash.
+
+    A second table maps a file's path, size and mtime to its hash, so a
+    repeat launch of an unchanged file does no source I/O at all.
+    """
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file or os.path.join(CACHE_DIR, 'kinds.json')
+        self.by_hash = {}
+        self.by_stat = {}
+        self.loaded = False
+
+    def classify(self, path):
+        self._load()
+        st = os.stat(path)
+        stat_key = f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+        digest = self.by_stat.get(stat_key)
+        if digest in self.by_hash:
+            return dict(self.by_hash[digest])
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self.by_hash:
+            self.by_hash[digest] = scan_source(data.decode('utf-8', errors='replace'))
+        self.by_stat[stat_key] = digest
+        self._save()
+        return dict(self.by_hash[digest])
+
+    def _load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            self.by_hash = data.get('by_hash', {})
+            self.by_stat = data.get('by_stat', {})
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        # Stat keys of deleted or rewritten files would otherwise pile up.
+        if len(self.by_stat) > 1000:
+            self.by_stat = dict(list(self.by_stat.items())[-500:])
+            live = set(self.by_stat.values())
+            self.by_hash = {k: v for k, v in self.by_hash.items() if k in live}
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'by_hash': self.by_hash, 'by_stat': self.by_stat}, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Error saving app kinds: {e}")
+
+classifier = Classifier()
@@ -0,0 +1,181 @@
+import os
+import selectors
+import threading
+from collections import deque
+from kivy.clock import Clock
+from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+DEFAULT_SCROLLBACK = 5000
+LINE_HEIGHT = 22
+# Longer lines are wrapped into several rows so every row has the same height.
+MAX_LINE_LENGTH = 200
+# Output with no newline for this long (binary data, say) is shown as a
+# line anyway, so an unfinished line cannot grow without bound.
+MAX_PARTIAL = 16 * 1024
+
+# ---------------- Pipe Reader ----------------
+# A progress bar redraws its line with \r; like a terminal, keep only what
+# comes after the last one (a \r at the very end may be half of a \r\n).
+def _overwrite(line):
+    cut = line.rfind(b'\r', 0, len(line) - 1)
+    return line[cut + 1:] if cut != -1 else line
+
+
+class PipeReader:
+    """Reads the output pipes of every running CLI app on one shared thread.
+
+    Both pipes of a child are watched together through `selectors`, so a
+    chatty stderr can never block stdout (or the other way around), and the
+    number of reader threads stays at one however many apps are running.
+    """
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+        self.pending = []
+
+    def watch(self, pipe, on_lines, on_close=None):
+        """Calls on_lines(list_of_str) from the reader thread as lines arrive."""
+        with self.lock:
+            self.pending.append((pipe, on_lines, on_close))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='zos-pipe-reader', daemon=True)
+                self.thread.start()
+        os.write(self.wake_w, b'\0')
+
+    def _run(self):
+        while True:
+            for key, mask in self.selector.select():
+                if key.data is None:
+                    self._register_pending()
+                else:
+                    self._read(key)
+
+    def _register_pending(self):
+        try:
+            os.read(self.wake_r, 4096)
+        except BlockingIOError:
+            pass
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for pipe, on_lines, on_close in pending:
+            try:
+                os.set_blocking(pipe.fileno(), False)
+                self.selector.register(pipe, selectors.EVENT_READ, [on_lines, on_close, b''])
+            except (OSError, ValueError) as e:
+                print(f"Could not watch app output: {e}")
+
+    def _read(self, key):
+        on_lines, on_close, partial = key.data
+        try:
+            chunk = os.read(key.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+
+        if chunk:
+            data = partial + chunk
+            *lines, partial = data.split(b'\n')
+            lines = [_overwrite(line) for line in lines]
+            partial = _overwrite(partial)
+            if len(partial) > MAX_PARTIAL:
+                lines.append(partial)
+                partial = b''
+            key.data[2] = partial
+            if lines:
+                self._call(on_lines, [line.decode('utf-8', errors='replace') for line in lines])
+            return
+
+        self.selector.unregister(key.fileobj)
+        key.fileobj.close()
+        if partial:
+            self._call(on_lines, [partial.decode('utf-8', errors='replace')])
+        if on_close:
+            self._call(on_close)
+
+    def _call(self, callback, *args):
+        # One console's broken callback must not stop the thread every
+        # other console reads through.
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Error handling app output: {e}")
+
+pipe_reader = PipeReader()
+
+# ---------------- Console View ----------------
+class ConsoleLine(Label):
+    def __init__(self, **kwargs):
+        super().__init__(halign='left', valign='middle', **kwargs)
+        self.bind(size=self.setter('text_size'))
+
+class ConsoleView(RecycleView):
+    """Scrollback view for CLI app output.
+
+    Lines live in a fixed-size ring buffer and only the rows on screen are
+    backed by widgets. Writes from any thread are queued and applied at most
+    once per frame, so a flood of output costs one relayout per frame.
+    """
+
+    def __init__(self, scrollback=DEFAULT_SCROLLBACK, font_name='Roboto', **kwargs):
+        super().__init__(**kwargs)
+        self.scrollback = scrollback
+        self.font_name = font_name
+        self.lines = deque(maxlen=scrollback)
+        self.queued = deque(maxlen=scrollback)
+        self.queue_lock = threading.Lock()
+        self.flush_trigger = Clock.create_trigger(self.flush)
+
+        layout = RecycleBoxLayout(orientation='vertical', default_size=(None, LINE_HEIGHT),
+                                  default_size_hint=(1, None), size_hint_y=None)
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.viewclass = ConsoleLine
+
+    def write_lines(self, lines, prefix=''):
+        """Queues lines for display; safe to call from any thread."""
+        with self.queue_lock:
+            for line in lines:
+                line = prefix + line.rstrip('\r')
+                while len(line) > MAX_LINE_LENGTH:
+                    self.queued.append(line[:MAX_LINE_LENGTH])
+                    line = line[MAX_LINE_LENGTH:]
+                self.queued.append(line)
+        self.flush_trigger()
+
+    def flush(self, *args):
+        with self.queue_lock:
+            if not self.queued:
+                return
+            self.lines.extend(self.queued)
+            self.queued.clear()
+
+        follow = self.scroll_y <= 0.001 or self.height >= self.children[0].height
+        font_name = self.font_name
+        self.data = [{'text': line, 'font_name': font_name} for line in self.lines]
+        if follow:
+            self.scroll_y = 0
+
+    def attach(self, process, on_first_output=None):
+        """Streams the stdout and stderr of a Popen-like process into the view.
+
+        on_first_output() is called once, from the reader thread, when the
+        first line arrives on either pipe.
+        """
+        waiting = [on_first_output]
+
+        def write(lines, prefix=''):
+            if waiting[0]:
+                callback, waiting[0] = waiting[0], None
+                callback()
+            self.write_lines(lines, prefix)
+
+        pipe_reader.watch(process.stdout, write)
+        pipe_reader.watch(process.stderr, lambda lines: write(lines, prefix='Error: '))
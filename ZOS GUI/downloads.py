@@ -0,0 +1,325 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+# Point this at a local stub server to exercise ZStore offline.
+GITHUB_API = os.environ.get('ZOS_GITHUB_API', 'https://api.github.com')
+CHUNK_SIZE = 64 * 1024
+
+class DownloadError(Exception):
+    pass
+
+class DownloadCancelled(DownloadError):
+    pass
+
+def parse_tree_url(url):
+    """Splits https://github.com/<user>/<repo>/tree/<branch>/<path>."""
+    parts = url.rstrip('/').split('/')
+    if len(parts) < 7 or parts[5] != 'tree':
+        raise ValueError(f"Not a GitHub folder URL: {url}")
+    return parts[3], parts[4], parts[6], '/'.join(parts[7:])
+
+def git_blob_sha(path):
+    """The sha GitHub's contents API reports for a file (a git blob hash)."""
+    sha = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def is_safe_folder(name):
+    """True for a plain folder name that stays inside the folder it is
+    joined to: no path separators, no '..', not hidden and not absolute."""
+    if not isinstance(name, str) or not name or name.startswith('.') or '..' in name:
+        return False
+    return not any(sep and sep in name for sep in ('/', '\\', os.sep, os.altsep)) and not os.path.isabs(name)
+
+def sha256_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+# ---------------- Progress ----------------
+class Progress:
+    """Byte and file counts for one install, safe to update from workers."""
+
+    def __init__(self, files, on_progress=None, interval=0.1):
+        self.lock = threading.Lock()
+        self.total_files = len(files)
+        self.total_bytes = sum(file.get('size') or 0 for file in files)
+        self.file_bytes = {}
+        self.done_files = 0
+        self.current = None
+        self.on_progress = on_progress
+        self.interval = interval
+        self.last_report = 0
+
+    def update(self, name, received):
+        with self.lock:
+            self.file_bytes[name] = received
+            self.current = name
+        self._report()
+
+    def file_done(self, name):
+        with self.lock:
+            self.done_files += 1
+        self._report(force=True)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'files': self.done_files,
+                'total_files': self.total_files,
+                'bytes': sum(self.file_bytes.values()),
+                'total_bytes': self.total_bytes,
+                'current': self.current,
+            }
+
+    def _report(self, force=False):
+        # Chunks arrive far faster than a UI can redraw; report at most
+        # every `interval` seconds, plus whenever a file completes.
+        if not self.on_progress:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.last_report < self.interval:
+                return
+            self.last_report = now
+        self.on_progress(self.snapshot())
+
+# ---------------- Download Engine ----------------
+class DownloadEngine:
+    """Installs app folders: parallel, streamed, resumable and all-or-nothing.
+
+    Files are streamed in chunks to a staging folder next to the target
+    (so the final rename is atomic), each one retried and resumed with a
+    Range request after a failure and checked against its hash. The target
+    only changes once every file has arrived; a failed install leaves the
+    staging folder behind so the next attempt picks up where it stopped.
+
+    Listings and transfers share one fixed pool of `max_workers` threads,
+    kept for the engine's lifetime. install() blocks, so callers run it as
+    a task-runtime task; it cannot use the runtime's pool for its files, or
+    installs waiting on their own files could fill it.
+    """
+
+    def __init__(self, max_workers=4, retries=3, timeout=15, chunk_size=CHUNK_SIZE):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.session = None
+        self.pool = None
+
+    def _pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='zos-download')
+            return self.pool
+
+    def _session(self):
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                # Enough pooled connections that no worker waits for one.
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers + 1)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.session = session
+            return self.session
+
+    # ---- Listing ----
+    def list_github_folder(self, url):
+        """Returns every file under a GitHub folder URL, subfolders included.
+
+        Each file is {'path': relative path, 'url', 'size', 'sha'}; folders
+        at the same depth are listed in parallel.
+        """
+        user, repo, branch, folder = parse_tree_url(url)
+        files = []
+        pending = [folder]
+        pool = self._pool()
+        while pending:
+            listings = list(pool.map(lambda path: self._list_contents(user, repo, branch, path), pending))
+            pending = []
+            for items in listings:
+                for item in items:
+                    relative = item['path'][len(folder):].lstrip('/') if folder else item['path']
+                    if item['type'] == 'file':
+                        files.append({'path': relative, 'url': item['download_url'],
+                                      'size': item.get('size'), 'sha': item.get('sha')})
+                    elif item['type'] == 'dir':
+                        pending.append(item['path'])
+        files.sort(key=lambda file: file['path'])
+        return files
+
+    def _list_contents(self, user, repo, branch, path):
+        import requests
+        api_url = f"{GITHUB_API}/repos/{user}/{repo}/contents/{path}"
+        try:
+            response = self._session().get(api_url, params={'ref': branch}, timeout=self.timeout)
+            response.raise_for_status()
+            items = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise DownloadError(f"Could not list '{path}': {e}")
+        return items if isinstance(items, list) else [items]
+
+    # ---- Installing ----
+    def install(self, files, apps_dir, folder, on_progress=None, cancel=None, extra_files=None):
+        """Downloads `files` and swaps them in as apps_dir/folder in one rename.
+
+        `folder` usually comes from a remote catalog, so it must be a plain
+        folder name (see is_safe_folder); anything else is refused before a
+        byte is written.
+
+        on_progress(snapshot) is called from worker threads; `cancel` is an
+        optional threading.Event that stops the install early, e.g. a task's
+        cancel_event. `extra_files` maps relative paths to bytes written
+        alongside, e.g. an install receipt.
+        """
+        if not is_safe_folder(folder):
+            raise DownloadError(f"Refusing to install into '{folder}': not a plain folder name.")
+        apps_dir = os.path.abspath(apps_dir)
+        target_dir = os.path.join(apps_dir, folder)
+        parent, name = os.path.split(target_dir)
+        if parent != apps_dir:
+            raise DownloadError(f"Refusing to install outside the apps folder: {target_dir}")
+        staging = os.path.join(parent, f".{name}.download")
+        os.makedirs(staging, exist_ok=True)
+        progress = Progress(files, on_progress)
+        # Set when one file fails, to stop the others; the caller's event is
+        # left alone.
+        stop = threading.Event()
+
+        destinations = [self._destination(staging, file['path']) for file in files]
+        for destination in destinations:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+
+        errors = []
+        pool = self._pool()
+        futures = [pool.submit(self.fetch, file, destination, progress, cancel, stop)
+                   for file, destination in zip(files, destinations)]
+        for future in futures:
+            try:
+                future.result()
+            except CancelledError:
+                continue
+            except DownloadError as e:
+                # No point finishing the rest; they resume next time.
+                errors.append(e)
+                stop.set()
+                for other in futures:
+                    other.cancel()
+        if errors:
+            # Report the real failure, not the cancellations it caused.
+            errors.sort(key=lambda e: isinstance(e, DownloadCancelled))
+            raise errors[0]
+
+        for relative, data in (extra_files or {}).items():
+            with open(self._destination(staging, relative), 'wb') as f:
+                f.write(data)
+        self._swap_in(staging, target_dir)
+        return target_dir
+
+    def _destination(self, staging, relative):
+        destination = os.path.normpath(os.path.join(staging, relative))
+        if not destination.startswith(staging + os.sep):
+            raise DownloadError(f"Refusing to write outside the app folder: {relative}")
+        return destination
+
+    def _swap_in(self, staging, target_dir):
+        old = None
+        if os.path.exists(target_dir):
+            # Updating: move the old version aside first, so there is never
+            # a moment with a half-old, half-new app.
+            old = f"{os.path.dirname(target_dir)}{os.sep}.{os.path.basename(target_dir)}.old-{os.getpid()}"
+            os.rename(target_dir, old)
+        try:
+            os.rename(staging, target_dir)
+        except OSError:
+            if old:
+                os.rename(old, target_dir)
+            raise
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def fetch(self, file, destination, progress=None, cancel=None, stop=None):
+        """Downloads one file to `destination`, resuming any earlier part.
+
+        Setting either of the `cancel` and `stop` events ends it early.
+        """
+        import requests
+        name = file['path']
+        if os.path.exists(destination) and self._verified(file, destination):
+            # Finished by an earlier, interrupted install.
+            if progress:
+                progress.update(name, os.path.getsize(destination))
+                progress.file_done(name)
+            return destination
+
+        part = destination + '.part'
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 5))
+            received = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {'Range': f"bytes={received}-"} if received else {}
+            try:
+                with self._session().get(file['url'], stream=True, timeout=self.timeout, headers=headers) as response:
+                    if received and response.status_code == 416:
+                        # The part is already complete.
+                        pass
+                    else:
+                        response.raise_for_status()
+                        if received and response.status_code != 206:
+                            # The server ignored the Range header; start over.
+                            received = 0
+                        with open(part, 'ab' if received else 'wb') as f:
+                            for chunk in response.iter_content(self.chunk_size):
+                                if (cancel is not None and cancel.is_set()) or (stop is not None and stop.is_set()):
+                                    raise DownloadCancelled("Download cancelled.")
+                                f.write(chunk)
+                                received += len(chunk)
+                                if progress:
+                                    progress.update(name, received)
+            except DownloadCancelled:
+                raise
+            except (requests.RequestException, OSError) as e:
+                last_error = e
+                continue
+
+            if not self._verified(file, part):
+                # Corrupt (or a stale part from an older version): refetch.
+                last_error = DownloadError(f"'{name}' failed its hash check.")
+                os.remove(part)
+                if progress:
+                    progress.update(name, 0)
+                continue
+            os.replace(part, destination)
+            if progress:
+                progress.file_done(name)
+            return destination
+
+        raise DownloadError(f"Could not download '{name}': {last_error}")
+
+    def _verified(self, file, path):
+        size = file.get('size')
+        if size is not None and os.path.getsize(path) != size:
+            return False
+        if file.get('sha256'):
+            return sha256_file(path) == file['sha256']
+        if file.get('sha'):
+            return git_blob_sha(path) == file['sha']
+        # Nothing to check against (e.g. a bare raw URL): a transfer that
+        # ended without an error is taken as complete.
+        return True
+
+download_engine = DownloadEngine()
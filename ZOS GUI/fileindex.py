@@ -0,0 +1,374 @@
+import os
+import sys
+import json
+import zlib
+import bisect
+import hashlib
+import threading
+from array import array
+
+from zpkg import CACHE_DIR
+
+# Only small text files get their contents indexed.
+TEXT_EXTENSIONS = ('.txt', '.md', '.py', '.kv', '.json', '.csv', '.log', '.ini', '.cfg',
+                   '.xml', '.html', '.htm', '.js', '.css', '.sh', '.yaml', '.yml')
+MAX_CONTENT_SIZE = 256 * 1024
+MAX_CONTENT_FILES = 20000
+# Each posting (a trigram found in a file) costs 4 bytes; files past this
+# many postings are left out of content search, so a big tree cannot use
+# up a phone's memory.
+MAX_POSTINGS = 8 * 1000 * 1000
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# ---------------- File Index ----------------
+class FileIndex:
+    """Persistent index of every file name under `root`, for instant search.
+
+    Like AppIndex, each folder is stored with the mtime it had when it was
+    listed, and `refresh` only re-lists folders whose mtime moved (a folder's
+    mtime changes whenever an entry is added, removed or renamed). Searching
+    never touches the filesystem: all names are kept in one newline-joined,
+    lower-cased string that str.find scans at C speed.
+
+    Once enable_content() is called, small text files also get a trigram
+    index of their contents, revalidated by file mtime and size. It lives
+    in its own file next to the name index and is only loaded or built
+    for content searches, since it means reading every text file.
+    """
+
+    def __init__(self, root, index_file=None):
+        self.root = os.path.abspath(root)
+        key = hashlib.sha1(self.root.encode('utf-8')).hexdigest()[:16]
+        self.index_file = index_file or os.path.join(CACHE_DIR, 'fileindex', key + '.json')
+        self.content_file = os.path.splitext(self.index_file)[0] + '.content'
+        self.lock = threading.Lock()
+        self.dirs = {}
+        # Content index: file number -> [path, mtime, size], path -> file
+        # number, and trigram -> sorted array of file numbers.
+        self.content = False
+        self.content_ready = False
+        self.content_files = []
+        self.content_ids = {}
+        self.postings = {}
+        self.posting_count = 0
+        self.content_skipped = 0
+        self.names = '\n'
+        self.starts = []
+        self.paths = []
+        self.loaded = False
+        self.refreshing = False
+
+    def load(self):
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        with self.lock:
+            if data.get('root') == self.root:
+                self.dirs = data.get('dirs', {})
+            self._rebuild()
+            self.loaded = True
+
+    def save(self):
+        data = {'root': self.root, 'dirs': self.dirs}
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+            tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"Error saving file index: {e}")
+
+    def enable_content(self):
+        """Turns on content search; the next refresh() builds its index."""
+        self.content = True
+
+    def _load_content(self):
+        # One JSON header line (files, trigrams, posting counts), then every
+        # posting array back to back as zlib-compressed 32-bit numbers.
+        try:
+            with open(self.content_file, 'rb') as f:
+                header = json.loads(f.readline())
+                blob = zlib.decompress(f.read())
+        except (OSError, ValueError, zlib.error):
+            return
+        if header.get('root') != self.root or header.get('byteorder') != sys.byteorder:
+            return
+        numbers = array('I')
+        numbers.frombytes(blob)
+        postings = {}
+        offset = 0
+        for gram, count in zip(header['grams'], header['counts']):
+            postings[gram] = numbers[offset:offset + count]
+            offset += count
+        files = header['files']
+        with self.lock:
+            self.content_files = files
+            self.content_ids = {file[0]: number for number, file in enumerate(files)}
+            self.postings = postings
+            self.posting_count = offset
+            self.content_ready = True
+
+    def _save_content(self):
+        grams = list(self.postings)
+        header = {'root': self.root, 'byteorder': sys.byteorder, 'files': self.content_files,
+                  'grams': grams, 'counts': [len(self.postings[gram]) for gram in grams]}
+        try:
+            os.makedirs(os.path.dirname(self.content_file) or '.', exist_ok=True)
+            tmp_file = f"{self.content_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                packer = zlib.compressobj(1)
+                for gram in grams:
+                    f.write(packer.compress(self.postings[gram].tobytes()))
+                f.write(packer.flush())
+            os.replace(tmp_file, self.content_file)
+        except OSError as e:
+            print(f"Error saving content index: {e}")
+
+    # ---- Updating ----
+    def refresh(self, on_progress=None):
+        """Revalidates against the filesystem; run it on a worker thread.
+
+        Costs one stat per folder plus a listing of each changed folder.
+        on_progress(folders_listed) is called now and then.
+        """
+        if not self.loaded:
+            self.load()
+        self.refreshing = True
+        try:
+            return self._refresh(on_progress)
+        finally:
+            self.refreshing = False
+
+    def _refresh(self, on_progress):
+        changed = False
+        listed = 0
+        seen = set()
+        pending = ['']
+        dirs = dict(self.dirs)
+        while pending:
+            rel = pending.pop()
+            seen.add(rel)
+            path = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            entry = dirs.get(rel)
+            if entry is None or entry[0] != mtime:
+                entry = dirs[rel] = self._list(path, mtime)
+                changed = True
+                listed += 1
+                if on_progress and listed % 200 == 0:
+                    on_progress(listed)
+            pending.extend(rel + '/' + name if rel else name for name in entry[2])
+
+        for rel in list(dirs):
+            if rel not in seen:
+                del dirs[rel]
+                changed = True
+
+        with self.lock:
+            self.dirs = dirs
+            if changed:
+                self._rebuild()
+        if changed:
+            self.save()
+
+        content_changed = False
+        if self.content:
+            if not self.content_ready:
+                self._load_content()
+            content_changed = self._refresh_content(dirs, on_progress)
+            if content_changed:
+                self._save_content()
+            self.content_ready = True
+        if on_progress:
+            on_progress(listed)
+        return changed or content_changed
+
+    def _list(self, path, mtime):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        # Symlinked folders are listed as files so that a
+                        # link loop can never make the walk endless.
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        else:
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return [mtime, files, subdirs]
+
+    def _refresh_content(self, dirs, on_progress=None):
+        wanted = {}
+        for rel, (mtime, files, subdirs) in dirs.items():
+            for name in files:
+                if name.lower().endswith(TEXT_EXTENSIONS) and len(wanted) < MAX_CONTENT_FILES:
+                    path = rel + '/' + name if rel else name
+                    try:
+                        st = os.stat(os.path.join(self.root, path))
+                    except OSError:
+                        continue
+                    wanted[path] = (st.st_mtime_ns, st.st_size)
+
+        changed = False
+        keep = [number for number, (rel, mtime, size) in enumerate(self.content_files)
+                if wanted.get(rel) == (mtime, size)]
+        if len(keep) < len(self.content_files):
+            self._drop_content(keep)
+            changed = True
+
+        skipped = 0
+        for rel, (mtime, size) in wanted.items():
+            if rel in self.content_ids:
+                continue
+            grams = ()
+            if size <= MAX_CONTENT_SIZE and self.posting_count < MAX_POSTINGS:
+                try:
+                    with open(os.path.join(self.root, rel), 'r', encoding='utf-8', errors='ignore') as f:
+                        grams = trigrams(f.read().lower())
+                except OSError:
+                    pass
+            elif size <= MAX_CONTENT_SIZE:
+                # Over the cap: not recorded, so a later refresh retries it
+                # if room has been freed by then.
+                skipped += 1
+                continue
+            with self.lock:
+                number = len(self.content_files)
+                self.content_files.append([rel, mtime, size])
+                self.content_ids[rel] = number
+                postings = self.postings
+                for gram in grams:
+                    numbers = postings.get(gram)
+                    if numbers is None:
+                        numbers = postings[gram] = array('I')
+                    numbers.append(number)
+                self.posting_count += len(grams)
+            changed = True
+            if on_progress and len(self.content_files) % 500 == 0:
+                on_progress(0)
+        self.content_skipped = skipped
+        return changed
+
+    def _drop_content(self, keep):
+        # Renumbers the files kept and copies their postings, then swaps the
+        # result in; searches meanwhile still use the old arrays.
+        renumber = {old: new for new, old in enumerate(keep)}
+        postings = {}
+        for gram, numbers in self.postings.items():
+            kept = array('I', [renumber[number] for number in numbers if number in renumber])
+            if kept:
+                postings[gram] = kept
+        files = [self.content_files[number] for number in keep]
+        with self.lock:
+            self.content_files = files
+            self.content_ids = {file[0]: number for number, file in enumerate(files)}
+            self.postings = postings
+            self.posting_count = sum(len(numbers) for numbers in postings.values())
+
+    def _rebuild(self):
+        # Flatten into a newline-joined name string plus parallel arrays, so
+        # a match offset maps back to its path with a bisect.
+        names = []
+        paths = []
+        for rel in sorted(self.dirs):
+            mtime, files, subdirs = self.dirs[rel]
+            # (A newline in a name would split it in two.)
+            for name in subdirs:
+                names.append(name.lower().replace('\n', ' '))
+                paths.append((rel + '/' + name if rel else name, True))
+            for name in files:
+                names.append(name.lower().replace('\n', ' '))
+                paths.append((rel + '/' + name if rel else name, False))
+        starts = []
+        offset = 1
+        for name in names:
+            starts.append(offset)
+            offset += len(name) + 1
+        self.names = '\n' + '\n'.join(names) + '\n'
+        self.starts = starts
+        self.paths = paths
+
+    # ---- Searching ----
+    def search(self, query, limit=200):
+        """Ranked matches for `query`: [(relative path, is_dir), ...].
+
+        Exact names come first, then names starting with the query, then
+        names containing it; shorter paths first within each group. Every
+        word of the query has to appear in the name.
+        """
+        words = query.lower().split()
+        if not words:
+            return []
+        with self.lock:
+            names, starts, paths = self.names, self.starts, self.paths
+        # Scan for the longest word; check the others on the hits only.
+        word = max(words, key=len)
+        others = [w for w in words if w is not word]
+        cap = limit * 20
+        results = []
+        seen = set()
+        # Two passes over the name string: names starting with the word
+        # (exact names ranked first), then names containing it anywhere.
+        for pattern, offset in (('\n' + word, 1), (word, 0)):
+            group = []
+            position = names.find(pattern)
+            while position != -1 and len(group) < cap:
+                index = bisect.bisect_right(starts, position + offset) - 1
+                if index not in seen:
+                    seen.add(index)
+                    end = names.find('\n', starts[index])
+                    name = names[starts[index]:end]
+                    if all(w in name for w in others):
+                        group.append((name != word, len(paths[index][0]), index))
+                position = names.find(pattern, position + 1)
+            group.sort()
+            results.extend(paths[index] for rank, length, index in group)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def search_content(self, query, limit=200):
+        """Text files whose contents contain every trigram of `query`.
+
+        Candidates are not re-read to confirm, so a rare false positive is
+        possible; queries under three characters match nothing.
+        """
+        grams = trigrams(query.lower())
+        if not grams:
+            return []
+        # The refresh worker appends to the postings under the same lock.
+        with self.lock:
+            lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+            if not lists[0]:
+                return []
+            matches = set(lists[0])
+            for other in lists[1:]:
+                matches.intersection_update(other)
+                if not matches:
+                    return []
+            paths = [self.content_files[number][0] for number in matches]
+        return [(rel, False) for rel in sorted(paths, key=len)[:limit]]
+
+indexes = {}
+
+def get_index(root):
+    """The shared FileIndex for `root` (kept in memory across app launches)."""
+    key = os.path.abspath(root)
+    index = indexes.get(key)
+    if index is None:
+        index = indexes[key] = FileIndex(root)
+    return index
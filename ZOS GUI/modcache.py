@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import marshal
+import hashlib
+import importlib.util
+import importlib.machinery
+
+from zpkg import CACHE_DIR
+
+# ---------------- Code Cache ----------------
+class CodeCache:
+    """Persistent compiled-code cache keyed by source hash and Python version.
+
+    Unlike __pycache__ it does not care where a file lives, so apps run from
+    extracted packages (or straight out of an archive) compile only once.
+    Every edit of an app leaves a new entry behind, so like the extraction
+    cache it is capped at max_bytes, dropping least recently used entries.
+    """
+
+    def __init__(self, root=None, max_bytes=64 * 1024 * 1024):
+        self.root = root or os.path.join(CACHE_DIR, 'bytecode')
+        self.max_bytes = max_bytes
+        self.tag = sys.implementation.cache_tag or 'python'
+
+    def get_code(self, source_bytes, filename):
+        # The filename is part of the key because it is baked into the code
+        # objects (and so into tracebacks).
+        digest = hashlib.sha256(filename.encode('utf-8') + b'\0' + source_bytes).hexdigest()
+        cache_file = os.path.join(self.root, f"{digest[:40]}.{self.tag}.code")
+        try:
+            with open(cache_file, 'rb') as f:
+                code = marshal.load(f)
+            # The mtime doubles as the entry's last-used time for LRU.
+            os.utime(cache_file)
+            return code
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        code = compile(source_bytes, filename, 'exec', dont_inherit=True)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                marshal.dump(code, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Error caching bytecode: {e}")
+        else:
+            self.evict()
+        return code
+
+    def evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        try:
+            scan = list(os.scandir(self.root))
+        except OSError:
+            return
+        for entry in scan:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if entry.name.endswith('.tmp'):
+                # Leftovers from a crashed write; live ones are recent.
+                if time.time() - st.st_mtime > 3600:
+                    _remove(entry.path)
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+        entries.sort()
+        for used, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+code_cache = CodeCache()
+
+class CachedSourceLoader(importlib.machinery.SourceFileLoader):
+    """SourceFileLoader that compiles through the shared code cache."""
+
+    def get_code(self, fullname):
+        path = self.get_filename(fullname)
+        return code_cache.get_code(self.get_data(path), path)
+
+# ---------------- Module Loading ----------------
+# Modules kept alive between launches when "keep loaded" is on, by path:
+# (entry module, stamp, the app's other modules).
+loaded_modules = {}
+
+def module_name_for(path):
+    # One module name per file, so two apps never clobber each other.
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    return f"zos_app_{digest}"
+
+def load_module(path, keep_loaded=False, loader=None, session=None):
+    """Imports the app at `path`, reusing the executed module if kept loaded.
+
+    `loader` is for apps that are not plain files (see zpkgimport); it needs
+    path_stats() like SourceFileLoader and may name a `path_entry` its
+    sibling modules are imported from.
+
+    Sibling modules are imported under their own names (`import utils`), so
+    every module the app added from its folder is taken out of sys.modules
+    again, or another app's `import utils` would get this one. Kept modules
+    stay until `session` (an AppSession, which gets them all) closes.
+    """
+    path = os.path.abspath(path)
+    name = module_name_for(path)
+    if loader is None:
+        loader = CachedSourceLoader(name, path)
+    stats = loader.path_stats(path)
+    stamp = (stats['mtime'], stats.get('size'))
+    if keep_loaded:
+        module, loaded_stamp, siblings = loaded_modules.get(path, (None, None, []))
+        if module is not None and loaded_stamp == stamp:
+            # The last session took them out of sys.modules when it closed.
+            for kept in [module] + siblings:
+                sys.modules[kept.__name__] = kept
+            _add_to_session(session, module, siblings)
+            return module
+
+    spec = importlib.util.spec_from_file_location(name, path, loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    # Multi-file apps import their other modules from next to the entry
+    # script, as they would when run with `python app.py`.
+    app_dir = getattr(loader, 'path_entry', None) or os.path.dirname(path)
+    before = set(sys.modules)
+    sys.modules[name] = module
+    added_path = app_dir not in sys.path
+    if added_path:
+        sys.path.insert(0, app_dir)
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        for added in [module] + _app_modules(before, app_dir):
+            _forget(added)
+        raise
+    finally:
+        if added_path:
+            sys.path.remove(app_dir)
+
+    siblings = [added for added in _app_modules(before, app_dir) if added is not module]
+    if keep_loaded:
+        loaded_modules[path] = (module, stamp, siblings)
+    else:
+        for added in [module] + siblings:
+            _forget(added)
+        loaded_modules.pop(path, None)
+    _add_to_session(session, module, siblings)
+    return module
+
+def _app_modules(before, app_dir):
+    # New since `before` and loaded from the app's own folder (or archive);
+    # libraries it imported for the first time stay loaded.
+    prefix = os.path.join(app_dir, '')
+    return [module for name, module in list(sys.modules.items())
+            if name not in before and (getattr(module, '__file__', None) or '').startswith(prefix)]
+
+def _add_to_session(session, module, siblings):
+    if session is not None:
+        for added in [module] + siblings:
+            session.add_module(added)
+
+def _forget(module):
+    # Only if the name still means this module, not a later app's.
+    if sys.modules.get(module.__name__) is module:
+        del sys.modules[module.__name__]
+
+def unload_all():
+    """Forgets every kept module, e.g. once keep_apps_loaded is turned off."""
+    for module, stamp, siblings in loaded_modules.values():
+        for kept in [module] + siblings:
+            _forget(kept)
+    loaded_modules.clear()
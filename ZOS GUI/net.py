@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+
+from zpkg import CACHE_DIR
+from tasks import runtime, TaskQueueFull
+
+# Point this at a local stub server to exercise the weather code offline.
+WEATHER_URL = os.environ.get('ZOS_WEATHER_URL', 'https://wttr.in')
+WEATHER_TTL = 600
+CITY_TTL = 7 * 24 * 3600
+
+# ---------------- HTTP Client ----------------
+class HttpClient:
+    """Shared HTTP layer: one keep-alive session, an on-disk TTL cache and
+    request coalescing.
+
+    Callbacks get a response dict ({'url', 'status', 'text', 'fetched',
+    'stale'}) or None if the request failed, and run on a worker thread (or
+    on the caller's thread when served straight from the cache). Requests
+    run on the shared task runtime.
+    """
+
+    def __init__(self, cache_dir=None, pool_size=4):
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'http')
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.session = None
+        self.inflight = {}
+        self.memory = {}
+
+    def _session(self):
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=1)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.session = session
+            return self.session
+
+    def request(self, url, headers=None, params=None, timeout=5):
+        """A plain GET on the shared session, bypassing the cache. Blocks, so
+        call it from a worker (e.g. a runtime task); returns None on failure."""
+        try:
+            return self._session().get(url, headers=headers, params=params, timeout=timeout)
+        except Exception as e:
+            print(f"Request to {url} failed: {e}")
+            return None
+
+    def get(self, url, ttl, callback, timeout=5):
+        """Serves `url` from the cache when possible (stale-while-revalidate).
+
+        A fresh cached response is handed to callback right away. A stale one
+        is handed over right away too, followed by the revalidated response
+        once it arrives. With nothing cached, callback waits for the network.
+        Raises TaskQueueFull (on the UI thread) if nothing is cached and the
+        request cannot be queued.
+        """
+        entry = self.cached(url)
+        if entry is not None:
+            age = time.time() - entry['fetched']
+            callback(dict(entry, stale=age > ttl))
+            if age <= ttl:
+                return
+            try:
+                self.fetch(url, timeout, lambda response: response and callback(response))
+            except TaskQueueFull:
+                # The stale copy will do until the next call revalidates it.
+                pass
+        else:
+            self.fetch(url, timeout, callback)
+
+    def fetch(self, url, timeout=5, callback=None):
+        """Fetches `url`; concurrent fetches of the same URL share one request.
+
+        Returns a Future of the response (None on failure).
+        """
+        with self.lock:
+            future = self.inflight.get(url)
+            leader = future is None
+            if leader:
+                future = self.inflight[url] = Future()
+        if leader:
+            # Submitted outside the lock: submit() may block on a worker
+            # thread, and every running fetch needs the lock in _session().
+            try:
+                task = runtime.submit(self._fetch, url, timeout, name='http fetch')
+            except Exception:
+                # Whoever joined this request in the meantime gets a failure.
+                self._done(url, future, None)
+                raise
+            task.add_done_callback(lambda task: self._done(url, future, task))
+        if callback:
+            future.add_done_callback(lambda future: callback(future.result()))
+        return future
+
+    def _done(self, url, future, task):
+        with self.lock:
+            if self.inflight.get(url) is future:
+                del self.inflight[url]
+        try:
+            response = None if task is None or task.cancelled else task.result()
+        except Exception:
+            response = None
+        future.set_result(response)
+
+    def _fetch(self, url, timeout):
+        try:
+            response = self._session().get(url, timeout=timeout)
+        except Exception as e:
+            print(f"Request to {url} failed: {e}")
+            return None
+        entry = {'url': url, 'status': response.status_code, 'text': response.text, 'fetched': time.time()}
+        # Server errors are not worth remembering; 404s are (unknown city).
+        if response.status_code < 500:
+            self._store(url, entry)
+        return dict(entry, stale=False)
+
+    def cached(self, url):
+        entry = self.memory.get(url)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._cache_file(url), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        self.memory[url] = entry
+        return entry
+
+    def _store(self, url, entry):
+        self.memory[url] = entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_file = self._cache_file(url)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Error caching {url}: {e}")
+
+    def _cache_file(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+http_client = HttpClient()
+
+# ---------------- Weather ----------------
+def get_weather(city, callback):
+    """Calls callback(text) with e.g. "Sunny +21°C", or "Weather N/A"."""
+    def on_response(response):
+        if response and response['status'] == 200:
+            callback(response['text'].strip())
+        else:
+            callback("Weather N/A")
+
+    try:
+        http_client.get(f"{WEATHER_URL}/{city or 'Erbil'}?format=%C+%t", WEATHER_TTL, on_response, timeout=3)
+    except TaskQueueFull:
+        callback("Weather N/A")
+
+def check_city(city, callback):
+    """Calls callback(True/False), or callback(None) if the network failed."""
+    def on_response(response):
+        if response is None or response['status'] >= 500:
+            callback(None)
+            return
+        try:
+            data = json.loads(response['text'])
+        except ValueError:
+            data = None
+        callback(isinstance(data, dict) and 'current_condition' in data)
+
+    try:
+        http_client.get(f"{WEATHER_URL}/{city}?format=j1", CITY_TTL, on_response)
+    except TaskQueueFull:
+        # Too busy to ask right now; reported like a network failure.
+        callback(None)
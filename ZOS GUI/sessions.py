@@ -0,0 +1,239 @@
+import os
+import gc
+import sys
+import time
+import itertools
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.animation import Animation
+from kivy.uix.widget import Widget
+from kivy.core.window import Window
+
+from zpkg import extraction_cache
+from supervisor import EXITED
+from tasks import runtime
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+def current_rss():
+    """Resident memory of this process in bytes (0 where /proc is missing)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+# ---------------- App Session ----------------
+class AppSession:
+    """Everything one app launch created, torn down together by close().
+
+    Launch code registers what it makes here instead of on the host: pinned
+    packages, bindings on host widgets, Clock events, the app's modules, its
+    App instance and root widget, and its process for CLI apps.
+    """
+
+    def __init__(self, manager, session_id, name, path):
+        self.manager = manager
+        self.id = session_id
+        self.name = name
+        self.path = path
+        self.started = time.time()
+        self.packages = []
+        self.bindings = []
+        self.events = []
+        self.modules = []
+        self.app = None
+        self.host_app = None
+        self.view = None
+        self.task = None
+        self.closed = False
+        self.host_observers = self._snapshot_host_observers()
+
+    def pin(self, extracted_dir):
+        """Keeps an extracted package from being evicted until close()."""
+        self.packages.append(extracted_dir)
+        return extracted_dir
+
+    def bind(self, obj, **kwargs):
+        obj.bind(**kwargs)
+        self.bindings.append((obj, kwargs))
+
+    def schedule(self, callback, timeout=0, interval=False):
+        if interval:
+            event = Clock.schedule_interval(callback, timeout)
+        else:
+            event = Clock.schedule_once(callback, timeout)
+        self.events.append(event)
+        return event
+
+    def add_module(self, module):
+        if module not in self.modules:
+            self.modules.append(module)
+
+    def create_app(self, app_class, *args, **kwargs):
+        # Creating any App makes it Kivy's "running app"; remember who that
+        # really is so close() can hand the title back.
+        self.host_app = App.get_running_app()
+        self.app = app_class(*args, **kwargs)
+        return self.app
+
+    @property
+    def running(self):
+        return self.task is not None and self.task.state != EXITED
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.app is not None:
+            try:
+                self.app.dispatch('on_stop')
+            except Exception as e:
+                print(f"Error stopping {self.name}: {e}", file=sys.stderr)
+            if App._running_app is self.app:
+                App._running_app = self.host_app
+
+        # Background work the app started must not call back into it.
+        for owner in (self, self.app, self.view):
+            if owner is not None:
+                runtime.cancel_owner(owner)
+
+        for obj, kwargs in self.bindings:
+            obj.unbind(**kwargs)
+        for event in self.events:
+            event.cancel()
+        self._cancel_app_events()
+        self._release_host_bindings()
+
+        if self.view is not None:
+            for widget in self.view.walk(restrict=True):
+                Animation.cancel_all(widget)
+            if self.view.parent:
+                self.view.parent.remove_widget(self.view)
+
+        for extracted_dir in self.packages:
+            extraction_cache.release(extracted_dir)
+        # Kept app modules go back in on the next launch (see modcache);
+        # until then another app may need their names.
+        for module in self.modules:
+            if sys.modules.get(module.__name__) is module:
+                del sys.modules[module.__name__]
+
+        self.packages = []
+        self.bindings = []
+        self.host_observers = []
+        self.events = []
+        self.modules = []
+        self.app = self.host_app = self.view = self.task = None
+        self.manager._forget(self)
+
+    def _cancel_app_events(self):
+        # Timers an app scheduled for itself never get cancelled by the app
+        # (it was never really "stopped"), and they keep the whole app alive.
+        names = {module.__name__ for module in self.modules}
+        if not names:
+            return
+        for event in Clock.get_events():
+            callback = event.get_callback()
+            if callback is None:
+                continue
+            module = getattr(callback, '__module__', None)
+            if module is None and hasattr(callback, '__self__'):
+                module = type(callback.__self__).__module__
+            if module in names:
+                event.cancel()
+
+    def _snapshot_host_observers(self):
+        snapshot = []
+        for name in list(Window.properties()) + list(Window.events()):
+            known = {id(entry[0]) for entry in Window.get_property_observers(name, args=True)}
+            snapshot.append((Window, name, known))
+        return snapshot
+
+    def _release_host_bindings(self):
+        # App widgets (dropdowns, text inputs, ...) bind to Window with weak
+        # methods, and Kivy only drops those once the event next fires. Undo
+        # what was bound during this session by widgets that are no longer on
+        # screen, so they do not pile up across launches.
+        for obj, name, known in self.host_observers:
+            for callback, largs, kwargs, is_ref, uid in obj.get_property_observers(name, args=True):
+                if id(callback) in known:
+                    continue
+                method = callback() if is_ref else callback
+                owner = getattr(method, '__self__', None)
+                if not isinstance(owner, Widget) or owner.get_root_window() is not None:
+                    continue
+                if uid:
+                    obj.unbind_uid(name, uid)
+                else:
+                    obj.unbind(**{name: method})
+
+    def report(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'age': round(time.time() - self.started, 1),
+            'packages': len(self.packages),
+            'bindings': len(self.bindings),
+            'events': len([event for event in self.events if event.is_triggered]),
+            'modules': [module.__name__ for module in self.modules],
+            'task': self.task.state if self.task else None,
+        }
+
+# ---------------- Session Manager ----------------
+class SessionManager:
+    """Tracks live app sessions and reports on what the process holds."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.watched = []
+
+    def open(self, name, path):
+        session = AppSession(self, next(self.ids), name, path)
+        self.sessions[session.id] = session
+        return session
+
+    def _forget(self, session):
+        self.sessions.pop(session.id, None)
+
+    def for_task(self, task):
+        for session in self.sessions.values():
+            if session.task is task:
+                return session
+        return None
+
+    def close_all(self):
+        for session in list(self.sessions.values()):
+            session.close()
+
+    def watch(self, name, obj, prop):
+        """Includes the number of callbacks bound to obj.prop in report()."""
+        if not any(watched[1] is obj and watched[2] == prop for watched in self.watched):
+            self.watched.append((name, obj, prop))
+
+    def report(self, count_objects=False):
+        """Live sessions plus process-wide counters, for leak hunting."""
+        report = {
+            'sessions': [session.report() for session in self.sessions.values()],
+            'clock_events': len(Clock.get_events()),
+            'bindings': {name: len(obj.get_property_observers(prop)) for name, obj, prop in self.watched},
+            'app_modules': len([name for name in sys.modules if name.startswith('zos_app_')]),
+            'rss': current_rss(),
+        }
+        if count_objects:
+            # Slow (walks the whole heap); meant for leak tests, not the UI.
+            gc.collect()
+            report['objects'] = len(gc.get_objects())
+        return report
+
+    def summary(self):
+        report = self.report()
+        return (f"Sessions {len(report['sessions'])}  Clock events {report['clock_events']}  "
+                f"RSS {report['rss'] / 1048576:.1f} MB")
+
+session_manager = SessionManager()
@@ -0,0 +1,174 @@
+import os
+import atexit
+import threading
+
+from tracing import tracer
+
+# ---------------- Settings Store ----------------
+class SettingsStore:
+    """In-memory view of a key=value settings file.
+
+    The file is parsed once; reads are served from memory. Changes notify
+    subscribers straight away and reach the disk through a debounced,
+    atomic write-and-rename, so a burst of changes costs one write and a
+    crash never leaves a half-written file behind.
+    """
+
+    def __init__(self, path, flush_delay=0.5):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.lock = threading.RLock()
+        # Mutated in place so references handed out stay current. Treat it
+        # as read-only; changes must go through set/update/remove/replace.
+        self.values = {}
+        self.loaded = False
+        self.on_disk = False
+        self.subscribers = []
+        self.flush_timer = None
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return self.values
+            self.loaded = True
+            self.values.clear()
+            self.values.update(self._read())
+            return self.values
+
+    def _read(self):
+        settings = {}
+        if os.path.exists(self.path):
+            self.on_disk = True
+            with tracer.span('settings read', 'settings', path=self.path):
+                try:
+                    with open(self.path, 'r') as f:
+                        for line in f.readlines():
+                            try:
+                                key, value = line.strip().split('=', 1)
+                                settings[key] = value
+                            except ValueError:
+                                pass
+                except IOError as e:
+                    print(f"Error loading settings: {e}")
+        return settings
+
+    def exists(self):
+        self.load()
+        return self.on_disk
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    def all(self):
+        with self.lock:
+            return dict(self.load())
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        with self.lock:
+            new_values = dict(self.load())
+            new_values.update(values)
+        self.replace(new_values)
+
+    def remove(self, key):
+        with self.lock:
+            new_values = dict(self.load())
+            new_values.pop(key, None)
+        self.replace(new_values)
+
+    def replace(self, values):
+        """Swaps in a whole new set of values, e.g. from the Settings app."""
+        with self.lock:
+            old_values = dict(self.load())
+            values = {key: str(value) for key, value in values.items()}
+            changes = {key: values.get(key) for key in set(old_values) | set(values)
+                       if old_values.get(key) != values.get(key)}
+            if not changes and self.on_disk:
+                return
+            self.values.clear()
+            self.values.update(values)
+            self._schedule_flush()
+        self._notify(changes)
+
+    def reload(self):
+        """Picks up edits made to the file behind the store's back."""
+        with self.lock:
+            self.loaded = True
+            values = self._read()
+        self.replace(values)
+
+    def subscribe(self, callback, keys=None):
+        """Calls callback(changes) when any of `keys` (or any key) changes.
+
+        `changes` maps each changed key to its new value, or None if removed.
+        """
+        with self.lock:
+            self.subscribers.append((callback, set(keys) if keys else None))
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = [(cb, keys) for cb, keys in self.subscribers if cb != callback]
+
+    def _notify(self, changes):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback, keys in subscribers:
+            relevant = changes if keys is None else {k: v for k, v in changes.items() if k in keys}
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    print(f"Error in settings subscriber: {e}")
+
+    def _schedule_flush(self):
+        if self.flush_timer:
+            self.flush_timer.cancel()
+        self.flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self.flush_timer.daemon = True
+        self.flush_timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.flush_timer:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            values = dict(self.values)
+            with tracer.span('settings write', 'settings', path=self.path):
+                try:
+                    settings_dir = os.path.dirname(self.path)
+                    if settings_dir:
+                        os.makedirs(settings_dir, exist_ok=True)
+                    tmp_file = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_file, 'w') as f:
+                        for key, value in values.items():
+                            f.write(f"{key}={value}\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_file, self.path)
+                    self.on_disk = True
+                except IOError as e:
+                    print(f"Error saving settings: {e}")
+
+    def flush_pending(self):
+        with self.lock:
+            pending = self.flush_timer is not None
+        if pending:
+            self.flush()
+
+stores = {}
+stores_lock = threading.Lock()
+
+def get_settings(path):
+    """Returns the shared store for `path`, so every user sees the same values."""
+    key = os.path.normcase(os.path.abspath(path))
+    with stores_lock:
+        if key not in stores:
+            stores[key] = SettingsStore(path)
+        return stores[key]
+
+@atexit.register
+def _flush_all():
+    for store in list(stores.values()):
+        store.flush_pending()
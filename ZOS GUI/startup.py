@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import time
+
+from tracing import tracer
+
+PROFILE_FLAG = '--profile-startup'
+
+def _process_age():
+    """Seconds since the process was exec'd (Linux/Android only, else 0)."""
+    try:
+        with open('/proc/self/stat', 'rb') as f:
+            start_ticks = int(f.read().rsplit(b')', 1)[1].split()[19])
+        with open('/proc/uptime', 'rb') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, IndexError, ValueError, AttributeError):
+        return 0.0
+
+# ---------------- Startup Profiler ----------------
+class StartupProfiler:
+    """Records how long each startup phase takes, up to time-to-interactive.
+
+    Phases are marked in order; each one's duration is the time since the
+    previous mark. Marks are cheap enough to leave in when profiling is off.
+    While tracing is on, each phase is also recorded as a 'startup' span.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        now = time.perf_counter()
+        # The interpreter itself started before this module was imported.
+        self.origin = now - _process_age()
+        self.phases = [('interpreter', now)]
+        self.finished = False
+        # Line the trace up with process start, so the interpreter's own
+        # startup shows too.
+        tracer.origin = min(tracer.origin, self.origin)
+        tracer.complete('interpreter', self.origin, now, 'startup')
+
+    def mark(self, phase):
+        if not self.finished:
+            now = time.perf_counter()
+            tracer.complete(phase, self.phases[-1][1], now, 'startup')
+            self.phases.append((phase, now))
+
+    def elapsed(self):
+        return time.perf_counter() - self.origin
+
+    def report(self):
+        rows = []
+        previous = self.origin
+        for phase, at in self.phases:
+            rows.append({'phase': phase, 'ms': round((at - previous) * 1000, 1), 'at_ms': round((at - self.origin) * 1000, 1)})
+            previous = at
+        return rows
+
+    def finish(self, report_file=None):
+        """Marks time-to-interactive and prints the report if profiling."""
+        if self.finished:
+            return
+        self.mark('interactive')
+        self.finished = True
+        if not self.enabled:
+            return
+        rows = self.report()
+        print("Startup profile:", file=sys.stderr)
+        for row in rows:
+            print(f"  {row['phase']:<24}{row['ms']:>9.1f} ms{row['at_ms']:>10.1f} ms", file=sys.stderr)
+        print(f"  Time to interactive: {rows[-1]['at_ms']:.1f} ms", file=sys.stderr)
+        if report_file:
+            try:
+                os.makedirs(os.path.dirname(report_file) or '.', exist_ok=True)
+                with open(report_file, 'w') as f:
+                    json.dump(rows, f, indent=1)
+            except OSError as e:
+                print(f"Error saving startup profile: {e}", file=sys.stderr)
+
+# Kivy parses sys.argv when it is imported and rejects options it does not
+# know, so our flag has to be taken out before any Kivy import.
+profiler = StartupProfiler(enabled=PROFILE_FLAG in sys.argv)
+if profiler.enabled:
+    sys.argv.remove(PROFILE_FLAG)
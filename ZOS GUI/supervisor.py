@@ -0,0 +1,437 @@
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+RUNNING = 'running'
+SUSPENDED = 'suspended'
+EXITED = 'exited'
+
+# How long an app gets to exit after SIGTERM before stop() kills it.
+KILL_GRACE = 3.0
+# A delegated cgroup v2 directory ZOS may create per-app groups in, e.g. one
+# from `systemd-run --user --scope -p Delegate=yes`. Without it only rlimits
+# and nice apply.
+CGROUP_ENV = 'ZOS_CGROUP'
+CGROUP_PERIOD = 100000
+
+try:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+    PAGE_SIZE = 4096
+
+# ---------------- Resource Policy ----------------
+class ResourcePolicy:
+    """Limits put on a child app as it is spawned; None means no limit.
+
+    cpu_seconds, memory_mb and max_files become rlimits of the process
+    (RLIMIT_CPU, RLIMIT_AS, RLIMIT_NOFILE) and nice lowers its priority, so
+    a busy app loses the CPU to the UI thread rather than the other way
+    round. With a delegated cgroup, cpu_percent, memory_mb and max_tasks
+    also cap the app together with anything it starts.
+    """
+
+    FIELDS = ('cpu_seconds', 'memory_mb', 'max_files', 'nice', 'cpu_percent', 'max_tasks')
+    # Where the defaults for every app come from.
+    SETTINGS_KEYS = {field: f'app_{field}' for field in FIELDS}
+
+    def __init__(self, **limits):
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        self.update(limits)
+
+    def update(self, limits):
+        """Takes limits from a dict of field to number (or numeric string);
+        unknown or malformed entries are reported and skipped."""
+        for field, value in limits.items():
+            if field not in self.FIELDS:
+                print(f"Unknown resource limit '{field}'", file=sys.stderr)
+                continue
+            if value in (None, ''):
+                setattr(self, field, None)
+                continue
+            try:
+                setattr(self, field, int(value))
+            except (TypeError, ValueError):
+                print(f"Invalid value for resource limit '{field}': {value!r}", file=sys.stderr)
+        return self
+
+    @classmethod
+    def from_settings(cls, settings, overrides=None):
+        """The defaults from settings (app_memory_mb=512, ...), then an app's
+        own `limits` from its manifest on top."""
+        policy = cls(nice=settings.get('app_nice', 5))
+        policy.update({field: settings[key] for field, key in cls.SETTINGS_KEYS.items() if key in settings})
+        if isinstance(overrides, dict):
+            policy.update(overrides)
+        return policy
+
+    @staticmethod
+    def parse(pairs):
+        """['memory_mb=256', ...] (as given on a command line) to a dict."""
+        limits = {}
+        for pair in pairs:
+            field, sep, value = pair.partition('=')
+            if not sep or field not in ResourcePolicy.FIELDS:
+                raise ValueError(f"Bad limit '{pair}'; expected one of {', '.join(ResourcePolicy.FIELDS)} as KEY=VALUE.")
+            limits[field] = int(value)
+        return limits
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+
+    def apply(self, pid):
+        """Applies the rlimits and nice level to a freshly spawned process.
+
+        This is done from the parent with prlimit()/setpriority() rather than
+        in a preexec_fn, which is unsafe in a process with threads (ZOS has
+        its workers), and works the same for apps forked by a zygote.
+        """
+        if resource is not None and hasattr(resource, 'prlimit'):
+            if self.cpu_seconds:
+                # The soft limit sends SIGXCPU; the hard one a second later kills.
+                self._prlimit(pid, resource.RLIMIT_CPU, self.cpu_seconds, self.cpu_seconds + 1)
+            if self.memory_mb:
+                size = self.memory_mb * 1048576
+                self._prlimit(pid, resource.RLIMIT_AS, size, size)
+            if self.max_files:
+                self._prlimit(pid, resource.RLIMIT_NOFILE, self.max_files, self.max_files)
+        if self.nice and hasattr(os, 'setpriority'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, max(os.getpriority(os.PRIO_PROCESS, pid), self.nice))
+            except OSError as e:
+                print(f"Could not lower the priority of process {pid}: {e}", file=sys.stderr)
+
+    def _prlimit(self, pid, which, soft, hard):
+        try:
+            # An unprivileged process cannot raise a hard limit, only lower it.
+            current_soft, current_hard = resource.prlimit(pid, which)
+            if current_hard != resource.RLIM_INFINITY:
+                soft, hard = min(soft, current_hard), min(hard, current_hard)
+            resource.prlimit(pid, which, (soft, hard))
+        except (OSError, ValueError) as e:
+            print(f"Could not set resource limit for process {pid}: {e}", file=sys.stderr)
+
+    def cgroup_limits(self):
+        """The cgroup v2 interface files (and values) this policy sets."""
+        limits = {}
+        if self.cpu_percent:
+            limits['cpu.max'] = f"{self.cpu_percent * CGROUP_PERIOD // 100} {CGROUP_PERIOD}"
+        if self.memory_mb:
+            limits['memory.max'] = str(self.memory_mb * 1048576)
+        if self.max_tasks:
+            limits['pids.max'] = str(self.max_tasks)
+        return limits
+
+# ---------------- Cgroups ----------------
+class CgroupManager:
+    """Creates one cgroup v2 group per app under a delegated directory.
+
+    Does nothing (available is False) unless the directory exists, is a
+    cgroup v2 group and is writable by ZOS.
+    """
+
+    CONTROLLERS = ('cpu', 'memory', 'pids')
+
+    def __init__(self, root=None):
+        self.root = root
+        self.available = bool(root) and os.path.exists(os.path.join(root, 'cgroup.controllers')) and os.access(root, os.W_OK)
+        self.enabled = False
+
+    def _enable_controllers(self):
+        # Children only get the controllers their parent delegates to them.
+        self.enabled = True
+        for controller in self.CONTROLLERS:
+            try:
+                with open(os.path.join(self.root, 'cgroup.subtree_control'), 'w') as f:
+                    f.write(f"+{controller}")
+            except OSError:
+                pass
+
+    def place(self, pid, limits):
+        """Moves process `pid` into a new group with `limits`; returns the
+        group's path, or None if there is nothing to do or it failed."""
+        if not self.available or not limits:
+            return None
+        if not self.enabled:
+            self._enable_controllers()
+        path = os.path.join(self.root, f"zos-app-{pid}")
+        try:
+            os.makedirs(path, exist_ok=True)
+            for name, value in limits.items():
+                try:
+                    with open(os.path.join(path, name), 'w') as f:
+                        f.write(value)
+                except OSError as e:
+                    print(f"Could not set {name} for process {pid}: {e}", file=sys.stderr)
+            with open(os.path.join(path, 'cgroup.procs'), 'w') as f:
+                f.write(str(pid))
+        except OSError as e:
+            print(f"Could not put process {pid} in a cgroup: {e}", file=sys.stderr)
+            self.remove(path)
+            return None
+        return path
+
+    def remove(self, path):
+        # Fails while anything the app started is still in the group; the
+        # empty group is then left for the next cleanup.
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+# ---------------- App Process ----------------
+class AppProcess:
+    """One child app managed by the Supervisor."""
+
+    def __init__(self, name, path, process):
+        self.name = name
+        self.path = path
+        self.process = process
+        self.pid = process.pid
+        self.state = RUNNING
+        self.returncode = None
+        self.started = time.monotonic()
+        self.ended = None
+        self.cpu_time = 0.0
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.io_read = 0
+        self.io_write = 0
+        self.policy = None
+        self.cgroup = None
+        # When stop() will kill the app if it has not exited by then.
+        self.kill_at = None
+        self.killed = False
+        # Open /proc files, re-read in place with pread on every sample.
+        self.proc_fds = {}
+        self.sampled_at = None
+        # Whatever the UI shows for this app (e.g. its console); kept here so
+        # switching back to a background app reattaches the same view.
+        self.view = None
+        self.on_exit = []
+
+    @property
+    def wall_time(self):
+        return (self.ended or time.monotonic()) - self.started
+
+    def stats(self):
+        return {
+            'pid': self.pid,
+            'name': self.name,
+            'state': self.state,
+            'returncode': self.returncode,
+            'cpu_time': self.cpu_time,
+            'cpu_percent': self.cpu_percent,
+            'rss': self.rss,
+            'io_read': self.io_read,
+            'io_write': self.io_write,
+            'wall_time': self.wall_time,
+        }
+
+    def exit_message(self):
+        if self.killed:
+            return "Process killed after ignoring the request to stop"
+        if hasattr(signal, 'SIGXCPU') and self.returncode == -signal.SIGXCPU:
+            return "Process stopped: CPU time limit reached"
+        return f"Process exited with code {self.returncode}"
+
+# ---------------- Supervisor ----------------
+class Supervisor:
+    """Keeps track of every child app ZOS has started.
+
+    Apps keep running when the user leaves them; `reap` is meant to be called
+    periodically from the UI thread to refresh usage numbers and collect
+    apps that exited, firing their on_exit callbacks.
+    """
+
+    def __init__(self, cgroup_root=None):
+        self.lock = threading.Lock()
+        self.processes = []
+        self.cgroups = CgroupManager(cgroup_root if cgroup_root is not None else os.environ.get(CGROUP_ENV))
+
+    def spawn(self, name, argv, path=None, policy=None, **popen_kwargs):
+        return self.adopt(name, path, subprocess.Popen(argv, **popen_kwargs), policy)
+
+    def adopt(self, name, path, process, policy=None):
+        """Starts supervising an already running Popen-like process, first
+        putting it under `policy` (a ResourcePolicy) if one is given."""
+        app_process = AppProcess(name, path, process)
+        if policy is not None:
+            app_process.policy = policy
+            policy.apply(process.pid)
+            app_process.cgroup = self.cgroups.place(process.pid, policy.cgroup_limits())
+        with self.lock:
+            self.processes.append(app_process)
+        return app_process
+
+    def tasks(self):
+        with self.lock:
+            return list(self.processes)
+
+    def running(self):
+        return [task for task in self.tasks() if task.state != EXITED]
+
+    def suspend(self, task):
+        if task.state == RUNNING and hasattr(signal, 'SIGSTOP'):
+            os.kill(task.pid, signal.SIGSTOP)
+            task.state = SUSPENDED
+
+    def resume(self, task):
+        if task.state == SUSPENDED:
+            os.kill(task.pid, signal.SIGCONT)
+            task.state = RUNNING
+
+    def terminate(self, task):
+        if task.state == EXITED:
+            return
+        # A stopped process would not act on SIGTERM until it is continued.
+        self.resume(task)
+        try:
+            task.process.terminate()
+        except OSError:
+            pass
+
+    def stop(self, task, grace=KILL_GRACE):
+        """Asks the app to exit and kills it if it has not `grace` seconds
+        later. Never waits: the kill happens in a later reap()."""
+        if task.state == EXITED:
+            return
+        self.terminate(task)
+        if task.kill_at is None:
+            task.kill_at = time.monotonic() + grace
+
+    def stop_all(self, grace=KILL_GRACE):
+        """Stops every running app, waiting up to `grace` seconds in all
+        before killing the ones left; for shutdown, where nothing reaps."""
+        tasks = self.running()
+        for task in tasks:
+            self.stop(task, grace)
+        deadline = time.monotonic() + grace
+        while self.running() and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        left = self.running()
+        for task in left:
+            self._kill(task)
+        # SIGKILL cannot be ignored, but the exit still takes a moment.
+        for task in left:
+            try:
+                task.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        self.reap()
+
+    def forget(self, task):
+        with self.lock:
+            if task in self.processes and task.state == EXITED:
+                self.processes.remove(task)
+
+    def reap(self):
+        """Samples usage of live apps and collects the ones that exited."""
+        exited = []
+        now = time.monotonic()
+        for task in self.running():
+            if self._collect(task):
+                exited.append(task)
+                self._release(task)
+            else:
+                if task.kill_at is not None and now >= task.kill_at:
+                    self._kill(task)
+                self._sample(task, now)
+
+        for task in exited:
+            for callback in task.on_exit:
+                try:
+                    callback(task)
+                except Exception as e:
+                    print(f"Error in exit callback for {task.name}: {e}")
+        return exited
+
+    def _kill(self, task):
+        task.kill_at = None
+        task.killed = True
+        try:
+            task.process.kill()
+        except OSError:
+            pass
+
+    def _release(self, task):
+        for fd in task.proc_fds.values():
+            os.close(fd)
+        task.proc_fds.clear()
+        if task.cgroup:
+            self.cgroups.remove(task.cgroup)
+
+    def _collect(self, task):
+        process = task.process
+        rusage = None
+        if hasattr(os, 'wait4') and process.returncode is None and isinstance(process, subprocess.Popen):
+            try:
+                pid, status, rusage = os.wait4(task.pid, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+                process.poll()
+            if pid:
+                process.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            process.poll()
+
+        if process.returncode is None:
+            return False
+
+        task.state = EXITED
+        task.returncode = process.returncode
+        task.ended = time.monotonic()
+        # ru_maxrss is skewed by the fork from ZOS itself, so the last
+        # sampled RSS is kept and only the final CPU time is taken.
+        if rusage is not None:
+            task.cpu_time = rusage.ru_utime + rusage.ru_stime
+        return True
+
+    def _read_proc(self, task, name):
+        # The /proc files stay open for the app's lifetime and are re-read
+        # from offset 0, which skips the path lookup and open of every sample.
+        fd = task.proc_fds.get(name)
+        if fd is None:
+            fd = task.proc_fds[name] = os.open(f'/proc/{task.pid}/{name}', os.O_RDONLY)
+        return os.pread(fd, 4096, 0)
+
+    def _sample(self, task, now=None):
+        # /proc is only there on Linux/Android; elsewhere usage stays at 0.
+        try:
+            fields = self._read_proc(task, 'stat').rsplit(b')', 1)[1].split()
+            resident = int(self._read_proc(task, 'statm').split()[1])
+        except (OSError, IndexError, ValueError):
+            return
+        now = now or time.monotonic()
+        # Fields after the command name start at "state" (field 3).
+        cpu_time = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        if task.sampled_at is not None and now > task.sampled_at:
+            task.cpu_percent = max(0.0, cpu_time - task.cpu_time) * 100 / (now - task.sampled_at)
+        task.sampled_at = now
+        task.cpu_time = cpu_time
+        task.rss = resident * PAGE_SIZE
+
+        # Not readable everywhere (it needs ptrace access); -1 once it failed.
+        if task.io_read >= 0:
+            try:
+                for line in self._read_proc(task, 'io').splitlines():
+                    key, _, value = line.partition(b':')
+                    if key == b'read_bytes':
+                        task.io_read = int(value)
+                    elif key == b'write_bytes':
+                        task.io_write = int(value)
+            except (OSError, ValueError):
+                task.io_read = task.io_write = -1
+
+supervisor = Supervisor()
@@ -0,0 +1,255 @@
+import os
+import time
+import weakref
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+
+MAX_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+# Threads for long jobs (indexing, installs, rewriting big files), kept
+# apart so they can never hold every regular worker for minutes.
+LONG_WORKERS = 2
+# Tasks queued or running at once; past this, submit() pushes back.
+MAX_PENDING = 256
+# UI callbacks run until this much of a frame is spent; the rest wait for
+# the next frame.
+FRAME_BUDGET = 0.008
+
+class TaskQueueFull(RuntimeError):
+    pass
+
+local = threading.local()
+
+def current_task():
+    """The Task running on this worker thread, or None elsewhere.
+
+    Long jobs should check current_task().cancelled now and then and
+    return early once it is set.
+    """
+    return getattr(local, 'task', None)
+
+# ---------------- Task ----------------
+class Task:
+    """One piece of background work, with a Future-like interface."""
+
+    def __init__(self, runtime, name, owner, key):
+        self.runtime = runtime
+        self.name = name
+        self.owner = weakref.ref(owner) if owner is not None else None
+        self.slot = (id(owner), key) if key is not None else None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.holds_slot = True
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Drops the task if it has not started, and flags it if it has.
+
+        Either way its on_done/on_error callbacks will not run.
+        """
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def add_done_callback(self, callback):
+        """callback(task) on whichever thread finishes the task."""
+        self.future.add_done_callback(lambda future: callback(self))
+
+# ---------------- Task Runtime ----------------
+class TaskRuntime:
+    """The one worker pool every part of ZOS runs its background work on.
+
+    The pool has a fixed number of named threads, however fast the user
+    clicks, plus LONG_WORKERS more for jobs submitted with long=True. Work
+    is submitted with an optional owner (a screen, an app, a session);
+    cancel_owner() cancels everything that owner started, so a closed
+    app's late results never reach a dead UI. Results come back
+    through one main-thread queue, drained once per frame within
+    FRAME_BUDGET, instead of a Clock.schedule_once per callback.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING, long_workers=LONG_WORKERS):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='zos-worker')
+        self.long_executor = ThreadPoolExecutor(max_workers=long_workers, thread_name_prefix='zos-long')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.live = set()
+        self.keyed = {}
+        # Bumped by cancel_owner, to tell stale ui_callback calls apart.
+        self.epochs = weakref.WeakKeyDictionary()
+        self.ui_queue = deque()
+        self.ui_scheduled = False
+        self.closed = False
+
+    # ---- Background work ----
+    def submit(self, fn, *args, owner=None, key=None, on_done=None, on_error=None, name=None, long=False, **kwargs):
+        """Runs fn(*args, **kwargs) on the pool and returns its Task.
+
+        on_done(result) or on_error(exception) then run on the UI thread,
+        unless the task (or its owner) was cancelled first. Submitting a
+        task with the same (owner, key) as an unfinished one cancels the
+        older one, e.g. a search superseded by the next keystroke. Jobs
+        that may run for minutes pass long=True and get their own threads.
+
+        When MAX_PENDING tasks are already waiting, the UI thread gets
+        TaskQueueFull and other threads wait for room, except the pool's
+        own workers: one waiting there could wait forever if all of them
+        did, so it runs the task itself, there and then.
+        """
+        if self.closed:
+            raise RuntimeError("The task runtime has shut down.")
+        on_ui_thread = threading.current_thread() is threading.main_thread()
+        in_worker = current_task() is not None
+        holds_slot = self.slots.acquire(blocking=not (on_ui_thread or in_worker))
+        if not holds_slot and on_ui_thread:
+            raise TaskQueueFull(f"Too many background tasks to start '{name or fn.__name__}'.")
+
+        task = Task(self, name or getattr(fn, '__name__', 'task'), owner, key)
+        task.holds_slot = holds_slot
+        previous = None
+        with self.lock:
+            self.live.add(task)
+            if task.slot is not None:
+                previous = self.keyed.get(task.slot)
+                self.keyed[task.slot] = task
+        if previous is not None:
+            previous.cancel()
+
+        if not holds_slot:
+            self._run_inline(task, fn, args, kwargs)
+        else:
+            executor = self.long_executor if long else self.executor
+            try:
+                task.future = executor.submit(self._run, task, fn, args, kwargs)
+            except RuntimeError:
+                self._finished(task)
+                raise
+        task.future.add_done_callback(lambda future: self._completed(task, on_done, on_error))
+        return task
+
+    def _run_inline(self, task, fn, args, kwargs):
+        outer = local.task
+        task.future = Future()
+        try:
+            result = self._run(task, fn, args, kwargs)
+        except BaseException as e:
+            task.future.set_exception(e)
+        else:
+            task.future.set_result(result)
+        finally:
+            local.task = outer
+
+    def _run(self, task, fn, args, kwargs):
+        if task.cancelled:
+            raise CancelledError()
+        local.task = task
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            local.task = None
+
+    def _completed(self, task, on_done, on_error):
+        self._finished(task)
+        if task.cancelled or task.future.cancelled():
+            return
+        error = task.future.exception()
+        if error is not None:
+            if on_error:
+                self.call_on_ui(on_error, error, task=task)
+            else:
+                print(f"Error in background task '{task.name}': {error}")
+        elif on_done:
+            self.call_on_ui(on_done, task.future.result(), task=task)
+
+    def _finished(self, task):
+        if task.holds_slot:
+            self.slots.release()
+        with self.lock:
+            self.live.discard(task)
+            if task.slot is not None and self.keyed.get(task.slot) is task:
+                del self.keyed[task.slot]
+
+    def cancel_owner(self, owner):
+        """Cancels every unfinished task `owner` submitted, and its pending
+        ui_callback calls. Called when a screen or an app goes away."""
+        with self.lock:
+            tasks = [task for task in self.live if task.owner is not None and task.owner() is owner]
+            if owner in self.epochs:
+                self.epochs[owner] += 1
+        for task in tasks:
+            task.cancel()
+
+    # ---- UI thread ----
+    def call_on_ui(self, callback, *args, task=None):
+        """Queues callback(*args) for the UI thread; safe from any thread.
+
+        With a task given, the call is dropped if that task is cancelled
+        before it runs.
+        """
+        if self.closed:
+            return
+        with self.lock:
+            self.ui_queue.append((callback, args, task))
+            if self.ui_scheduled:
+                return
+            self.ui_scheduled = True
+        from kivy.clock import Clock
+        Clock.schedule_once(self._run_ui)
+
+    def ui_callback(self, callback, owner=None):
+        """Wraps callback so calling it from any thread runs it on the UI
+        thread; dropped once `owner` has been cancelled."""
+        if owner is None:
+            return lambda *args: self.call_on_ui(callback, *args)
+        owner_ref = weakref.ref(owner)
+        with self.lock:
+            epoch = self.epochs.setdefault(owner, 0)
+
+        def call_if_live(*args):
+            # Checked on the UI thread, right before the call.
+            owner = owner_ref()
+            if owner is not None and self.epochs.get(owner) == epoch:
+                callback(*args)
+        return lambda *args: self.call_on_ui(call_if_live, *args)
+
+    def _run_ui(self, dt):
+        deadline = time.perf_counter() + FRAME_BUDGET
+        while True:
+            with self.lock:
+                if not self.ui_queue:
+                    self.ui_scheduled = False
+                    return
+                callback, args, task = self.ui_queue.popleft()
+            if task is None or not task.cancelled:
+                try:
+                    callback(*args)
+                except Exception as e:
+                    print(f"Error in UI callback: {e}")
+            if time.perf_counter() > deadline:
+                break
+        from kivy.clock import Clock
+        Clock.schedule_once(self._run_ui)
+
+    # ---- Shutdown ----
+    def shutdown(self, wait=False):
+        """Cancels everything outstanding; running tasks see `cancelled`."""
+        self.closed = True
+        with self.lock:
+            tasks = list(self.live)
+            self.ui_queue.clear()
+        for task in tasks:
+            task.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        self.long_executor.shutdown(wait=wait, cancel_futures=True)
+
+runtime = TaskRuntime()
@@ -0,0 +1,172 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from kivy.clock import Clock
+from kivy.core.image import ImageLoader
+from kivy.graphics import Fbo, Rectangle, ClearColor, ClearBuffers
+
+from zpkg import CACHE_DIR
+from tasks import runtime, TaskQueueFull
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+# ---------------- Thumbnail Cache ----------------
+class ThumbnailCache:
+    """Downscaled textures for icons and wallpapers.
+
+    A variant is generated once per (source hash, target size) and stored as
+    a PNG under Cache/thumbs. Files are decoded on the task runtime and turned
+    into textures on the UI thread, and a bounded LRU keeps recent textures
+    in memory so rebuilding the home screen decodes nothing at all.
+
+    At most `max_loading` loads are on the runtime at once; further
+    requests wait in a local queue, so a cold cache with many icons
+    cannot fill the runtime's queue.
+    """
+
+    def __init__(self, root=None, max_textures=64, max_loading=8):
+        self.root = root or os.path.join(CACHE_DIR, 'thumbs')
+        self.max_textures = max_textures
+        self.max_loading = max_loading
+        self.textures = OrderedDict()
+        self.waiting = {}
+        self.queued = deque()
+        self.loading = 0
+        self.feed_trigger = Clock.create_trigger(lambda dt: self._feed())
+        self.hashes_lock = threading.Lock()
+        self.hashes_file = os.path.join(self.root, 'hashes.json')
+        self.hashes = None
+
+    def request(self, source, size, callback):
+        """Calls callback(texture) on the UI thread with `source` fitted to `size`.
+
+        The texture is None if the source could not be loaded.
+        """
+        key = (source, int(size[0]), int(size[1]))
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.textures.move_to_end(key)
+            callback(texture)
+            return
+        if key in self.waiting:
+            self.waiting[key].append(callback)
+            return
+        self.waiting[key] = [callback]
+        self.queued.append(key)
+        self._feed()
+
+    def _feed(self):
+        while self.queued and self.loading < self.max_loading:
+            key = self.queued.popleft()
+            try:
+                runtime.submit(self._load, *key, name='thumbnail',
+                               on_done=lambda result, key=key: self._deliver(key, result),
+                               on_error=lambda e, key=key: self._failed(key, e))
+            except TaskQueueFull:
+                # The runtime is busy with other work; try again next frame.
+                self.queued.appendleft(key)
+                self.feed_trigger()
+                return
+            self.loading += 1
+
+    def _failed(self, key, error):
+        print(f"Error loading thumbnail for '{key[0]}': {error}")
+        self._deliver(key, None)
+
+    def _load(self, source, width, height):
+        """Runs on the worker thread; returns (decoded image, thumbnail path to write or None)."""
+        thumb_path = os.path.join(self.root, f"{self._digest(source)}_{width}x{height}.png")
+        if os.path.exists(thumb_path):
+            return ImageLoader.load(thumb_path, keep_data=True, nocache=True), None
+
+        if PILImage is not None:
+            with PILImage.open(source) as image:
+                image.thumbnail((width, height))
+                os.makedirs(self.root, exist_ok=True)
+                tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp.png"
+                image.save(tmp_path, 'PNG')
+            os.replace(tmp_path, thumb_path)
+            return ImageLoader.load(thumb_path, keep_data=True, nocache=True), None
+
+        # Without PIL the full image is decoded here and scaled on the GPU
+        # once it reaches the UI thread.
+        return ImageLoader.load(source, keep_data=True, nocache=True), thumb_path
+
+    def _deliver(self, key, result):
+        self.loading -= 1
+        self._feed()
+        callbacks = self.waiting.pop(key, [])
+        if result is None:
+            for callback in callbacks:
+                callback(None)
+            return
+        image, thumb_path = result
+        texture = image.texture
+        if thumb_path:
+            texture = self._downscale(texture, key[1], key[2], thumb_path)
+
+        self.textures[key] = texture
+        while len(self.textures) > self.max_textures:
+            self.textures.popitem(last=False)
+        for callback in callbacks:
+            callback(texture)
+
+    def _downscale(self, texture, width, height, thumb_path):
+        scale = min(width / texture.width, height / texture.height, 1)
+        size = (max(1, int(texture.width * scale)), max(1, int(texture.height * scale)))
+        fbo = Fbo(size=size)
+        with fbo:
+            ClearColor(0, 0, 0, 0)
+            ClearBuffers()
+            Rectangle(size=size, texture=texture)
+        fbo.draw()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            fbo.texture.save(thumb_path, flipped=False)
+        except Exception as e:
+            print(f"Error saving thumbnail '{thumb_path}': {e}")
+        return fbo.texture
+
+    def _digest(self, source):
+        # Several thumbnails may be loading at once.
+        with self.hashes_lock:
+            return self._digest_locked(source)
+
+    def _digest_locked(self, source):
+        # Hashes are remembered by path, size and mtime, so an unchanged
+        # source is never read just to find its thumbnail.
+        if self.hashes is None:
+            try:
+                with open(self.hashes_file, 'r') as f:
+                    self.hashes = json.load(f)
+            except (OSError, ValueError):
+                self.hashes = {}
+
+        st = os.stat(source)
+        stat_key = f"{os.path.abspath(source)}\0{st.st_size}\0{st.st_mtime_ns}"
+        digest = self.hashes.get(stat_key)
+        if digest:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()[:32]
+        self.hashes[stat_key] = digest
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_file = f"{self.hashes_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.hashes, f)
+            os.replace(tmp_file, self.hashes_file)
+        except OSError as e:
+            print(f"Error saving thumbnail hashes: {e}")
+        return digest
+
+thumbnail_cache = ThumbnailCache()
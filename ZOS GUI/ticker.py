@@ -0,0 +1,73 @@
+import time
+import datetime
+from kivy.clock import Clock
+
+SECOND = 'second'
+MINUTE = 'minute'
+
+# ---------------- Tick Service ----------------
+class TickService:
+    """One clock for every screen that shows the time.
+
+    Subscribers are only called while their screen is showing, right after a
+    wall-clock second or minute boundary. With nothing visible subscribed
+    (e.g. while an app is open) no Clock event is scheduled at all.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        self.event = None
+
+    def subscribe(self, screen, callback, unit=MINUTE):
+        """Calls callback(now) each `unit` while `screen` is on screen."""
+        entry = {'screen': screen, 'callback': callback, 'unit': unit, 'last': None}
+        self.subscribers.append(entry)
+        screen.bind(on_pre_enter=self._on_visibility, on_leave=self._on_visibility)
+        self._reschedule()
+
+    def unsubscribe(self, screen):
+        self.subscribers = [entry for entry in self.subscribers if entry['screen'] is not screen]
+        screen.unbind(on_pre_enter=self._on_visibility, on_leave=self._on_visibility)
+        self._reschedule()
+
+    def _visible(self, screen):
+        # A screen leaving during a transition does not need fresh text.
+        return screen.manager is not None and screen.manager.current_screen is screen
+
+    def _on_visibility(self, screen):
+        # Catch up straight away so a returning screen never shows a stale time.
+        self._tick()
+
+    def _tick(self, dt=None):
+        now = datetime.datetime.now()
+        for entry in list(self.subscribers):
+            if not self._visible(entry['screen']):
+                entry['last'] = None
+                continue
+            stamp = now.replace(microsecond=0) if entry['unit'] == SECOND else now.replace(second=0, microsecond=0)
+            if stamp != entry['last']:
+                entry['last'] = stamp
+                entry['callback'](now)
+        self._reschedule()
+
+    def _reschedule(self):
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+        units = [entry['unit'] for entry in self.subscribers if self._visible(entry['screen'])]
+        if not units:
+            return
+        now = time.time()
+        if SECOND in units:
+            delay = 1 - now % 1
+        else:
+            delay = 60 - now % 60
+        # Land just after the boundary rather than just before it.
+        self.event = Clock.schedule_once(self._tick, delay + 0.01)
+
+def set_text(label, text):
+    """Assigns label text only when it changed, so nothing is re-rendered."""
+    if label.text != text:
+        label.text = text
+
+ticker = TickService()
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque, Counter
+
+from zpkg import CACHE_DIR
+
+# Set ZOS_TRACE=1 to record from the very start, startup phases included.
+TRACE_ENV = 'ZOS_TRACE'
+TRACE_DIR = os.path.join(CACHE_DIR, 'traces')
+# Oldest events are dropped past this, so leaving tracing on stays bounded.
+MAX_EVENTS = 200000
+
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+SAMPLE_INTERVAL = 0.001
+
+# ---------------- Spans ----------------
+class Span:
+    """One timed phase; records itself when it ends.
+
+    Usable as a context manager, or ended later by hand with finish() for
+    phases that end on another callback (e.g. an app's first frame).
+    """
+
+    recording = True
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = time.perf_counter()
+        self.profile = None
+        self.finished = False
+
+    def finish(self, at=None, **args):
+        """Ends the span, now or at perf_counter time `at`; call it on the
+        thread that started the span, which a profile is tied to."""
+        if self.finished:
+            return
+        self.finished = True
+        end = time.perf_counter() if at is None else at
+        if self.profile:
+            self.profile.stop()
+        self.args.update(args)
+        self.tracer.complete(self.name, self.start, end, self.cat, **self.args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.finish()
+
+class NullSpan:
+    """What span() hands out while tracing is off: does nothing, cheaply."""
+
+    recording = False
+    start = 0.0
+
+    def finish(self, at=None, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+NULL_SPAN = NullSpan()
+
+# ---------------- Profiles ----------------
+class LaunchProfile:
+    """A cProfile run (or a stack-sampling run) covering one launch.
+
+    cProfile sees every call on the launching thread, at a real cost to the
+    launch itself; sampling only snapshots that thread's stack every
+    SAMPLE_INTERVAL from a helper thread, so the numbers stay honest.
+    """
+
+    def __init__(self, mode, label, out_dir):
+        self.mode = mode
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+        self.path = os.path.join(out_dir, f"{stamp}-{safe_label}." + ('prof' if mode == CPROFILE else 'folded'))
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.samples = Counter()
+        self.profiler = None
+        self.sampler = None
+
+    def start(self):
+        if self.mode == CPROFILE:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.sampler = threading.Thread(target=self._sample, name='zos-sampler', daemon=True)
+            self.sampler.start()
+        return self
+
+    def _sample(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self.profiler:
+                self.profiler.disable()
+                self.profiler.dump_stats(self.path)
+            else:
+                self.sampler.join()
+                # Folded stacks, one "a;b;c count" per line, as flame graph
+                # tools expect.
+                with open(self.path, 'w') as f:
+                    for stack, count in self.samples.most_common():
+                        f.write(f"{stack} {count}\n")
+            print(f"Launch profile saved to {self.path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Error saving launch profile: {e}", file=sys.stderr)
+
+# ---------------- Tracer ----------------
+class Tracer:
+    """Records timed spans and exports them as Chrome trace-event JSON.
+
+    Off by default, and cheap while off: span() checks one flag and hands
+    back a shared no-op span. Events go into a bounded ring buffer from
+    any thread; export() writes a file chrome://tracing or Perfetto opens.
+    """
+
+    def __init__(self, enabled=False, max_events=MAX_EVENTS, trace_dir=TRACE_DIR):
+        self.enabled = enabled
+        self.trace_dir = trace_dir
+        self.events = deque(maxlen=max_events)
+        self.threads = {}
+        self.pending_profile = None
+        self.origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self, export=True):
+        """Stops recording; returns the exported trace file, if any."""
+        self.enabled = False
+        path = self.export() if export and self.events else None
+        self.events.clear()
+        return path
+
+    # ---- Recording ----
+    def now(self):
+        return time.perf_counter()
+
+    def span(self, name, cat='zos', **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, cat, args)
+
+    def begin_launch(self, name, **args):
+        """The span for launching app `name`, profiled if one was asked for."""
+        mode, self.pending_profile = self.pending_profile, None
+        if not self.enabled and not mode:
+            return NULL_SPAN
+        span = Span(self, 'launch', 'launch', dict(args, app=name))
+        if mode:
+            span.profile = LaunchProfile(mode, name, self.trace_dir).start()
+        return span
+
+    def complete(self, name, start, end=None, cat='zos', **args):
+        """Records a span from perf_counter times `start` to `end` (now)."""
+        if not self.enabled:
+            return
+        end = time.perf_counter() if end is None else end
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        self.events.append({'name': name, 'cat': cat, 'ph': 'X', 'tid': tid,
+                            'ts': round((start - self.origin) * 1e6, 1),
+                            'dur': round((end - start) * 1e6, 1), 'args': args})
+
+    def instant(self, name, cat='zos', **args):
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        self.events.append({'name': name, 'cat': cat, 'ph': 'i', 's': 't', 'tid': tid,
+                            'ts': round((time.perf_counter() - self.origin) * 1e6, 1), 'args': args})
+
+    def profile_next(self, mode=CPROFILE):
+        """Profiles the next app launch, from run_app to its first frame or
+        first line of output, whether or not tracing is on."""
+        if mode not in (CPROFILE, SAMPLE):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.pending_profile = mode
+
+    # ---- Exporting ----
+    def export(self, path=None):
+        """Writes the recorded events to `path` (a new file in trace_dir by
+        default) and returns the path, or None if it could not be written."""
+        if path is None:
+            path = os.path.join(self.trace_dir, time.strftime('trace-%Y%m%d-%H%M%S.json'))
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'ZOS'}}]
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                      for tid, name in list(self.threads.items()))
+        events.extend(dict(event, pid=pid) for event in list(self.events))
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+            os.replace(tmp_file, path)
+        except OSError as e:
+            print(f"Error saving trace: {e}", file=sys.stderr)
+            return None
+        print(f"Trace saved to {path}", file=sys.stderr)
+        return path
+
+tracer = Tracer(enabled=os.environ.get(TRACE_ENV) == '1')
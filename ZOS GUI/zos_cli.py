@@ -0,0 +1,388 @@
+"""Runs ZOS CLI apps without the GUI (and without importing Kivy).
+
+    python zos_cli.py run Apps/Tool/Tool.zpkg other.py -j 4 -a --verbose
+    python zos_cli.py run -f jobs.txt -o logs --report report.json
+
+Apps are resolved the way the home screen launches them: packages with a
+manifest run straight from the archive, older ones are extracted through
+the shared extraction cache, and scripts are classified so Kivy apps are
+turned away instead of hanging a headless job.
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import argparse
+import selectors
+import subprocess
+from collections import deque
+
+from zpkg import extraction_cache, find_entry_script, load_manifest
+from zpkgimport import open_package, runner_argv
+from appindex import AppIndex
+from classifier import classifier
+from supervisor import Supervisor, ResourcePolicy
+
+APPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Apps')
+# How long a timed-out job gets to exit after SIGTERM before it is killed.
+KILL_GRACE = 5.0
+POLL_INTERVAL = 0.05
+
+# ---------------- Resolving Apps ----------------
+class AppResolver:
+    """Turns an app (a path, or the name of an installed app) into the
+    command line that runs it. Each app is only resolved once per batch."""
+
+    def __init__(self, apps_dir=APPS_DIR, extract=False):
+        self.apps_dir = apps_dir
+        self.extract = extract
+        self.resolved = {}
+        self.pinned = []
+        self.app_index = None
+        self.installed = []
+
+    def resolve(self, app):
+        """Returns the app's argv; raises ValueError if it cannot run headless."""
+        if app not in self.resolved:
+            try:
+                self.resolved[app] = self._resolve(app)
+            except (OSError, ValueError, RuntimeError) as e:
+                # Remembered, so a repeated job fails fast the same way.
+                self.resolved[app] = ValueError(str(e))
+        result = self.resolved[app]
+        if isinstance(result, ValueError):
+            raise result
+        return result
+
+    def _resolve(self, app):
+        path = app if os.path.exists(app) else self._find_installed(app)
+        if path.endswith('.zpkg'):
+            if not self.extract:
+                archive = open_package(path)
+                if archive.entry():
+                    if archive.manifest.get('kind') == 'kivy':
+                        raise ValueError(f"'{app}' is a Kivy app and needs the ZOS GUI.")
+                    return runner_argv(path)
+            files_dir = extraction_cache.extract(path)
+            self.pinned.append(files_dir)
+            manifest = load_manifest(files_dir)
+            script = os.path.join(files_dir, manifest['entry']) if manifest else find_entry_script(files_dir)
+            if not script or not os.path.exists(script):
+                raise ValueError(f"'{app}' has no script to run.")
+            kind = manifest['kind'] if manifest else classifier.classify(script)['kind']
+        elif path.endswith('.py'):
+            script = path
+            kind = classifier.classify(script)['kind']
+        else:
+            raise ValueError(f"'{app}' is not a .zpkg or .py app.")
+        if kind == 'kivy':
+            raise ValueError(f"'{app}' is a Kivy app and needs the ZOS GUI.")
+        return [sys.executable, script]
+
+    def _find_installed(self, app):
+        if self.app_index is None:
+            self.app_index = AppIndex(self.apps_dir)
+            self.app_index.load()
+            self.installed = self.app_index.refresh()
+        for entry in self.installed:
+            if entry['name'].lower() == app.lower():
+                return entry['path']
+        raise ValueError(f"No such app or file: '{app}'")
+
+    def release(self):
+        for files_dir in self.pinned:
+            extraction_cache.release(files_dir)
+        self.pinned = []
+
+# ---------------- Jobs ----------------
+class Job:
+    """One invocation of one app."""
+
+    def __init__(self, app, args, label):
+        self.app = app
+        self.args = list(args)
+        self.label = label
+        self.task = None
+        self.error = None
+        self.returncode = None
+        self.timed_out = False
+        self.started = None
+        self.ended = None
+        self.open_pipes = 0
+        self.files = []
+
+    @property
+    def wall_time(self):
+        if self.started is None:
+            return 0.0
+        return (self.ended or time.monotonic()) - self.started
+
+    @property
+    def ok(self):
+        return self.error is None and self.returncode == 0
+
+    def report(self):
+        return {
+            'label': self.label,
+            'app': self.app,
+            'args': self.args,
+            'returncode': self.returncode,
+            'error': self.error,
+            'timed_out': self.timed_out,
+            'wall_time': round(self.wall_time, 4),
+            'cpu_time': round(self.task.cpu_time, 4) if self.task else 0.0,
+            'rss': self.task.rss if self.task else 0,
+            'killed': self.task.killed if self.task else False,
+        }
+
+def read_jobs_file(path):
+    """Job lines are `app [args...]`, shell-quoted; # starts a comment."""
+    jobs = []
+    with (sys.stdin if path == '-' else open(path, 'r')) as f:
+        for line in f:
+            words = shlex.split(line, comments=True)
+            if words:
+                jobs.append((words[0], words[1:]))
+    return jobs
+
+def make_jobs(specs, repeat=1):
+    jobs = []
+    counts = {}
+    for app, args in specs:
+        for _ in range(repeat):
+            base = os.path.splitext(os.path.basename(app))[0]
+            counts[base] = counts.get(base, 0) + 1
+            jobs.append(Job(app, args, f"{base}#{counts[base]}"))
+    # Plain names where an app only runs once.
+    for job in jobs:
+        base = job.label.rsplit('#', 1)[0]
+        if counts[base] == 1:
+            job.label = base
+    return jobs
+
+# ---------------- Batch Runner ----------------
+class BatchRunner:
+    """Runs jobs through a bounded pool of child processes.
+
+    Everything happens on one thread: children's pipes are multiplexed
+    with `selectors` and the Supervisor reaps them, as the GUI does, so
+    even hundreds of jobs need no extra threads. Output lines are prefixed
+    with the job label, or written to <output_dir>/<label>.out and .err.
+    """
+
+    def __init__(self, resolver, max_jobs=None, output_dir=None, quiet=False, timeout=None,
+                 stdout=None, stderr=None, policy=None):
+        self.resolver = resolver
+        self.max_jobs = max(1, max_jobs or os.cpu_count() or 1)
+        self.output_dir = output_dir
+        self.quiet = quiet
+        self.timeout = timeout
+        self.policy = policy
+        self.stdout = stdout or sys.stdout.buffer
+        self.stderr = stderr or sys.stderr.buffer
+        self.supervisor = Supervisor()
+        self.selector = selectors.DefaultSelector()
+        self.running = []
+
+    def run(self, jobs):
+        pending = deque(jobs)
+        try:
+            while pending or self.running:
+                while pending and len(self.running) < self.max_jobs:
+                    self._start(pending.popleft())
+                self._pump()
+                self.supervisor.reap()
+                self._check_timeouts()
+                self._finish_done()
+        finally:
+            for job in self.running:
+                self.supervisor.terminate(job.task)
+            self.resolver.release()
+        return jobs
+
+    def _start(self, job):
+        try:
+            argv = self.resolver.resolve(job.app)
+        except ValueError as e:
+            job.error = str(e)
+            self._write_status(job, f"failed to start: {e}")
+            return
+
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            safe_label = ''.join(c if c.isalnum() or c in '-_#.' else '_' for c in job.label)
+            job.files = [open(os.path.join(self.output_dir, safe_label + ext), 'wb') for ext in ('.out', '.err')]
+            stdout, stderr = job.files
+        elif self.quiet:
+            stdout = stderr = subprocess.DEVNULL
+        else:
+            stdout = stderr = subprocess.PIPE
+
+        job.started = time.monotonic()
+        try:
+            job.task = self.supervisor.spawn(job.label, argv + job.args, path=job.app, policy=self.policy,
+                                             stdout=stdout, stderr=stderr, stdin=subprocess.DEVNULL)
+        except OSError as e:
+            job.error = str(e)
+            job.ended = time.monotonic()
+            self._close_files(job)
+            self._write_status(job, f"failed to start: {e}")
+            return
+        job.task.on_exit.append(lambda task, job=job: self._on_exit(job, task))
+        self.running.append(job)
+
+        if stdout is subprocess.PIPE:
+            prefix = f"[{job.label}] ".encode('utf-8')
+            for pipe, out in ((job.task.process.stdout, self.stdout), (job.task.process.stderr, self.stderr)):
+                os.set_blocking(pipe.fileno(), False)
+                self.selector.register(pipe, selectors.EVENT_READ, [job, out, prefix, b''])
+                job.open_pipes += 1
+
+    def _pump(self):
+        if not self.selector.get_map():
+            time.sleep(POLL_INTERVAL)
+            return
+        for key, mask in self.selector.select(POLL_INTERVAL):
+            self._read(key)
+
+    def _read(self, key):
+        job, out, prefix, partial = key.data
+        try:
+            chunk = os.read(key.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+
+        if chunk:
+            *lines, key.data[3] = (partial + chunk).split(b'\n')
+            if lines:
+                out.write(b''.join(prefix + line + b'\n' for line in lines))
+                out.flush()
+            return
+
+        self.selector.unregister(key.fileobj)
+        key.fileobj.close()
+        if partial:
+            out.write(prefix + partial + b'\n')
+            out.flush()
+        job.open_pipes -= 1
+
+    def _on_exit(self, job, task):
+        job.returncode = task.returncode
+        job.ended = task.ended
+
+    def _check_timeouts(self):
+        if not self.timeout:
+            return
+        now = time.monotonic()
+        for job in self.running:
+            if job.returncode is None and not job.timed_out and now - job.started >= self.timeout:
+                job.timed_out = True
+                # reap() kills it if it is still there after KILL_GRACE.
+                self.supervisor.stop(job.task, KILL_GRACE)
+
+    def _finish_done(self):
+        # A job is done once it has exited and its pipes have drained (a
+        # grandchild may hold them open; those lines are still wanted).
+        for job in [job for job in self.running if job.returncode is not None and not job.open_pipes]:
+            self.running.remove(job)
+            self._close_files(job)
+            if job.timed_out:
+                self._write_status(job, f"timed out after {self.timeout:g}s")
+            elif job.returncode:
+                self._write_status(job, f"exited with code {job.returncode}")
+
+    def _close_files(self, job):
+        for f in job.files:
+            f.close()
+        job.files = []
+
+    def _write_status(self, job, message):
+        self.stderr.write(f"[{job.label}] {message}\n".encode('utf-8'))
+        self.stderr.flush()
+
+def print_summary(jobs, wall_time, file=sys.stderr):
+    width = max([len(job.label) for job in jobs] + [3])
+    print(f"{'job':<{width}}  {'exit':>6}  {'wall s':>8}  {'cpu s':>7}", file=file)
+    for job in jobs:
+        if job.error is not None:
+            status = 'error'
+        elif job.timed_out:
+            status = 'timeout'
+        else:
+            status = str(job.returncode)
+        cpu = job.task.cpu_time if job.task else 0.0
+        print(f"{job.label:<{width}}  {status:>6}  {job.wall_time:>8.3f}  {cpu:>7.3f}", file=file)
+    failed = sum(1 for job in jobs if not job.ok)
+    print(f"{len(jobs)} jobs, {failed} failed, {wall_time:.3f}s", file=file)
+
+# ---------------- Command Line ----------------
+def run_command(args):
+    specs = [(app, args.arg) for app in args.apps]
+    if args.jobs_file:
+        specs.extend(read_jobs_file(args.jobs_file))
+    if not specs:
+        print("Error: nothing to run; name some apps or pass --jobs-file.", file=sys.stderr)
+        return 2
+    jobs = make_jobs(specs, args.repeat)
+    try:
+        policy = ResourcePolicy(**ResourcePolicy.parse(args.limit)) if args.limit else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    resolver = AppResolver(args.apps_dir, extract=args.extract)
+    runner = BatchRunner(resolver, args.jobs, args.output_dir, args.quiet, args.timeout, policy=policy)
+
+    started = time.monotonic()
+    try:
+        runner.run(jobs)
+    except KeyboardInterrupt:
+        print("Interrupted; stopped the running jobs.", file=sys.stderr)
+        return 130
+    wall_time = time.monotonic() - started
+
+    if not args.no_summary:
+        print_summary(jobs, wall_time)
+    if args.report:
+        report = {'wall_time': round(wall_time, 4), 'jobs': [job.report() for job in jobs]}
+        tmp_file = f"{args.report}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(report, f, indent=1)
+        os.replace(tmp_file, args.report)
+    return 0 if all(job.ok for job in jobs) else 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='zos_cli.py', description="Run ZOS apps without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run CLI apps (.zpkg, .py or installed app names) as a batch")
+    run_parser.add_argument('apps', nargs='*', help="apps to run, each as one job")
+    run_parser.add_argument('-a', '--arg', action='append', default=[],
+                            help="argument passed to every app named on the command line (repeatable)")
+    run_parser.add_argument('-f', '--jobs-file', help="file with one job per line, `app [args...]` (- for stdin)")
+    run_parser.add_argument('-n', '--repeat', type=int, default=1, help="run every job this many times")
+    run_parser.add_argument('-j', '--jobs', type=int, default=0, help="jobs running at once (default: one per CPU)")
+    run_parser.add_argument('-o', '--output-dir', help="write each job's output to <dir>/<job>.out and .err")
+    run_parser.add_argument('-q', '--quiet', action='store_true', help="discard the jobs' output")
+    run_parser.add_argument('-t', '--timeout', type=float, help="stop jobs still running after this many seconds")
+    run_parser.add_argument('-l', '--limit', action='append', default=[], metavar='KEY=VALUE',
+                            help="resource limit for every job (repeatable): " + ', '.join(ResourcePolicy.FIELDS))
+    run_parser.add_argument('--report', help="write exit codes and timings to this JSON file")
+    run_parser.add_argument('--no-summary', action='store_true', help="do not print the summary table")
+    run_parser.add_argument('--extract', action='store_true',
+                            help="run packages from the extraction cache instead of the archive")
+    run_parser.add_argument('--apps-dir', default=APPS_DIR, help="where installed apps are looked up by name")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'run':
+            return run_command(args)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
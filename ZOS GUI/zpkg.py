@@ -0,0 +1,481 @@
+import io
+import os
+import sys
+import gzip
+import json
+import lzma
+import time
+import shutil
+import tarfile
+import tempfile
+import hashlib
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    # No flock() (Windows): only pins taken by this process are seen.
+    fcntl = None
+
+# Everything ZOS caches on disk lives here (relative to the ZOS GUI folder).
+CACHE_DIR = os.environ.get('ZOS_CACHE_DIR', 'Cache')
+
+# Written as the first member of every package built by `zpkg.py build`.
+MANIFEST_NAME = 'zpkg.json'
+MANIFEST_FORMAT = 1
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# ---------------- Extraction Cache ----------------
+class ExtractionCache:
+    """Keeps extracted .zpkg archives around between launches.
+
+    Entries are keyed by the archive's absolute path, size and mtime, so an
+    updated package gets a fresh entry while a warm launch skips
+    decompression entirely. Each entry is populated in a private staging
+    directory and renamed into place, which makes concurrent launches of the
+    same package safe: whoever renames first wins, the loser just uses it.
+
+    The GUI and `zos_cli.py run` share the cache, so a pinned entry also
+    holds a shared flock() on its lock file; evict() only removes entries it
+    can lock exclusively, and never one used in the last `min_age` seconds.
+    """
+
+    def __init__(self, root=None, max_bytes=256 * 1024 * 1024, min_age=60):
+        self.root = root or os.path.join(CACHE_DIR, 'zpkg')
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.lock = threading.Lock()
+        self.pinned = {}
+        # key -> open lock file holding this process's shared lock.
+        self.lock_fds = {}
+
+    def key_for(self, path):
+        st = os.stat(path)
+        ident = f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+        return hashlib.sha256(ident.encode('utf-8')).hexdigest()[:32]
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def extract(self, path):
+        """Returns the directory holding the extracted contents of `path`."""
+        key = self.key_for(path)
+        entry = self.entry_dir(key)
+        files_dir = os.path.join(entry, 'files')
+
+        with self.lock:
+            self.pinned[key] = self.pinned.get(key, 0) + 1
+
+        try:
+            if os.path.isdir(files_dir) and self._hold(key):
+                self._touch(entry)
+                return files_dir
+
+            os.makedirs(self.root, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+            try:
+                staged_files = os.path.join(staging, 'files')
+                os.mkdir(staged_files)
+                with open_archive(path) as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(path=staged_files, filter='data')
+                    else:
+                        tar.extractall(path=staged_files)
+
+                meta = {'source': os.path.abspath(path), 'size': _tree_size(staged_files)}
+                with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                    json.dump(meta, f)
+                open(os.path.join(staging, 'lock'), 'wb').close()
+
+                try:
+                    os.rename(staging, entry)
+                except OSError:
+                    # Another launch populated the same entry first.
+                    if not os.path.isdir(files_dir):
+                        raise
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+            if not self._hold(key):
+                raise OSError(f"Extracted package was evicted before it could be used: {path}")
+            self._touch(entry)
+            self.evict()
+            return files_dir
+        except Exception:
+            self.release(files_dir)
+            raise
+
+    def release(self, files_dir):
+        """Unpins an entry returned by `extract` so it may be evicted again."""
+        key = os.path.basename(os.path.dirname(files_dir))
+        with self.lock:
+            count = self.pinned.get(key, 0) - 1
+            if count > 0:
+                self.pinned[key] = count
+            else:
+                self.pinned.pop(key, None)
+                fd = self.lock_fds.pop(key, None)
+                if fd is not None:
+                    os.close(fd)
+
+    def _hold(self, key):
+        # Takes this process's shared lock on a pinned entry, once. False if
+        # the entry is gone (another process evicted it just now).
+        with self.lock:
+            if key in self.lock_fds:
+                return True
+            fd = _lock_entry(self.entry_dir(key), exclusive=False)
+            if fd is None:
+                return False
+            self.lock_fds[key] = fd
+            return True
+
+    def evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        if not os.path.isdir(self.root):
+            return
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if entry.name.startswith('.evicted-'):
+                # Left behind by an eviction that was interrupted.
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            if entry.name.startswith('.staging-'):
+                # Leftovers from a crashed launch; live stagings are recent.
+                if time.time() - entry.stat().st_mtime > 3600:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            try:
+                with open(os.path.join(entry.path, 'meta.json')) as f:
+                    size = json.load(f).get('size', 0)
+                used = os.stat(os.path.join(entry.path, 'meta.json')).st_mtime
+            except (OSError, ValueError):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            entries.append((used, size, entry.name, entry.path))
+            total += size
+
+        entries.sort()
+        now = time.time()
+        for used, size, key, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            with self.lock:
+                if key in self.pinned:
+                    continue
+            # Just extracted or launched: another process may be about to pin
+            # it (or, without flock, be running from it).
+            if now - used < self.min_age:
+                continue
+            fd = _lock_entry(entry_path, exclusive=True)
+            if fd is None:
+                # Pinned by another process.
+                continue
+            try:
+                # Renamed away while locked, so nobody can pin it in between.
+                doomed = tempfile.mkdtemp(prefix='.evicted-', dir=self.root)
+                os.rename(entry_path, os.path.join(doomed, key))
+            except OSError:
+                continue
+            finally:
+                os.close(fd)
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _touch(self, entry):
+        # meta.json's mtime doubles as the entry's last-used time for LRU.
+        try:
+            os.utime(os.path.join(entry, 'meta.json'))
+        except OSError:
+            pass
+
+def _lock_entry(entry, exclusive):
+    """Opens and flock()s an entry's lock file; None if it is gone or, for
+    an exclusive lock, held by someone else."""
+    lock_file = os.path.join(entry, 'lock')
+    try:
+        fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        return None
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH)
+        # Evicted between open() and flock(): the lock is on a file that
+        # is no longer the entry's.
+        if os.fstat(fd).st_ino != os.stat(lock_file).st_ino:
+            raise OSError("stale lock file")
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+def _tree_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return total
+
+def find_entry_script(files_dir):
+    """Returns the first .py file found in a package without a manifest."""
+    for root, dirs, files in os.walk(files_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.py'):
+                return os.path.join(root, file)
+    return None
+
+extraction_cache = ExtractionCache()
+
+# ---------------- Reading Packages ----------------
+@contextlib.contextmanager
+def open_archive(path):
+    """Opens a .zpkg as a TarFile, whatever it was compressed with."""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic != ZSTD_MAGIC:
+        # xz, gzip and plain tar; tarfile also copes with the concatenated
+        # streams parallel builds write.
+        with tarfile.open(path, 'r') as tar:
+            yield tar
+        return
+    if zstandard is None:
+        raise RuntimeError(f"'{os.path.basename(path)}' is zstd-compressed; install the 'zstandard' package to open it.")
+    with open(path, 'rb') as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        with tarfile.open(fileobj=reader, mode='r|') as tar:
+            yield tar
+
+def read_manifest(path):
+    """Returns the manifest of a .zpkg without extracting it, or None."""
+    with open_archive(path) as tar:
+        member = tar.next()
+        if member is None or member.name != MANIFEST_NAME:
+            return None
+        return json.load(tar.extractfile(member))
+
+def load_manifest(files_dir):
+    """Returns the manifest of an extracted package, or None if it has none.
+
+    A manifest that does not point at a real entry script is ignored, so a
+    broken one falls back to the old way of finding the script.
+    """
+    try:
+        with open(os.path.join(files_dir, MANIFEST_NAME), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entry = manifest.get('entry') if isinstance(manifest, dict) else None
+    if not isinstance(entry, str) or manifest.get('kind') not in ('kivy', 'cli'):
+        return None
+    entry_path = os.path.normpath(os.path.join(files_dir, entry))
+    if not entry_path.startswith(os.path.normpath(files_dir) + os.sep) or not os.path.isfile(entry_path):
+        return None
+    return manifest
+
+# ---------------- Building Packages ----------------
+# Packages are compressed in independent blocks of this size, so big ones
+# use every core. Small ones fit in one block and come out exactly like a
+# plain .tar.xz.
+BLOCK_SIZE = 4 * 1024 * 1024
+SKIPPED_NAMES = ('__pycache__', MANIFEST_NAME)
+SKIPPED_SUFFIXES = ('.pyc', '.pyo', '.zpkg')
+
+def _xz_compressor(level):
+    preset = 6 if level is None else level
+    return lambda block: lzma.compress(block, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC64, preset=preset)
+
+def _gz_compressor(level):
+    compresslevel = 6 if level is None else level
+    return lambda block: gzip.compress(block, compresslevel=compresslevel, mtime=0)
+
+def _zstd_compressor(level):
+    if zstandard is None:
+        raise RuntimeError("The zstd codec needs the 'zstandard' package.")
+    zstd_level = 10 if level is None else level
+    # Compressor objects are not thread-safe, so each block gets its own.
+    return lambda block: zstandard.ZstdCompressor(level=zstd_level, write_content_size=True).compress(block)
+
+def _stored(level):
+    return None
+
+# Roughly fastest to smallest: stored, zstd, gz, xz.
+CODECS = {
+    'xz': _xz_compressor,
+    'gz': _gz_compressor,
+    'zstd': _zstd_compressor,
+    'stored': _stored,
+}
+
+def _collect_files(source):
+    """Returns sorted (archive name, path) pairs for an app file or folder."""
+    if os.path.isfile(source):
+        return [(os.path.basename(source), source)]
+    files = []
+    for root, dirs, names in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in SKIPPED_NAMES)
+        for name in names:
+            if name.startswith('.') or name in SKIPPED_NAMES or name.endswith(SKIPPED_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, source).replace(os.sep, '/'), path))
+    files.sort()
+    return files
+
+def _pick_entry(name, files, entry=None):
+    names = [arcname for arcname, path in files]
+    if entry:
+        if entry not in names:
+            raise ValueError(f"Entry script '{entry}' is not part of the package.")
+        return entry
+    for candidate in ('main.py', f"{name}.py", '__main__.py'):
+        if candidate in names:
+            return candidate
+    scripts = [arcname for arcname in names if arcname.endswith('.py') and '/' not in arcname]
+    if len(scripts) == 1:
+        return scripts[0]
+    raise ValueError("Cannot tell which script starts the app; pass --entry.")
+
+def _tar_member(tar, name, data, mode):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = mode
+    # Fixed metadata: the same inputs always give the same bytes.
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    tar.addfile(info, io.BytesIO(data))
+
+def _compress(data, codec, level, jobs, block_size):
+    compress_block = CODECS[codec](level)
+    if compress_block is None:
+        return data
+    blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)] or [b'']
+    if len(blocks) == 1 or jobs == 1:
+        return b''.join(compress_block(block) for block in blocks)
+    # lzma, zlib and zstd all release the GIL while they work.
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        return b''.join(pool.map(compress_block, blocks))
+
+def build(source, output=None, codec='xz', level=None, entry=None, icon=None, jobs=None, block_size=BLOCK_SIZE,
+          limits=None):
+    """Packs an app (a .py file or a folder) into a .zpkg.
+
+    The archive starts with a manifest naming the entry script, the app's
+    kind and App class, its icon, a hash of every file and, if given, the
+    resource limits the app runs under (see supervisor.ResourcePolicy).
+    Returns (output path, manifest).
+    """
+    from classifier import scan_source
+
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'; choose from {', '.join(CODECS)}.")
+    source = os.path.normpath(source)
+    name = os.path.splitext(os.path.basename(source))[0]
+    files = _collect_files(source)
+    if not files:
+        raise ValueError(f"Nothing to package in '{source}'.")
+    entry = _pick_entry(name, files, entry)
+    names = [arcname for arcname, path in files]
+    if icon is None:
+        icon = 'icon.png' if 'icon.png' in names else None
+    elif icon not in names:
+        raise ValueError(f"Icon '{icon}' is not part of the package.")
+
+    # Apps are small; holding the files in memory means each is read once
+    # for both its hash and the archive.
+    contents = []
+    for arcname, path in files:
+        with open(path, 'rb') as f:
+            data = f.read()
+        mode = 0o755 if os.stat(path).st_mode & 0o111 else 0o644
+        contents.append((arcname, data, mode))
+
+    entry_source = next(data for arcname, data, mode in contents if arcname == entry)
+    app_kind = scan_source(entry_source.decode('utf-8', errors='replace'))
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'name': name,
+        'entry': entry,
+        'module': entry[:-3].replace('/', '.') if entry.endswith('.py') else entry,
+        'kind': app_kind['kind'],
+        'app_class': app_kind['app_class'],
+        'icon': icon,
+        'files': {arcname: 'sha256:' + hashlib.sha256(data).hexdigest() for arcname, data, mode in contents},
+    }
+    if limits:
+        manifest['limits'] = dict(limits)
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.GNU_FORMAT) as tar:
+        _tar_member(tar, MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'), 0o644)
+        for arcname, data, mode in contents:
+            _tar_member(tar, arcname, data, mode)
+    packed = _compress(buffer.getvalue(), codec, level, jobs, block_size)
+
+    output = output or os.path.join(os.path.dirname(os.path.abspath(source)), f"{name}.zpkg")
+    tmp_file = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(packed)
+    os.replace(tmp_file, output)
+    return output, manifest
+
+# ---------------- Command Line ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='zpkg.py', description="Build and inspect ZOS app packages.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help="pack an app file or folder into a .zpkg")
+    build_parser.add_argument('source', help="the app's .py file, or a folder with its scripts and assets")
+    build_parser.add_argument('-o', '--output', help="where to write the package (default: <name>.zpkg next to the source)")
+    build_parser.add_argument('--codec', choices=list(CODECS), default='xz',
+                              help="xz is smallest, gz and zstd are faster to open, stored skips compression (default: xz)")
+    build_parser.add_argument('--level', type=int, help="compression level for the codec")
+    build_parser.add_argument('--entry', help="script that starts the app, relative to the folder")
+    build_parser.add_argument('--icon', help="icon file, relative to the folder (default: icon.png if present)")
+    build_parser.add_argument('-l', '--limit', action='append', default=[], metavar='KEY=VALUE',
+                              help="resource limit the app runs under, e.g. memory_mb=256 (repeatable)")
+    build_parser.add_argument('-j', '--jobs', type=int, default=0, help="compression threads (default: one per CPU)")
+
+    info_parser = commands.add_parser('info', help="print a package's manifest")
+    info_parser.add_argument('package')
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'build':
+            from supervisor import ResourcePolicy
+            output, manifest = build(args.source, args.output, args.codec, args.level, args.entry, args.icon, args.jobs or None,
+                                     limits=ResourcePolicy.parse(args.limit))
+            print(f"Built '{output}' ({os.path.getsize(output)} bytes, {len(manifest['files'])} files, "
+                  f"{manifest['kind']} app, entry '{manifest['entry']}').")
+        elif args.command == 'info':
+            manifest = read_manifest(args.package)
+            if manifest is None:
+                print(f"'{args.package}' has no manifest (built with an older py2zpkg.sh).")
+            else:
+                print(json.dumps(manifest, indent=1, sort_keys=True))
+    except (OSError, ValueError, RuntimeError, tarfile.TarError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import io
+import os
+import sys
+import gzip
+import json
+import lzma
+import mmap
+import tarfile
+import threading
+import importlib.abc
+import importlib.util
+from collections import OrderedDict
+
+from zpkg import MANIFEST_NAME, ZSTD_MAGIC, zstandard
+from modcache import code_cache
+
+XZ_MAGIC = b'\xfd7zXZ\x00'
+GZIP_MAGIC = b'\x1f\x8b'
+
+def _is_tar(head):
+    return len(head) >= 262 and head[257:262] == b'ustar'
+
+def _decompress(head, data):
+    if head.startswith(XZ_MAGIC):
+        return lzma.decompress(data)
+    if head.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if head.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ImportError("zstd-compressed packages need the 'zstandard' package.")
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        return reader.read()
+    raise ImportError("Not a .zpkg archive.")
+
+# ---------------- Package Archive ----------------
+class PackageArchive:
+    """Random access to the members of a .zpkg without extracting it.
+
+    Stored (uncompressed) packages are mmap'd and members are sliced straight
+    out of the mapping; compressed ones are decompressed into memory once.
+    Either way the tar headers are read a single time into an index.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.stamp = (st.st_mtime, st.st_size)
+            head = f.read(512)
+            if _is_tar(head):
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = _decompress(head, head + f.read())
+
+        self.members = {}
+        self.dirs = set()
+        with tarfile.open(fileobj=io.BytesIO(self.data) if isinstance(self.data, bytes) else self.data, mode='r:') as tar:
+            for member in tar:
+                name = member.name[2:] if member.name.startswith('./') else member.name
+                if member.isfile():
+                    self.members[name] = (member.offset_data, member.size)
+                    parts = name.split('/')[:-1]
+                    for i in range(len(parts)):
+                        self.dirs.add('/'.join(parts[:i + 1]))
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None and MANIFEST_NAME in self.members:
+            try:
+                self._manifest = json.loads(self.read(MANIFEST_NAME))
+            except ValueError:
+                self._manifest = {}
+        return self._manifest or None
+
+    def exists(self, name):
+        return name in self.members
+
+    def isdir(self, name):
+        return name in self.dirs
+
+    def view(self, name):
+        """A zero-copy memoryview of a member's bytes."""
+        offset, size = self.members[name]
+        return memoryview(self.data)[offset:offset + size]
+
+    def read(self, name):
+        return bytes(self.view(name))
+
+    def member_path(self, name=''):
+        """The path a member appears at, e.g. 'Apps/X/X.zpkg/X.py'."""
+        return os.path.join(self.path, *name.split('/')) if name else self.path
+
+    def member_name(self, path):
+        """The reverse of member_path; raises FileNotFoundError if not inside."""
+        path = os.path.abspath(path)
+        if not path.startswith(self.path + os.sep):
+            raise FileNotFoundError(path)
+        name = path[len(self.path) + 1:].replace(os.sep, '/')
+        if name not in self.members:
+            raise FileNotFoundError(path)
+        return name
+
+    def entry(self):
+        """The script the package starts with, from its manifest."""
+        manifest = self.manifest
+        entry = manifest.get('entry') if manifest else None
+        return entry if entry in self.members else None
+
+    def loader(self, name):
+        return PackageLoader(self, name)
+
+archives = OrderedDict()
+archives_lock = threading.Lock()
+MAX_OPEN_ARCHIVES = 8
+
+def open_package(path):
+    """Returns a (shared) PackageArchive for `path`, reopened if it changed."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    with archives_lock:
+        archive = archives.get(path)
+        if archive is not None and archive.stamp == (st.st_mtime, st.st_size):
+            archives.move_to_end(path)
+            return archive
+    archive = PackageArchive(path)
+    with archives_lock:
+        archives[path] = archive
+        while len(archives) > MAX_OPEN_ARCHIVES:
+            archives.popitem(last=False)
+    return archive
+
+def _split_entry(entry):
+    """Splits a sys.path entry like 'X.zpkg/lib' into (archive, 'lib/')."""
+    index = entry.find('.zpkg')
+    while index != -1:
+        end = index + len('.zpkg')
+        if end == len(entry) or entry[end] == os.sep:
+            archive_path = entry[:end]
+            if os.path.isfile(archive_path):
+                prefix = entry[end + 1:].replace(os.sep, '/')
+                return archive_path, prefix + '/' if prefix else ''
+            return None, None
+        index = entry.find('.zpkg', end)
+    return None, None
+
+# ---------------- Import Hooks ----------------
+class PackageLoader(importlib.abc.InspectLoader):
+    """Loads one module (or reads data) from inside a PackageArchive."""
+
+    def __init__(self, archive, name):
+        self.archive = archive
+        self.name = name
+        self.path = archive.member_path(name)
+        # Where the module's siblings are imported from (see modcache).
+        self.path_entry = archive.member_path(name.rpartition('/')[0])
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(self.get_code(module.__name__), module.__dict__)
+
+    def get_code(self, fullname):
+        return code_cache.get_code(self.archive.read(self.name), self.path)
+
+    def get_source(self, fullname):
+        return importlib.util.decode_source(self.archive.read(self.name))
+
+    def is_package(self, fullname):
+        return self.name.rpartition('/')[2] == '__init__.py'
+
+    def get_filename(self, fullname=None):
+        return self.path
+
+    def get_data(self, path):
+        """Reads an asset packaged next to the module, by its member path."""
+        return self.archive.read(self.archive.member_name(path))
+
+    def path_stats(self, path):
+        mtime, size = self.archive.stamp
+        return {'mtime': mtime, 'size': size}
+
+class PackageFinder(importlib.abc.MetaPathFinder):
+    """Imports modules from .zpkg files on sys.path, the way zipimport does
+    for .zip files."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        tail = fullname.rpartition('.')[2]
+        for entry in (sys.path if path is None else path):
+            if not isinstance(entry, str) or '.zpkg' not in entry:
+                continue
+            archive_path, prefix = _split_entry(entry)
+            if archive_path is None:
+                continue
+            try:
+                archive = open_package(archive_path)
+            except (OSError, ImportError, tarfile.TarError):
+                continue
+            base = prefix + tail
+            if archive.isdir(base) and archive.exists(base + '/__init__.py'):
+                loader = archive.loader(base + '/__init__.py')
+                return importlib.util.spec_from_file_location(
+                    fullname, loader.path, loader=loader,
+                    submodule_search_locations=[archive.member_path(base)])
+            if archive.exists(base + '.py'):
+                loader = archive.loader(base + '.py')
+                return importlib.util.spec_from_file_location(fullname, loader.path, loader=loader)
+        return None
+
+finder = PackageFinder()
+
+def install():
+    if finder not in sys.meta_path:
+        sys.meta_path.insert(0, finder)
+
+# Like zipimport, the hook is always on; it only looks at sys.path entries
+# that point into a .zpkg.
+install()
+
+# ---------------- Running Packages ----------------
+def runner_argv(path, args=()):
+    """Command line that runs a CLI package in a fresh interpreter."""
+    return [sys.executable, os.path.abspath(__file__), path] + list(args)
+
+def run_package(path, args=()):
+    """Runs a package's entry script as __main__, straight from the archive."""
+    archive = open_package(path)
+    entry = archive.entry()
+    if entry is None:
+        raise ImportError(f"'{path}' has no manifest naming its entry script.")
+    loader = archive.loader(entry)
+    sys.argv = [path] + list(args)
+    # Like `python app.py`: the app's folder (here, inside the archive)
+    # comes first on sys.path.
+    if sys.path and sys.path[0] in ('', os.path.dirname(os.path.abspath(__file__))):
+        sys.path[0] = loader.path_entry
+    else:
+        sys.path.insert(0, loader.path_entry)
+    spec = importlib.util.spec_from_file_location('__main__', loader.path, loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['__main__'] = module
+    loader.exec_module(module)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: zpkgimport.py PACKAGE [ARGS...]", file=sys.stderr)
+        sys.exit(2)
+    run_package(sys.argv[1], sys.argv[2:])
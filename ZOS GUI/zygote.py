@@ -0,0 +1,288 @@
+import os
+import sys
+import json
+import time
+import select
+import signal
+import socket
+import threading
+import subprocess
+
+# Modules most CLI apps import; the warm workers load them once up front.
+DEFAULT_PRELOAD = ['json', 're', 'datetime', 'random', 'math', 'time', 'collections', 'threading', 'subprocess', 'urllib.request', 'requests']
+
+def is_supported():
+    return hasattr(os, 'fork') and hasattr(socket, 'send_fds') and hasattr(socket, 'AF_UNIX')
+
+# ---------------- Zygote Server ----------------
+# Runs inside each warm worker: `python zygote.py --serve FD module...`.
+# Every job forks a fresh child off the preloaded interpreter, so apps start
+# without paying for interpreter startup or common imports, and each app
+# still gets its own globals.
+def serve(sock_fd, preload):
+    for name in preload:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+
+    sock = socket.socket(fileno=sock_fd)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    children = set()
+
+    while True:
+        readable, _, _ = select.select([sock, wake_r], [], [])
+        if wake_r in readable:
+            os.read(wake_r, 4096)
+        _reap_children(sock, children)
+
+        if sock in readable:
+            msg, fds, flags, addr = socket.recv_fds(sock, 65536, 2)
+            if not msg:
+                break
+            job = json.loads(msg)
+            pid = os.fork()
+            if pid == 0:
+                sock.close()
+                os.close(wake_r)
+                os.close(wake_w)
+                _run_job(job, fds)
+            for fd in fds:
+                os.close(fd)
+            children.add(pid)
+            sock.send(json.dumps({'pid': pid}).encode())
+
+def _reap_children(sock, children):
+    for pid in list(children):
+        try:
+            done, status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done, status = pid, 0
+        if done:
+            children.discard(pid)
+            sock.send(json.dumps({'exit': pid, 'code': os.waitstatus_to_exitcode(status)}).encode())
+
+def _run_job(job, fds):
+    import runpy
+    import atexit
+    import traceback
+
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(fds[0], 1)
+    os.dup2(fds[1], 2)
+    for fd in [devnull] + list(fds):
+        os.close(fd)
+
+    code = 0
+    try:
+        os.chdir(job['cwd'])
+        path = job['path']
+        if path.endswith('.zpkg'):
+            from zpkgimport import run_package
+            run_package(path, job.get('args', []))
+        else:
+            sys.argv = [path] + job.get('args', [])
+            sys.path[0] = os.path.dirname(os.path.abspath(path))
+            runpy.run_path(path, run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        pass
+    os._exit(code)
+
+# ---------------- Zygote Process ----------------
+class ZygoteProcess:
+    """Popen-like handle for an app forked by a zygote worker."""
+
+    def __init__(self, worker, pid, stdout, stderr):
+        self.worker = worker
+        self.pid = pid
+        self.stdin = None
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            self.worker.pump()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.returncode is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise subprocess.TimeoutExpired(self.pid, timeout)
+            self.worker.pump(timeout=remaining if remaining is not None else 1)
+        return self.returncode
+
+    def send_signal(self, signum):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+# ---------------- Zygote Worker ----------------
+class ZygoteWorker:
+    def __init__(self, preload):
+        self.sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', str(child_sock.fileno())] + list(preload),
+            pass_fds=[child_sock.fileno()], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        child_sock.close()
+        self.lock = threading.Lock()
+        self.children = {}
+        self.runs = 0
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def launch(self, path, args=(), cwd=None):
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        job = {'path': path, 'args': list(args), 'cwd': cwd or os.getcwd()}
+        try:
+            with self.lock:
+                socket.send_fds(self.sock, [json.dumps(job).encode()], [out_w, err_w])
+                self.runs += 1
+                pid = None
+                while pid is None:
+                    pid = self._handle(self.sock.recv(65536))
+                process = ZygoteProcess(self, pid, os.fdopen(out_r, 'rb'), os.fdopen(err_r, 'rb'))
+                self.children[pid] = process
+        except OSError:
+            for fd in (out_r, err_r):
+                os.close(fd)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+        return process
+
+    def pump(self, timeout=0):
+        """Applies exit notifications the worker has sent so far."""
+        with self.lock:
+            while True:
+                readable, _, _ = select.select([self.sock], [], [], timeout)
+                if not readable:
+                    return
+                msg = self.sock.recv(65536)
+                if not msg:
+                    # The worker died; its children can no longer be tracked.
+                    for process in self.children.values():
+                        process.returncode = -signal.SIGKILL
+                    self.children.clear()
+                    return
+                self._handle(msg)
+                timeout = 0
+
+    def _handle(self, msg):
+        if not msg:
+            raise OSError("zygote worker exited")
+        data = json.loads(msg)
+        if 'exit' in data:
+            process = self.children.pop(data['exit'], None)
+            if process:
+                process.returncode = data['code']
+            return None
+        return data['pid']
+
+    def close(self):
+        self.sock.close()
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+# ---------------- Zygote Pool ----------------
+class ZygotePool:
+    """A small pool of warm workers that CLI apps are dispatched to.
+
+    Workers are recycled after `max_runs` launches (once their last app has
+    exited) so state leaking from preloaded modules cannot build up.
+    `launch` returns None whenever no worker can take the job, in which case
+    the caller should fall back to a plain Popen.
+    """
+
+    def __init__(self, size=2, max_runs=20, preload=DEFAULT_PRELOAD):
+        self.size = size
+        self.max_runs = max_runs
+        self.preload = preload
+        self.workers = []
+        self.retiring = []
+
+    def start(self):
+        if not is_supported():
+            return
+        while len(self.workers) < self.size:
+            try:
+                self.workers.append(ZygoteWorker(self.preload))
+            except OSError as e:
+                print(f"Could not start zygote worker: {e}", file=sys.stderr)
+                return
+
+    def launch(self, path, args=(), cwd=None):
+        if not is_supported():
+            return None
+        self._recycle()
+        self.start()
+        for worker in sorted(self.workers, key=lambda worker: worker.runs):
+            try:
+                process = worker.launch(path, args, cwd)
+            except OSError as e:
+                print(f"Zygote launch failed: {e}", file=sys.stderr)
+                continue
+            if worker.runs >= self.max_runs:
+                self.workers.remove(worker)
+                self.retiring.append(worker)
+            return process
+        return None
+
+    def _recycle(self):
+        for worker in list(self.workers):
+            if not worker.alive():
+                self.workers.remove(worker)
+                self.retiring.append(worker)
+        for worker in list(self.retiring):
+            worker.pump()
+            if not worker.children:
+                worker.close()
+                self.retiring.remove(worker)
+
+    def shutdown(self):
+        for worker in self.workers + self.retiring:
+            worker.close()
+        self.workers = []
+        self.retiring = []
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]), sys.argv[3:])
+    else:
+        print("usage: zygote.py --serve FD [module ...]", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,898 @@
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.properties import BooleanProperty, ObjectProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.relativelayout import RelativeLayout
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.textinput import TextInput
+import os
+import sys
+import mmap
+import time
+import shutil
+import bisect
+import tempfile
+from array import array
+from collections import deque
+from concurrent.futures import CancelledError
+
+try:
+    from fileindex import get_index
+except ImportError:
+    # Running on its own: the ZOS modules live two folders up.
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from fileindex import get_index
+from tasks import runtime, current_task, TaskQueueFull
+
+ROOT_PATH = '/storage/emulated/0'
+
+# Entries are handed to the UI in batches: the first screenful quickly,
+# then every BATCH_SIZE entries (or BATCH_INTERVAL seconds on slow storage).
+# The UI takes in at most FRAME_BUDGET entries per frame.
+FIRST_BATCH = 200
+BATCH_SIZE = 2000
+BATCH_INTERVAL = 0.1
+FRAME_BUDGET = 4000
+
+SORT_KEYS = ['name', 'size', 'date']
+ROW_HEIGHT = 40
+
+# Files bigger than this (or binary ones) open in the paged viewer.
+LARGE_FILE_SIZE = 1024 * 1024
+PAGE_SIZE = 16 * 1024
+HEX_PAGE_SIZE = 2048
+COPY_CHUNK = 1024 * 1024
+
+def list_directory(path, with_stat, is_current, on_batch):
+    """Lists `path` with os.scandir, calling on_batch(entries, done, error).
+
+    Entries are (name, is_dir, size, mtime). The file type comes from the
+    directory listing itself; size and mtime cost a stat per entry, so they
+    are only read when `with_stat` is set. Stops early once is_current()
+    turns false (the user moved on).
+    """
+    batch = []
+    last_flush = time.monotonic()
+    first = True
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                size = mtime = 0
+                if with_stat:
+                    try:
+                        st = entry.stat()
+                        size, mtime = st.st_size, st.st_mtime
+                    except OSError:
+                        pass
+                batch.append((entry.name, is_dir, size, mtime))
+                if (len(batch) >= (FIRST_BATCH if first else BATCH_SIZE)
+                        or time.monotonic() - last_flush >= BATCH_INTERVAL):
+                    if not is_current():
+                        return
+                    on_batch(batch, False, None)
+                    batch = []
+                    first = False
+                    last_flush = time.monotonic()
+    except OSError as e:
+        on_batch(batch, True, e)
+        return
+    on_batch(batch, True, None)
+
+def sort_entries(entries, key, reverse=False):
+    """Folders first, then by name, size or date."""
+    if key == 'size':
+        sort_key = lambda e: (not e[1], e[2], e[0].lower())
+    elif key == 'date':
+        sort_key = lambda e: (not e[1], e[3], e[0].lower())
+    else:
+        sort_key = lambda e: (not e[1], e[0].lower())
+    entries = sorted(entries, key=sort_key)
+    if reverse:
+        # Keep folders on top when reversing.
+        dirs = [e for e in entries if e[1]]
+        files = [e for e in entries if not e[1]]
+        entries = dirs[::-1] + files[::-1]
+    return entries
+
+def is_binary(path):
+    try:
+        with open(path, 'rb') as f:
+            return b'\0' in f.read(8192)
+    except OSError:
+        return False
+
+class SaveCancelled(Exception):
+    pass
+
+def atomic_write(path, write):
+    """Calls write(f) on a temp file next to `path`, then renames it over
+    `path`; a crash mid-save leaves the old file untouched."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def hex_dump(data, offset):
+    lines = []
+    for i in range(0, len(data), 16):
+        row = data[i:i + 16]
+        hex_part = ' '.join(f'{b:02x}' for b in row)
+        text_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in row)
+        lines.append(f'{offset + i:08x}  {hex_part:<47}  {text_part}')
+    return '\n'.join(lines)
+
+class PagedFile:
+    """A file read through mmap, one page at a time.
+
+    Memory use does not depend on the file size: only the page on screen is
+    copied out of the mapping. Text pages are PAGE_SIZE bytes moved forward
+    to the next line start, so no line is split between pages. A background
+    thread counts the newlines of each page, so line numbers (and jumping
+    to a line) become available without reading the file on the UI thread.
+    """
+
+    def __init__(self, path, page_size=PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        self.page_lines = array('q')
+        self.index_done = False
+        self.index_generation = 0
+        self.open()
+
+    def open(self):
+        self.file = open(self.path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # mmap refuses empty files.
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    def close(self):
+        self.index_generation += 1
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.size // self.page_size))
+
+    def line_start(self, offset):
+        """The first line start at or after `offset`, unless the line is
+        longer than a page (then just `offset`)."""
+        if offset <= 0:
+            return 0
+        if offset >= self.size:
+            return self.size
+        newline = self.data.find(b'\n', offset - 1, offset + self.page_size)
+        return newline + 1 if newline != -1 else offset
+
+    def page_bounds(self, page):
+        return self.line_start(page * self.page_size), self.line_start((page + 1) * self.page_size)
+
+    def read(self, start, end):
+        return self.data[start:end]
+
+    def build_index(self, on_progress=None):
+        """Counts lines per page; run it on a worker thread."""
+        generation = self.index_generation
+        lines = array('q')
+        total = 0
+        try:
+            for page in range(self.page_count):
+                if generation != self.index_generation:
+                    return
+                start, end = self.page_bounds(page)
+                lines.append(total)
+                total += self.data[start:end].count(b'\n')
+                if on_progress and page % 1024 == 0:
+                    self.page_lines = lines[:]
+                    on_progress(page)
+        except ValueError:
+            # The mapping was closed under us (file saved or viewer closed).
+            return
+        self.page_lines = lines
+        self.index_done = True
+        if on_progress:
+            on_progress(self.page_count)
+
+    def first_line(self, page):
+        return self.page_lines[page] + 1 if page < len(self.page_lines) else None
+
+    def page_of_line(self, line):
+        """The page holding 1-based `line`, or None if not indexed yet."""
+        if not self.page_lines or (not self.index_done and line > self.page_lines[-1]):
+            return None
+        return max(0, bisect.bisect_right(self.page_lines, line - 1) - 1)
+
+    def replace(self, start, end, data, on_progress=None, cancel=None):
+        """Atomically writes the file with bytes start:end replaced by `data`.
+
+        The rest is streamed from the mapping in chunks through a temp file
+        that is renamed into place, so this works on files of any size; run
+        it on a worker thread. on_progress(fraction) follows the copy, and
+        setting `cancel` (an Event) raises SaveCancelled before the rename,
+        leaving the file as it was. Call reload() afterwards.
+        """
+        total = max(1, self.size - (end - start) + len(data))
+        written = 0
+
+        def write(f):
+            nonlocal written
+            for a, b in ((0, start), (end, self.size)):
+                for offset in range(a, b, COPY_CHUNK):
+                    if cancel is not None and cancel.is_set():
+                        raise SaveCancelled()
+                    chunk = self.data[offset:min(offset + COPY_CHUNK, b)]
+                    f.write(chunk)
+                    written += len(chunk)
+                    if on_progress:
+                        on_progress(written / total)
+                if a == 0:
+                    f.write(data)
+                    written += len(data)
+
+        atomic_write(self.path, write)
+
+    def reload(self):
+        """Maps the file again, e.g. after replace(); the line index starts over."""
+        self.close()
+        self.index_done = False
+        self.page_lines = array('q')
+        self.open()
+
+class LargeFileViewer(BoxLayout):
+    """Pages through a PagedFile as text (editable per page) or hex."""
+
+    def __init__(self, path, on_close, on_delete, **kwargs):
+        super().__init__(orientation='vertical', **kwargs)
+        self.paged = PagedFile(path)
+        self.page = 0
+        self.hex_mode = is_binary(path)
+        self.on_close = on_close
+        self.page_start = self.page_end = 0
+        self.page_text = ''
+        self.save_task = None
+        self.save_percent = 0
+        self.closed = False
+
+        bar = BoxLayout(size_hint=(1, 0.1))
+        bar.add_widget(Button(text='<', size_hint=(0.1, 1), on_press=lambda x: self.show_page(self.page - 1)))
+        self.page_label = Label(text='')
+        bar.add_widget(self.page_label)
+        bar.add_widget(Button(text='>', size_hint=(0.1, 1), on_press=lambda x: self.show_page(self.page + 1)))
+        self.goto_input = TextInput(hint_text='Line', multiline=False, size_hint=(0.2, 1), input_filter='int')
+        self.goto_input.bind(on_text_validate=lambda instance: self.go_to_line())
+        bar.add_widget(self.goto_input)
+        self.mode_button = Button(text='', size_hint=(0.15, 1), on_press=lambda x: self.toggle_hex())
+        bar.add_widget(self.mode_button)
+        self.add_widget(bar)
+
+        self.text_input = TextInput(multiline=True, font_name='RobotoMono-Regular')
+        self.add_widget(self.text_input)
+
+        btns = BoxLayout(size_hint=(1, 0.1))
+        self.save_button = Button(text='Save page', on_press=lambda x: self.save_page())
+        btns.add_widget(self.save_button)
+        self.delete_button = Button(text='Delete', on_press=lambda x: on_delete())
+        btns.add_widget(self.delete_button)
+        btns.add_widget(Button(text='Close', on_press=lambda x: on_close()))
+        self.add_widget(btns)
+
+        self.index_trigger = Clock.create_trigger(lambda dt: self.update_label())
+        self.indexing = False
+        self.show_page(0)
+
+    def start_index(self):
+        # Line numbers only matter in text mode; a binary file opened in hex
+        # is never scanned.
+        self.indexing = True
+        runtime.submit(self.paged.build_index, lambda page: self.index_trigger(), owner=self, name='line index', long=True)
+
+    def page_size(self):
+        return HEX_PAGE_SIZE if self.hex_mode else PAGE_SIZE
+
+    def page_count(self):
+        return max(1, -(-self.paged.size // self.page_size()))
+
+    def show_page(self, page):
+        if self.save_task:
+            return
+        page = min(max(page, 0), self.page_count() - 1)
+        if self.text_changed() and page != self.page:
+            self.show_message("Save or undo the changes on this page first.")
+            return
+        self.page = page
+        if not self.hex_mode and not self.indexing:
+            self.start_index()
+        if self.hex_mode:
+            self.page_start = page * HEX_PAGE_SIZE
+            self.page_end = min(self.paged.size, self.page_start + HEX_PAGE_SIZE)
+            self.page_text = hex_dump(self.paged.read(self.page_start, self.page_end), self.page_start)
+            editable = False
+        else:
+            self.page_start, self.page_end = self.paged.page_bounds(page)
+            data = self.paged.read(self.page_start, self.page_end)
+            try:
+                self.page_text = data.decode('utf-8')
+                editable = True
+            except UnicodeDecodeError:
+                # Not valid text (or a multi-byte character split by a
+                # page break): show it, but saving would corrupt it.
+                self.page_text = data.decode('utf-8', errors='replace')
+                editable = False
+        self.text_input.text = self.page_text
+        self.text_input.readonly = not editable
+        self.save_button.disabled = not editable
+        self.text_input.cursor = (0, 0)
+        self.text_input.scroll_y = 0
+        self.mode_button.text = 'Text' if self.hex_mode else 'Hex'
+        self.update_label()
+
+    def text_changed(self):
+        return not self.text_input.readonly and self.text_input.text != self.page_text
+
+    def update_label(self):
+        text = f'Page {self.page + 1}/{self.page_count()}'
+        if not self.hex_mode:
+            first_line = self.paged.first_line(self.page)
+            if first_line is not None:
+                text += f'  line {first_line}'
+            if not self.paged.index_done:
+                text += '  (indexing...)'
+        if self.save_task:
+            text += f'  saving {self.save_percent}%'
+        self.page_label.text = text
+
+    def toggle_hex(self):
+        if self.save_task:
+            return
+        if self.text_changed():
+            self.show_message("Save or undo the changes on this page first.")
+            return
+        # Stay at the same place in the file.
+        offset = self.page_start
+        self.hex_mode = not self.hex_mode
+        self.page_text = ''
+        self.text_input.readonly = True
+        self.show_page(offset // self.page_size())
+
+    def go_to_line(self):
+        if self.hex_mode or not self.goto_input.text:
+            return
+        page = self.paged.page_of_line(int(self.goto_input.text))
+        if page is None:
+            self.show_message("That line has not been indexed yet.")
+            return
+        self.show_page(page)
+
+    def save_page(self):
+        if self.save_task:
+            # While saving, the button cancels instead.
+            self.save_task.cancel()
+            self.save_button.text = 'Cancelling...'
+            return
+        if not self.text_changed():
+            return
+        # Saving rewrites the whole file, which takes a while for a big one;
+        # it runs in the background and the viewer stays read-only meanwhile.
+        data = self.text_input.text.encode('utf-8')
+        self.save_task = runtime.submit(self.write_page, self.page_start, self.page_end, data,
+                                        owner=self, name='save page', long=True)
+        self.set_saving(True)
+        # Not on_done/on_error: those are skipped for a cancelled task, and
+        # the viewer has to be unlocked either way.
+        self.save_task.add_done_callback(lambda task: runtime.call_on_ui(self.on_save_done, task))
+
+    def write_page(self, start, end, data):
+        """Runs on the task runtime."""
+        task = current_task()
+        shown = [-1]
+
+        def on_progress(fraction):
+            percent = int(fraction * 100)
+            if percent != shown[0]:
+                shown[0] = percent
+                runtime.call_on_ui(self.show_save_progress, percent, task=task)
+        self.paged.replace(start, end, data, on_progress, task.cancel_event)
+
+    def set_saving(self, saving):
+        self.save_percent = 0
+        self.text_input.readonly = saving
+        self.delete_button.disabled = saving
+        self.save_button.text = 'Cancel save' if saving else 'Save page'
+        self.update_label()
+
+    def show_save_progress(self, percent):
+        self.save_percent = percent
+        self.update_label()
+
+    def on_save_done(self, task):
+        self.save_task = None
+        if self.closed:
+            return
+        try:
+            task.result()
+        except (SaveCancelled, CancelledError):
+            self.set_saving(False)
+            self.show_message("Save cancelled; the file was not changed.")
+            return
+        except (OSError, ValueError) as e:
+            self.set_saving(False)
+            self.show_message(f"Error: {str(e)}")
+            return
+        self.paged.reload()
+        self.indexing = False
+        self.page_text = ''
+        self.set_saving(False)
+        self.text_input.readonly = True
+        self.show_page(self.page)
+        self.show_message("Page saved!")
+
+    def close(self):
+        # A save still running stops before it replaces the file.
+        self.closed = True
+        runtime.cancel_owner(self)
+        self.paged.close()
+
+    def show_message(self, message):
+        Popup(title='Info', content=Label(text=message), size_hint=(0.8, 0.4)).open()
+
+class FileRow(Button):
+    """One recycled row of the file list."""
+    name = StringProperty('')
+    is_dir = BooleanProperty(False)
+    manager = ObjectProperty(None, allownone=True)
+
+    def on_press(self):
+        if self.manager is not None:
+            self.manager.open_item(self.name, self.is_dir)
+
+class FileList(ScrollView):
+    """A virtualized list of fixed-height rows, RecycleView style.
+
+    Only enough FileRow widgets to fill the screen exist; scrolling re-binds
+    them to other items. Every row has the same height, so finding the rows
+    on screen is arithmetic and costs the same for 100 items or 100,000
+    (Kivy's RecycleBoxLayout re-lays out every item whenever data changes).
+    """
+
+    def __init__(self, manager, **kwargs):
+        super().__init__(do_scroll_x=False, **kwargs)
+        self.manager = manager
+        self.data = []
+        self.rows = []
+        self.content = RelativeLayout(size_hint=(1, None), height=0)
+        self.add_widget(self.content)
+        self.refresh_trigger = Clock.create_trigger(self.refresh_rows)
+        self.bind(scroll_y=self.refresh_trigger, size=self.refresh_trigger)
+
+    def set_data(self, data, keep_scroll=False):
+        self.data = data
+        self.content.height = len(data) * ROW_HEIGHT
+        if not keep_scroll:
+            self.scroll_y = 1
+        self.refresh_trigger()
+
+    def extend(self, data):
+        # Appending must not jump the list: keep the same rows on screen.
+        offset = self.top_offset()
+        self.data.extend(data)
+        self.content.height = len(self.data) * ROW_HEIGHT
+        self.scroll_to_offset(offset)
+        self.refresh_trigger()
+
+    def top_offset(self):
+        scrollable = self.content.height - self.height
+        return (1 - self.scroll_y) * scrollable if scrollable > 0 else 0
+
+    def scroll_to_offset(self, offset):
+        scrollable = self.content.height - self.height
+        self.scroll_y = 1 - offset / scrollable if scrollable > 0 else 1
+
+    def refresh_rows(self, *args):
+        first = int(self.top_offset() // ROW_HEIGHT)
+        count = int(self.height // ROW_HEIGHT) + 2
+        while len(self.rows) < count:
+            row = FileRow(size_hint=(1, None), height=ROW_HEIGHT, manager=self.manager)
+            self.rows.append(row)
+            self.content.add_widget(row)
+        total = self.content.height
+        for i, row in enumerate(self.rows):
+            index = first + i
+            if index < len(self.data):
+                item = self.data[index]
+                row.text = item['text']
+                row.name = item['name']
+                row.is_dir = item['is_dir']
+                row.y = total - (index + 1) * ROW_HEIGHT
+                row.opacity = 1
+                row.disabled = False
+            else:
+                row.opacity = 0
+                row.disabled = True
+
+class SearchPanel(BoxLayout):
+    """Search by file name (or text file contents) over the whole tree.
+
+    Results come from a persistent FileIndex, so typing never walks the
+    filesystem; the index is brought up to date in the background while
+    the panel is open, and the results follow as it does.
+    """
+
+    def __init__(self, root, on_pick, **kwargs):
+        super().__init__(orientation='vertical', **kwargs)
+        self.root = root
+        self.on_pick = on_pick
+        self.index = get_index(root)
+        self.contents = False
+
+        bar = BoxLayout(size_hint=(1, 0.1))
+        self.query_input = TextInput(hint_text='Search files', multiline=False)
+        self.search_trigger = Clock.create_trigger(lambda dt: self.search(), 0.1)
+        self.query_input.bind(text=lambda instance, text: self.search_trigger())
+        bar.add_widget(self.query_input)
+        self.mode_button = Button(text='Names', size_hint=(0.25, 1), on_press=lambda x: self.toggle_contents())
+        bar.add_widget(self.mode_button)
+        self.add_widget(bar)
+
+        self.status = Label(text='', size_hint=(1, 0.06))
+        self.add_widget(self.status)
+        self.results = FileList(self, size_hint=(1, 0.84))
+        self.add_widget(self.results)
+
+        self.progress_trigger = Clock.create_trigger(lambda dt: self.search())
+        self.start_refresh()
+        self.search()
+
+    def start_refresh(self):
+        if self.index.refreshing:
+            return
+        # Not owned by the panel: the index is shared and outlives it. Set
+        # before submitting, or a fast refresh could finish first.
+        self.index.refreshing = True
+        try:
+            runtime.submit(self.index.refresh, lambda listed: self.progress_trigger(), name='file index refresh',
+                           on_done=self.on_refreshed, long=True)
+        except TaskQueueFull:
+            # Searches use the index as it is; the next open retries.
+            self.index.refreshing = False
+
+    def on_refreshed(self, changed):
+        # Contents mode may have been turned on after that refresh was past
+        # the point where it would have indexed contents.
+        if self.index.content and not self.index.content_ready:
+            self.start_refresh()
+        self.search()
+
+    def toggle_contents(self):
+        self.contents = not self.contents
+        self.mode_button.text = 'Contents' if self.contents else 'Names'
+        if self.contents and not self.index.content:
+            # Reading every text file is costly, so it waits until asked for.
+            self.index.enable_content()
+            self.start_refresh()
+        self.search()
+
+    def search(self):
+        query = self.query_input.text
+        if self.contents:
+            results = self.index.search_content(query)
+        else:
+            results = self.index.search(query)
+        self.results.set_data([{'text': rel + '/' if is_dir else rel, 'name': os.path.join(self.root, rel), 'is_dir': is_dir}
+                               for rel, is_dir in results])
+        if query.strip():
+            status = f'{len(results)} results'
+        elif self.contents:
+            status = f'{len(self.index.content_files)} text files indexed'
+            if self.index.content_skipped:
+                status += f', {self.index.content_skipped} left out'
+        else:
+            status = f'{len(self.index.paths)} files indexed'
+        if self.index.refreshing:
+            status += ' (indexing...)'
+        self.status.text = status
+
+    def open_item(self, path, is_dir):
+        self.on_pick(path, is_dir)
+
+class FileManager(BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(orientation='vertical', **kwargs)
+        self.current_path = ROOT_PATH
+        self.entries = []
+        self.generation = 0
+        self.view_generation = 0
+        self.pending = deque()
+        self.flush_trigger = Clock.create_trigger(self.flush_batches)
+        self.loading = False
+        self.sort_key = 'name'
+        self.sort_reverse = False
+
+        # Filter and sort controls
+        tools = BoxLayout(size_hint=(1, 0.08))
+        self.filter_input = TextInput(hint_text='Filter', multiline=False)
+        # Re-filter once typing pauses, not on every keystroke.
+        self.filter_trigger = Clock.create_trigger(lambda dt: self.update_view(), 0.2)
+        self.filter_input.bind(text=lambda instance, text: self.filter_trigger())
+        tools.add_widget(self.filter_input)
+        self.sort_button = Button(text='Sort: name', size_hint=(0.3, 1), on_press=self.next_sort)
+        tools.add_widget(self.sort_button)
+        self.order_button = Button(text='Asc', size_hint=(0.15, 1), on_press=self.toggle_order)
+        tools.add_widget(self.order_button)
+        self.add_widget(tools)
+
+        self.status = Label(text='', size_hint=(1, 0.05))
+        self.add_widget(self.status)
+
+        # Virtualized file list: only the rows on screen exist as widgets.
+        self.file_list = FileList(self, size_hint=(1, 0.77))
+        self.add_widget(self.file_list)
+
+        # Navigation buttons
+        nav = BoxLayout(size_hint=(1, 0.1))
+        nav.add_widget(Button(text='Back', on_press=self.go_back))
+        nav.add_widget(Button(text='New File', on_press=self.new_file))
+        nav.add_widget(Button(text='New Folder', on_press=self.new_folder))
+        nav.add_widget(Button(text='Rename', on_press=self.rename_item))
+        nav.add_widget(Button(text='Search', on_press=self.open_search))
+        self.add_widget(nav)
+
+        self.refresh()
+
+    def refresh(self):
+        """Relists the current folder on a worker thread."""
+        self.generation += 1
+        generation = self.generation
+        self.entries = []
+        self.pending.clear()
+        self.file_list.set_data([])
+        self.loading = True
+        self.status.text = 'Loading...'
+        with_stat = self.sort_key != 'name'
+        path = self.current_path
+
+        def on_batch(batch, done, error):
+            self.pending.append((generation, batch, done, error))
+            self.flush_trigger()
+
+        runtime.submit(list_directory, path, with_stat, lambda: generation == self.generation, on_batch,
+                       owner=self, key='listing', name='list folder')
+
+    def flush_batches(self, *args):
+        # The listing can arrive much faster than it can be shown; take in a
+        # frame's worth and leave the rest for the next frames.
+        budget = FRAME_BUDGET
+        while self.pending and budget > 0:
+            generation, batch, done, error = self.pending.popleft()
+            self.add_batch(generation, batch, done, error)
+            budget -= len(batch)
+        if self.pending:
+            self.flush_trigger()
+
+    def add_batch(self, generation, batch, done, error):
+        if generation != self.generation:
+            return
+        self.entries.extend(batch)
+        if done:
+            self.loading = False
+            if error is not None:
+                self.show_popup(f"Error: {str(error)}")
+            self.update_view(keep_scroll=True)
+        else:
+            # Show what has arrived so far; it is sorted once the listing ends.
+            rows = self.rows(sort_entries(self.filtered(batch), self.sort_key, self.sort_reverse))
+            self.file_list.extend(rows)
+            self.status.text = f'Loading... {len(self.entries)} items'
+
+    def filtered(self, entries, text=None):
+        if text is None:
+            text = self.filter_input.text
+        text = text.strip().lower()
+        if not text:
+            return entries
+        return [e for e in entries if text in e[0].lower()]
+
+    def rows(self, entries):
+        return [{'text': name + '/' if is_dir else name, 'name': name, 'is_dir': is_dir}
+                for name, is_dir, size, mtime in entries]
+
+    def update_view(self, keep_scroll=False):
+        """Filters and sorts the listing on a worker, then shows the result."""
+        self.view_generation += 1
+        token = (self.generation, self.view_generation)
+        # Batches are still being appended while loading; work on a copy.
+        entries = list(self.entries) if self.loading else self.entries
+        text, sort_key, sort_reverse = self.filter_input.text, self.sort_key, self.sort_reverse
+
+        def build():
+            return self.rows(sort_entries(self.filtered(entries, text), sort_key, sort_reverse))
+
+        # A newer view (the next keystroke) cancels this one.
+        runtime.submit(build, owner=self, key='view', name='build view',
+                       on_done=lambda rows: self.show_rows(token, rows, len(entries), keep_scroll))
+
+    def show_rows(self, token, rows, total, keep_scroll):
+        if token != (self.generation, self.view_generation):
+            return
+        self.file_list.set_data(rows, keep_scroll)
+        if not self.loading:
+            self.status.text = f'{total} items' if len(rows) == total else f'{len(rows)} of {total} items'
+
+    def next_sort(self, instance):
+        needed_stat = self.sort_key != 'name'
+        self.sort_key = SORT_KEYS[(SORT_KEYS.index(self.sort_key) + 1) % len(SORT_KEYS)]
+        self.sort_button.text = f'Sort: {self.sort_key}'
+        if self.sort_key != 'name' and not needed_stat:
+            # Sizes and dates were not read for a by-name listing.
+            self.refresh()
+        else:
+            self.update_view(keep_scroll=True)
+
+    def toggle_order(self, instance):
+        self.sort_reverse = not self.sort_reverse
+        self.order_button.text = 'Desc' if self.sort_reverse else 'Asc'
+        self.update_view()
+
+    def go_back(self, instance):
+        if self.current_path != ROOT_PATH:
+            self.current_path = os.path.dirname(self.current_path)
+            self.refresh()
+
+    def open_item(self, item, is_dir=None):
+        path = os.path.join(self.current_path, item)
+        if is_dir is None:
+            is_dir = os.path.isdir(path)
+        if is_dir:
+            self.current_path = path
+            self.filter_input.text = ''
+            self.refresh()
+        else:
+            self.open_file_editor(path)
+
+    def open_file_editor(self, path):
+        try:
+            large = os.path.getsize(path) > LARGE_FILE_SIZE or is_binary(path)
+        except OSError:
+            large = False
+        if large:
+            self.open_large_file(path)
+            return
+
+        try:
+            with open(path, 'r') as f:
+                content = f.read()
+        except:
+            content = ''
+
+        text_input = TextInput(text=content, multiline=True)
+
+        def save_file(instance):
+            try:
+                atomic_write(path, lambda f: f.write(text_input.text.encode('utf-8')))
+                popup.dismiss()
+                self.show_popup("File saved!")
+            except Exception as e:
+                self.show_popup(f"Error: {str(e)}")
+
+        layout = BoxLayout(orientation='vertical')
+        layout.add_widget(text_input)
+        btns = BoxLayout(size_hint=(1, 0.2))
+        btns.add_widget(Button(text='Save', on_press=save_file))
+        btns.add_widget(Button(text='Delete', on_press=lambda x: self.confirm_delete(path, popup)))
+        layout.add_widget(btns)
+
+        popup = Popup(title=os.path.basename(path), content=layout, size_hint=(0.9, 0.9))
+        popup.open()
+
+    def open_large_file(self, path):
+        try:
+            viewer = LargeFileViewer(path, on_close=lambda: popup.dismiss(),
+                                     on_delete=lambda: self.confirm_delete(path, popup))
+        except (OSError, ValueError) as e:
+            self.show_popup(f"Error: {str(e)}")
+            return
+        popup = Popup(title=os.path.basename(path), content=viewer, size_hint=(0.95, 0.95))
+        popup.bind(on_dismiss=lambda instance: viewer.close())
+        popup.open()
+
+    def confirm_delete(self, path, popup):
+        confirm_layout = BoxLayout(orientation='vertical')
+        confirm_label = Label(text=f"Delete {os.path.basename(path)}?")
+        confirm_layout.add_widget(confirm_label)
+
+        confirm_buttons = BoxLayout(size_hint=(1, 0.3))
+        confirm_buttons.add_widget(Button(text='Yes', on_press=lambda x: do_delete()))
+        confirm_buttons.add_widget(Button(text='No', on_press=lambda x: confirm_popup.dismiss()))
+        confirm_layout.add_widget(confirm_buttons)
+
+        confirm_popup = Popup(title='Confirm Delete', content=confirm_layout, size_hint=(0.8, 0.4))
+        confirm_popup.open()
+
+        def do_delete():
+            try:
+                os.remove(path)
+                confirm_popup.dismiss()
+                popup.dismiss()
+                self.refresh()
+                self.show_popup("File deleted!")
+            except Exception as e:
+                self.show_popup(f"Error: {str(e)}")
+
+    def new_file(self, instance):
+        self.input_popup("Enter new file name:", self.create_file)
+
+    def create_file(self, name):
+        try:
+            open(os.path.join(self.current_path, name), 'w').close()
+            self.refresh()
+        except Exception as e:
+            self.show_popup(f"Error: {str(e)}")
+
+    def new_folder(self, instance):
+        self.input_popup("Enter new folder name:", self.create_folder)
+
+    def create_folder(self, name):
+        try:
+            os.mkdir(os.path.join(self.current_path, name))
+            self.refresh()
+        except Exception as e:
+            self.show_popup(f"Error: {str(e)}")
+
+    def rename_item(self, instance):
+        self.input_popup("Enter current name:", lambda old: self.input_popup("Enter new name:", lambda new: self.do_rename(old, new)))
+
+    def do_rename(self, old, new):
+        try:
+            os.rename(os.path.join(self.current_path, old), os.path.join(self.current_path, new))
+            self.refresh()
+        except Exception as e:
+            self.show_popup(f"Error: {str(e)}")
+
+    def input_popup(self, message, callback):
+        layout = BoxLayout(orientation='vertical')
+        layout.add_widget(Label(text=message))
+        text_input = TextInput(multiline=False)
+        layout.add_widget(text_input)
+        btn = Button(text='OK', on_press=lambda x: (popup.dismiss(), callback(text_input.text)))
+        layout.add_widget(btn)
+        popup = Popup(title='Input', content=layout, size_hint=(0.8, 0.4))
+        popup.open()
+
+    def open_search(self, instance):
+        def on_pick(path, is_dir):
+            popup.dismiss()
+            self.open_item(path, is_dir)
+
+        panel = SearchPanel(ROOT_PATH, on_pick)
+        popup = Popup(title='Search', content=panel, size_hint=(0.95, 0.95))
+        popup.open()
+
+    def show_popup(self, message):
+        popup = Popup(title='Info', content=Label(text=message), size_hint=(0.8, 0.4))
+        popup.open()
+
+class FileManagerApp(App):
+    def build(self):
+        return FileManager()
+
+if __name__ == '__main__':
+    FileManagerApp().run()
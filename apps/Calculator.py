@@ -0,0 +1,128 @@
+from kivy.app import App
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.gridlayout import GridLayout
+from kivy.graphics import Color, Rectangle
+
+class CalculatorApp(App):
+    def build(self):
+        # self.expression stores the full calculation (e.g., "12+5")
+        self.expression = ""
+        # self.new_input flags when the display should be cleared for a new number
+        self.new_input = True
+        
+        main_layout = BoxLayout(orientation='vertical')
+        
+        display_container = BoxLayout(size_hint_y=0.3, padding=10)
+        with display_container.canvas.before:
+            Color(0.2, 0.2, 0.2, 1)
+            self.rect = Rectangle(size=display_container.size, pos=display_container.pos)
+        
+        # The display label is now right-aligned
+        self.display = Label(text="0", font_size=48, color=[1, 1, 1, 1],
+                             halign="right", valign="center")
+        self.display.bind(size=self.display.setter('text_size')) # Ensures alignment
+        display_container.add_widget(self.display)
+        main_layout.add_widget(display_container)
+        
+        display_container.bind(size=self.update_rect, pos=self.update_rect)
+        
+        grid_layout = GridLayout(cols=4, spacing=5, size_hint_y=0.7)
+        buttons = [
+            '7', '8', '9', '/',
+            '4', '5', '6', '*',
+            '1', '2', '3', '-',
+            '.', '0', '=', '+'
+        ]
+        
+        for button_text in buttons:
+            button = Button(text=button_text, font_size=30, background_normal='', background_color=[0.5, 0.5, 0.5, 1])
+            button.bind(on_press=self.on_button_press)
+            grid_layout.add_widget(button)
+        
+        main_layout.add_widget(grid_layout)
+        
+        # MODIFICATION: Control layout now includes the '+/-' button
+        control_layout = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=0.1)
+        
+        clear_button = Button(text="C", font_size=30, background_color=[0.8, 0.5, 0.2, 1])
+        clear_button.bind(on_press=self.clear_display)
+
+        # MODIFICATION: Added a Positive/Negative toggle button
+        sign_button = Button(text="+/-", font_size=30, background_color=[0.4, 0.4, 0.4, 1])
+        sign_button.bind(on_press=self.toggle_sign)
+        
+        control_layout.add_widget(clear_button)
+        control_layout.add_widget(sign_button) # Added button to layout
+        
+        main_layout.add_widget(control_layout)
+        
+        return main_layout
+    
+    # MODIFICATION: The entire button logic is rewritten for a better user experience
+    def on_button_press(self, instance):
+        button_text = instance.text
+        
+        if self.display.text == "Error":
+            self.clear_display(instance)
+
+        # Logic for number and decimal buttons
+        if button_text.isdigit() or button_text == '.':
+            if self.new_input:
+                self.display.text = button_text
+                self.new_input = False
+            else:
+                if button_text == '.' and '.' in self.display.text:
+                    return # Prevent multiple decimals
+                self.display.text += button_text
+        
+        # Logic for operator buttons
+        elif button_text in ['+', '-', '*', '/']:
+            # Append the last number to the expression
+            self.expression += self.display.text
+            # Append the operator
+            self.expression += button_text
+            # Set flag to start a new number input
+            self.new_input = True
+
+        # Logic for the equals button
+        elif button_text == '=':
+            if not self.expression:
+                return
+            # Append the final number to the expression and calculate
+            self.expression += self.display.text
+            try:
+                result = str(eval(self.expression))
+                self.display.text = result
+                self.expression = "" # Reset expression for next calculation
+            except (SyntaxError, ZeroDivisionError, NameError):
+                self.display.text = "Error"
+                self.expression = ""
+            self.new_input = True
+
+    def clear_display(self, instance):
+        self.display.text = "0"
+        self.expression = ""
+        self.new_input = True
+
+    # MODIFICATION: Added function to toggle the number's sign
+    def toggle_sign(self, instance):
+        """Toggles the sign of the currently displayed number."""
+        if self.display.text == "Error" or self.display.text == "0":
+            return
+            
+        if self.display.text.startswith('-'):
+            # Remove the negative sign
+            self.display.text = self.display.text[1:]
+        else:
+            # Add a negative sign
+            self.display.text = '-' + self.display.text
+
+    def update_rect(self, instance, value):
+        self.rect.pos = instance.pos
+        self.rect.size = instance.size
+    
+if __name__ == '__main__':
+    CalculatorApp().run()
+
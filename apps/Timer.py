@@ -0,0 +1,114 @@
+import kivy
+from kivy.app import App
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.button import Button
+from kivy.uix.textinput import TextInput
+from kivy.uix.spinner import Spinner
+from kivy.clock import Clock
+from kivy.core.window import Window
+from functools import partial
+
+# Set a darker background color for the window
+Window.clearcolor = (0.1, 0.1, 0.1, 1)
+
+class TimerApp(App):
+    def build(self):
+        self.remaining_seconds = 0
+        self.running = False
+        self.countdown_event = None
+
+        # Main layout
+        main_layout = BoxLayout(orientation='vertical', padding=20, spacing=20)
+
+        # Title Label
+        title_label = Label(text="Timer", font_size='40sp', color=(1, 1, 1, 1))
+        main_layout.add_widget(title_label)
+
+        # Time remaining label
+        self.time_label = Label(text="00:00:00", font_size='80sp', bold=True, color=(0.8, 0.8, 0.8, 1))
+        main_layout.add_widget(self.time_label)
+
+        # Generate lists for spinner values
+        hours_list = [str(i) for i in range(24)]
+        minutes_list = [str(i) for i in range(60)]
+        seconds_list = [str(i) for i in range(60)]
+
+        # Input field and buttons layout
+        input_layout = BoxLayout(spacing=10, size_hint=(1, 0.1))
+        self.spinner_hours = Spinner(text="0", values=hours_list, font_size='25sp', size_hint_x=0.33, size_hint_y=2)
+        self.spinner_minutes = Spinner(text="0", values=minutes_list, font_size='25sp', size_hint_x=0.33, size_hint_y=2)
+        self.spinner_seconds = Spinner(text="0", values=seconds_list, font_size='25sp', size_hint_x=0.33, size_hint_y=2)
+        input_layout.add_widget(self.spinner_hours)
+        input_layout.add_widget(self.spinner_minutes)
+        input_layout.add_widget(self.spinner_seconds)
+        main_layout.add_widget(input_layout)
+
+        # Control buttons layout
+        button_layout = BoxLayout(spacing=10, size_hint=(1, 0.1))
+        self.start_button = Button(text="Start", font_size='25sp', background_color=(0.2, 0.7, 0.2, 1))
+        self.start_button.bind(on_press=self.start_timer)
+        self.stop_button = Button(text="Stop", font_size='25sp', background_color=(0.7, 0.2, 0.2, 1))
+        self.stop_button.bind(on_press=self.stop_timer)
+        button_layout.add_widget(self.start_button)
+        button_layout.add_widget(self.stop_button)
+        main_layout.add_widget(button_layout)
+        
+        # Message label for errors or status
+        self.status_label = Label(text="", font_size='20sp', color=(0.9, 0.2, 0.2, 1))
+        main_layout.add_widget(self.status_label)
+
+        return main_layout
+
+    def start_timer(self, instance):
+        if self.running:
+            return
+
+        try:
+            hours = int(self.spinner_hours.text)
+            minutes = int(self.spinner_minutes.text)
+            seconds = int(self.spinner_seconds.text)
+            
+            total_seconds = hours * 3600 + minutes * 60 + seconds
+
+            if total_seconds <= 0:
+                self.status_label.text = "Duration must be > 0"
+                return
+
+            self.remaining_seconds = total_seconds
+            self.running = True
+            self.status_label.text = f"Timer set for {hours}h {minutes}m {seconds}s"
+            
+            # Schedule the update function to run every second
+            self.countdown_event = Clock.schedule_interval(self.update_time, 1)
+
+        except ValueError:
+            self.status_label.text = "Invalid input! Use numbers only."
+
+    def stop_timer(self, instance):
+        if self.running:
+            self.running = False
+            self.status_label.text = "Timer cancelled!"
+            # Stop the scheduled event
+            if self.countdown_event:
+                self.countdown_event.cancel()
+
+    def update_time(self, dt):
+        if self.running:
+            self.remaining_seconds -= 1
+            if self.remaining_seconds <= 0:
+                self.remaining_seconds = 0
+                self.running = False
+                self.status_label.text = "Time's up!"
+                # Cancel the clock event to stop updates
+                if self.countdown_event:
+                    self.countdown_event.cancel()
+            
+            h = self.remaining_seconds // 3600
+            m = (self.remaining_seconds % 3600) // 60
+            s = self.remaining_seconds % 60
+            
+            self.time_label.text = f"{h:02}:{m:02}:{s:02}"
+            
+if __name__ == '__main__':
+    TimerApp().run()
@@ -0,0 +1,199 @@
+import os
+import sys
+from kivy.app import App
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.progressbar import ProgressBar
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.textinput import TextInput
+from kivy.uix.togglebutton import ToggleButton
+from kivy.clock import Clock
+
+try:
+    from downloads import download_engine
+except ImportError:
+    # Running on its own: the ZOS modules live two folders up.
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from downloads import download_engine
+from tasks import runtime, current_task, TaskQueueFull
+from appindex import AppIndex
+from catalog import get_catalog, make_receipt, RECEIPT_NAME, ALL, INSTALLED, UPDATES
+
+class ZStoreApp:
+    def __init__(self, main_layout, apps_dir=None, on_installed=None, app_index=None):
+        self.main_layout = main_layout
+        if apps_dir is None:
+            # Standalone: this script sits in Apps/ZStore.
+            apps_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.apps_dir = apps_dir
+        self.on_installed = on_installed
+        self.downloading = False
+        if app_index is None:
+            app_index = AppIndex(apps_dir)
+            app_index.load()
+            app_index.refresh()
+        self.app_index = app_index
+
+        self.catalog = get_catalog()
+        self.installed = self.catalog.installed_versions(self.app_index)
+        self.show = ALL
+
+        self.output_label = Label(text="", size_hint_y=None, height=40)
+        self.progress_bar = ProgressBar(max=1, value=0, size_hint_y=None, height=20)
+        self.search_input = TextInput(hint_text="Search apps", multiline=False, size_hint_y=None, height=40)
+        # Rebuild the list once typing pauses, not on every keystroke.
+        self.search_trigger = Clock.create_trigger(lambda dt: self.update_list(), 0.15)
+        self.search_input.bind(text=lambda instance, text: self.search_trigger())
+
+        self.filter_bar = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        for show, text in ((ALL, "All"), (INSTALLED, "Installed"), (UPDATES, "Updates")):
+            button = ToggleButton(text=text, group='zstore_filter', state='down' if show == ALL else 'normal', allow_no_selection=False)
+            button.bind(on_press=lambda instance, show=show: self.set_filter(show))
+            self.filter_bar.add_widget(button)
+
+        self.show_app_list()
+        # Show the cached catalog right away and revalidate it behind it.
+        self.catalog.refresh(self.on_catalog_refreshed, owner=self)
+
+    def show_app_list(self):
+        self.output_label.text = "ZStore"
+        
+        self.app_list_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=10)
+        self.app_list_layout.bind(minimum_height=self.app_list_layout.setter('height'))
+        
+        scroll_view = ScrollView(size_hint=(1, 1))
+        scroll_view.add_widget(self.app_list_layout)
+
+        self.main_layout.clear_widgets()
+        self.main_layout.add_widget(self.output_label)
+        self.main_layout.add_widget(self.search_input)
+        self.main_layout.add_widget(self.filter_bar)
+        self.main_layout.add_widget(self.progress_bar)
+        self.main_layout.add_widget(scroll_view)
+        self.update_list()
+
+    def update_list(self):
+        self.app_list_layout.clear_widgets()
+        for app in self.catalog.search(self.search_input.text, self.show, self.installed):
+            btn = Button(text=self.describe(app), size_hint_y=None, height=50, halign='center')
+            btn.bind(on_press=lambda instance, app=app: self.on_app_button_press(app))
+            self.app_list_layout.add_widget(btn)
+
+    def describe(self, app):
+        text = app.get('name', app['id'])
+        if app.get('version'):
+            text += f"  v{app['version']}"
+        if app.get('size'):
+            text += f"  ({app['size'] / 1024:.0f} KB)"
+        if self.catalog.has_update(app, self.installed):
+            text += "  - update available"
+        elif app['id'] in self.installed:
+            text += "  - installed"
+        return text
+
+    def set_filter(self, show):
+        self.show = show
+        self.update_list()
+
+    def on_catalog_refreshed(self, changed):
+        if changed:
+            self.installed = self.catalog.installed_versions(self.app_index)
+            self.update_list()
+        if self.downloading:
+            return
+        updates = len(self.catalog.updates(self.installed))
+        if changed is None:
+            self.output_label.text = "ZStore (offline)"
+        elif updates:
+            self.output_label.text = f"ZStore - {updates} update{'s' if updates != 1 else ''} available"
+
+    def on_app_button_press(self, app):
+        if self.downloading:
+            return
+        # Downloads in the background; closing ZStore cancels it (what has
+        # arrived is kept, so the next attempt resumes).
+        try:
+            runtime.submit(self.download_app, app, owner=self, name='zstore download', long=True,
+                           on_done=self.show_download_success, on_error=self.show_download_error)
+        except TaskQueueFull:
+            self.output_label.text = "ZStore is busy; try again in a moment."
+            return
+        self.downloading = True
+        self.output_label.text = "Downloading..."
+        self.progress_bar.value = 0
+
+    def download_app(self, app):
+        """Runs on the task runtime; returns `app` once it is installed."""
+        task = current_task()
+        url = app['url']
+        local_name = self.catalog.folder(app)
+        # Check if the URL is for a file or a folder
+        if "raw.githubusercontent.com" in url:
+            files = [{'path': os.path.basename(url), 'url': url, 'size': app.get('size'), 'sha256': app.get('sha256')}]
+        elif "/tree/" in url:
+            runtime.call_on_ui(self.update_status, "Listing files...", task=task)
+            files = download_engine.list_github_folder(url)
+        else:
+            raise ValueError("Unsupported URL format.")
+
+        # Progress comes from the download threads; shown on the UI thread.
+        download_engine.install(files, self.apps_dir, local_name,
+                                on_progress=lambda progress: runtime.call_on_ui(self.show_progress, progress, task=task),
+                                cancel=task.cancel_event, extra_files={RECEIPT_NAME: make_receipt(app)})
+        return app
+
+    def show_progress(self, progress):
+        if not self.downloading:
+            return
+        if progress['total_bytes']:
+            self.progress_bar.max = progress['total_bytes']
+            self.progress_bar.value = min(progress['bytes'], progress['total_bytes'])
+        else:
+            self.progress_bar.max = max(progress['total_files'], 1)
+            self.progress_bar.value = progress['files']
+        self.output_label.text = (f"Downloading {progress['files']}/{progress['total_files']}: "
+                                  f"{progress['current'] or ''} ({progress['bytes'] / 1024:.0f} KB)")
+
+    def update_status(self, text):
+        """Updates the output label on the main thread."""
+        self.output_label.text = text
+    
+    def show_download_success(self, app):
+        self.downloading = False
+        self.progress_bar.value = self.progress_bar.max
+        self.output_label.text = f"'{app.get('name', app['id'])}' successfully downloaded."
+        self.app_index.refresh()
+        self.installed[app['id']] = app.get('version')
+        self.update_list()
+        if self.on_installed:
+            self.on_installed(app)
+        
+    def show_download_error(self, error):
+        # Whatever arrived is kept, so trying again resumes the download.
+        self.downloading = False
+        self.output_label.text = f"An error occurred: {error}"
+
+class ZStoreGUIApp(App):
+    def __init__(self, zos_app_instance=None, settings=None, **kwargs):
+        super().__init__(**kwargs)
+        self.zos = zos_app_instance
+        self.settings = settings or {}
+
+    def build(self):
+        self.root_layout = BoxLayout(orientation='vertical')
+        apps_dir = self.zos.apps_dir if self.zos else None
+        app_index = self.zos.app_index if self.zos else None
+        self.zos_app = ZStoreApp(self.root_layout, apps_dir, on_installed=self.on_installed, app_index=app_index)
+        return self.root_layout
+
+    def on_stop(self):
+        runtime.cancel_owner(self.zos_app)
+
+    def on_installed(self, app):
+        if self.zos:
+            # Make the new app show up without restarting ZOS.
+            self.zos.load_apps_menu()
+
+if __name__ == '__main__':
+    ZStoreGUIApp().run()
@@ -0,0 +1,16 @@
+#!/bin/bash
+# Rebuilds the bundled app packages in "ZOS GUI/Apps" from the sources here.
+# Usage: apps/build.sh [App name ...]   (default: every app in this folder)
+
+cd "$(dirname "$0")" || exit 1
+zpkg_tool="../ZOS GUI/zpkg.py"
+
+if [ $# -eq 0 ]; then
+    set -- *.py
+fi
+
+for source in "$@"; do
+    name="$(basename "$source" .py)"
+    mkdir -p "../ZOS GUI/Apps/$name"
+    python3 "$zpkg_tool" build "$name.py" -o "../ZOS GUI/Apps/$name/$name.zpkg" || exit 1
+done
@@ -0,0 +1,377 @@
+"""Headless launch-latency benchmarks for ZOS.
+
+Drives ZOSApp through Kivy's offscreen window (no display or GPU needed)
+and times how long a tap on an icon takes to give a usable app:
+
+- Kivy apps: run_app() until the app's first frame has been drawn
+- CLI apps: run_app() until the first output line reaches the console
+- the home screen: load_apps_menu() with 10 to 1,000 installed apps
+
+Apps are generated: scripts and .zpkg packages with varying code size,
+asset size and compression, launched straight from the archive and with
+extract_packages=1. Each sample runs in a fresh interpreter with an empty
+Cache folder. Its first launch is "cold" and the relaunches after it are
+"warm". (The OS page cache stays warm across samples, as it would on a
+device.)
+
+    python benchmarks/bench_launch.py -o results.json
+    python benchmarks/bench_launch.py --quick --compare baseline.json
+
+Results are JSON: p50/p95 of cold and warm latency in ms and the peak RSS
+per scenario. With --compare, the exit status is 1 if any p50 got more than
+--threshold slower than in the baseline.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ZOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ZOS GUI')
+ZOS_DIR = os.path.abspath(ZOS_DIR)
+
+HEADLESS_ENV = {
+    'SDL_VIDEODRIVER': 'offscreen',
+    'KIVY_WINDOW': 'sdl2',
+    'KIVY_GL_BACKEND': 'mock',
+    'KIVY_NO_ARGS': '1',
+    'KIVY_NO_CONSOLELOG': '1',
+    'KIVY_NO_FILELOG': '1',
+    # Weather lookups on the lock screen fail fast instead of waiting.
+    'ZOS_WEATHER_URL': 'http://127.0.0.1:9',
+}
+
+# Code size of generated apps: number of extra functions in the script.
+CODE_SIZES = {'small': 0, 'large': 3000}
+ASSET_SIZES = {'0MB': 0, '1MB': 1 << 20, '8MB': 8 << 20}
+MENU_SIZES = [10, 100, 1000]
+LAUNCH_TIMEOUT = 30
+
+KIVY_APP = '''from kivy.app import App
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+
+{functions}
+
+class BenchApp(App):
+    def build(self):
+        root = BoxLayout(orientation='vertical')
+        for i in range({widgets}):
+            root.add_widget(Button(text='Button %d' % i))
+        return root
+'''
+
+CLI_APP = '''import sys
+
+{functions}
+
+print("ready", flush=True)
+'''
+
+def filler(count):
+    return '\n'.join(f"def helper_{i}(x):\n    return [x * {i}, str(x) + '{i}']\n" for i in range(count))
+
+# ---------------- Fixtures ----------------
+def make_workdir(root, name):
+    """A folder laid out like ZOS GUI: Assets, Apps/Settings and settings."""
+    workdir = os.path.join(root, name)
+    os.makedirs(os.path.join(workdir, 'Apps', 'Settings'))
+    os.symlink(os.path.join(ZOS_DIR, 'Assets'), os.path.join(workdir, 'Assets'))
+    settings_dir = os.path.join(ZOS_DIR, 'Apps', 'Settings')
+    for file_name in ('Settings.py', 'icon.png'):
+        shutil.copy(os.path.join(settings_dir, file_name), os.path.join(workdir, 'Apps', 'Settings', file_name))
+    return workdir
+
+def write_app(apps_dir, name, source, assets=0, codec=None):
+    """Writes an app folder (or packs it into a .zpkg with `codec`)."""
+    sys.path.insert(0, ZOS_DIR)
+    import zpkg
+    folder = os.path.join(apps_dir, name)
+    source_dir = os.path.join(apps_dir, '.src', name) if codec else folder
+    os.makedirs(source_dir)
+    with open(os.path.join(source_dir, 'main.py'), 'w') as f:
+        f.write(source)
+    if assets:
+        with open(os.path.join(source_dir, 'assets.bin'), 'wb') as f:
+            # Random bytes: the worst case for the codec.
+            f.write(os.urandom(assets))
+    if not codec:
+        return os.path.join('Apps', name, 'main.py')
+    os.makedirs(folder)
+    output = os.path.join(folder, name + '.zpkg')
+    zpkg.build(source_dir, output, codec=codec)
+    return os.path.join('Apps', name, name + '.zpkg')
+
+def launch_scenarios(root, quick=False):
+    sys.path.insert(0, ZOS_DIR)
+    import zpkg
+    workdir = make_workdir(root, 'launch')
+    apps_dir = os.path.join(workdir, 'Apps')
+    codecs = ['xz', 'gz', 'stored'] + (['zstd'] if zpkg.zstandard is not None else [])
+    if quick:
+        codecs = ['xz']
+    scenarios = []
+
+    def add(name, path, kind, settings=None):
+        scenarios.append({'name': name, 'kind': kind, 'workdir': workdir, 'path': path,
+                          'app_name': name, 'settings': settings or {}})
+
+    for size in (['small'] if quick else CODE_SIZES):
+        kivy_source = KIVY_APP.format(functions=filler(CODE_SIZES[size]), widgets=20)
+        add(f'kivy-script-{size}', write_app(apps_dir, f'kivy_{size}', kivy_source), 'kivy')
+        cli_source = CLI_APP.format(functions=filler(CODE_SIZES[size]))
+        add(f'cli-script-{size}', write_app(apps_dir, f'cli_{size}', cli_source), 'cli')
+
+    kivy_source = KIVY_APP.format(functions=filler(CODE_SIZES['small']), widgets=20)
+    for codec in codecs:
+        for assets in (['1MB'] if quick else ASSET_SIZES):
+            name = f'kivy_{codec}_{assets}'
+            path = write_app(apps_dir, name, kivy_source, ASSET_SIZES[assets], codec)
+            add(f'kivy-zpkg-{codec}-{assets}', path, 'kivy')
+            add(f'kivy-zpkg-{codec}-{assets}-extract', path, 'kivy', {'extract_packages': '1'})
+    cli_source = CLI_APP.format(functions=filler(CODE_SIZES['small']))
+    path = write_app(apps_dir, 'cli_xz', cli_source, 0, 'xz')
+    add('cli-zpkg-xz', path, 'cli')
+    if not quick:
+        add('cli-script-small-zygote', os.path.join('Apps', 'cli_small', 'main.py'), 'cli', {'zygote': '1'})
+    shutil.rmtree(os.path.join(apps_dir, '.src'), ignore_errors=True)
+    return scenarios
+
+def menu_scenarios(root, quick=False):
+    scenarios = []
+    for count in (MENU_SIZES[:2] if quick else MENU_SIZES):
+        workdir = make_workdir(root, f'menu-{count}')
+        for i in range(count):
+            write_app(os.path.join(workdir, 'Apps'), f'app{i:04d}', 'print("hi")\n')
+        scenarios.append({'name': f'menu-{count}', 'kind': 'menu', 'workdir': workdir, 'settings': {}})
+    return scenarios
+
+# ---------------- Worker ----------------
+def peak_rss():
+    import resource
+    # ru_maxrss is in KB on Linux (bytes on macOS).
+    scale = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, children
+
+def pump(EventLoop, done, timeout=LAUNCH_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("app did not become usable in time")
+        EventLoop.idle()
+        time.sleep(0.001)
+
+def run_worker(spec, warm_runs):
+    """Runs inside a fresh interpreter: one cold launch, then warm ones."""
+    import runpy
+    os.chdir(spec['workdir'])
+    with open(os.path.join('Apps', 'Settings', 'settings.txt'), 'w') as f:
+        f.write('city=Bench\n')
+        for key, value in spec['settings'].items():
+            f.write(f'{key}={value}\n')
+    sys.path.insert(0, ZOS_DIR)
+    from kivy.base import EventLoop
+    zos = runpy.run_path(os.path.join(ZOS_DIR, 'ZOS.py'), run_name='zos_bench')
+    app = zos['ZOSApp']()
+    app.build()
+    app.finish_startup()
+    EventLoop.ensure_window()
+    app.sm.current = 'main'
+    EventLoop.idle()
+
+    def launch():
+        start = time.perf_counter()
+        if spec['kind'] == 'menu':
+            app.shown_apps = None
+            app.load_apps_menu()
+            EventLoop.idle()
+        elif spec['kind'] == 'kivy':
+            app.run_app(spec['path'], spec['app_name'])
+            # Usable once its first frame is on screen.
+            EventLoop.idle()
+        else:
+            app.run_app(spec['path'], spec['app_name'])
+            console = app.session.view
+            pump(EventLoop, lambda: len(console.lines) > 1)
+        elapsed = (time.perf_counter() - start) * 1000
+        if spec['kind'] != 'menu':
+            app.go_back(None)
+            EventLoop.idle()
+        return elapsed
+
+    if spec['kind'] == 'menu':
+        # Startup already listed the apps; start over from an empty index
+        # and no tiles, as on first boot.
+        from appindex import AppIndex
+        if os.path.exists(app.app_index.index_file):
+            os.remove(app.app_index.index_file)
+        app.app_index = AppIndex(app.apps_dir)
+        app.app_tiles = {}
+
+    cold = launch()
+    warm = [launch() for _ in range(warm_runs)]
+    if spec['kind'] == 'kivy':
+        error = [w for w in app.app_container.walk() if getattr(w, 'text', '').startswith(('Failed', 'Kivy app failed'))]
+        if error:
+            raise RuntimeError(error[0].text)
+    own, children = peak_rss()
+    app.on_stop()
+    return {'cold_ms': cold, 'warm_ms': warm, 'peak_rss': own, 'peak_child_rss': children}
+
+# ---------------- Runner ----------------
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return round(ordered[int(rank) - 1], 2)
+
+def run_scenario(spec, samples, warm_runs, root):
+    cold = []
+    warm = []
+    rss = []
+    child_rss = []
+    errors = []
+    for sample in range(samples):
+        spec_file = os.path.join(root, 'spec.json')
+        result_file = os.path.join(root, 'result.json')
+        with open(spec_file, 'w') as f:
+            json.dump(spec, f)
+        if os.path.exists(result_file):
+            os.remove(result_file)
+        env = dict(os.environ)
+        for key, value in HEADLESS_ENV.items():
+            env.setdefault(key, value)
+        # Every sample starts from an empty cache.
+        env['ZOS_CACHE_DIR'] = os.path.join(root, f'cache-{sample}')
+        shutil.rmtree(env['ZOS_CACHE_DIR'], ignore_errors=True)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', spec_file,
+                   '--result', result_file, '--warm', str(warm_runs)]
+        process = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                 timeout=LAUNCH_TIMEOUT * (warm_runs + 4))
+        shutil.rmtree(env['ZOS_CACHE_DIR'], ignore_errors=True)
+        if process.returncode != 0 or not os.path.exists(result_file):
+            errors.append(process.stderr.decode('utf-8', 'replace').strip().splitlines()[-1:] or ['worker failed'])
+            continue
+        with open(result_file) as f:
+            result = json.load(f)
+        cold.append(result['cold_ms'])
+        warm.extend(result['warm_ms'])
+        rss.append(result['peak_rss'])
+        child_rss.append(result['peak_child_rss'])
+
+    report = {
+        'name': spec['name'],
+        'kind': spec['kind'],
+        'samples': len(cold),
+        'cold': {'p50': percentile(cold, 50), 'p95': percentile(cold, 95), 'n': len(cold)},
+        'warm': {'p50': percentile(warm, 50), 'p95': percentile(warm, 95), 'n': len(warm)},
+        'peak_rss_mb': round(max(rss) / 1048576, 1) if rss else None,
+    }
+    if spec['kind'] == 'cli' and child_rss:
+        report['peak_child_rss_mb'] = round(max(child_rss) / 1048576, 1)
+    if errors:
+        report['errors'] = [line for lines in errors for line in lines]
+    return report
+
+def environment():
+    # Importing Kivy here would make it parse this script's arguments.
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        kivy_version = version('kivy')
+    except (ImportError, PackageNotFoundError):
+        kivy_version = None
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ZOS_DIR, capture_output=True,
+                                  text=True).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        'python': platform.python_version(),
+        'kivy': kivy_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'revision': revision,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def compare(results, baseline_file, threshold):
+    """Names the scenarios whose p50 regressed by more than `threshold`."""
+    with open(baseline_file) as f:
+        baseline = {row['name']: row for row in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        old = baseline.get(row['name'])
+        if not old:
+            continue
+        for phase in ('cold', 'warm'):
+            before, after = old[phase]['p50'], row[phase]['p50']
+            if before and after and after > before * (1 + threshold):
+                regressions.append(f"{row['name']} {phase} p50 {before} -> {after} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless launch-latency benchmarks for ZOS.")
+    parser.add_argument('-o', '--output', help="write the JSON results here (default: stdout)")
+    parser.add_argument('-n', '--samples', type=int, default=5, help="fresh processes per scenario (default: 5)")
+    parser.add_argument('--warm', type=int, default=5, help="warm relaunches per process (default: 5)")
+    parser.add_argument('-k', '--filter', help="only run scenarios whose name contains this")
+    parser.add_argument('--quick', action='store_true', help="a small matrix with 3 samples, for a smoke run")
+    parser.add_argument('--compare', help="baseline results to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed p50 slowdown vs the baseline (default: 0.2)")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        with open(args.worker) as f:
+            spec = json.load(f)
+        result = run_worker(spec, args.warm)
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        # Skip interpreter teardown (Kivy, zygotes); the result is written.
+        os._exit(0)
+
+    samples = 3 if args.quick and args.samples == 5 else args.samples
+    root = tempfile.mkdtemp(prefix='zos-bench-')
+    try:
+        scenarios = launch_scenarios(root, args.quick) + menu_scenarios(root, args.quick)
+        if args.filter:
+            scenarios = [spec for spec in scenarios if args.filter in spec['name']]
+        results = []
+        for spec in scenarios:
+            row = run_scenario(spec, samples, args.warm, root)
+            results.append(row)
+            print(f"{row['name']:<32} cold p50 {row['cold']['p50']} p95 {row['cold']['p95']}  "
+                  f"warm p50 {row['warm']['p50']} p95 {row['warm']['p95']} ms  "
+                  f"rss {row['peak_rss_mb']} MB{'  ERRORS' if 'errors' in row else ''}", file=sys.stderr)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    output = json.dumps({'environment': environment(), 'results': results}, indent=1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    status = 0
+    if any('errors' in row for row in results):
+        status = 2
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        if regressions:
+            status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
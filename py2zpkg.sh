@@ -1,23 +1,19 @@
-read -p "Enter the name of the Python file (e.g., my_script.py): " py_file
+read -p "Enter the Python file or app folder to package (e.g., my_script.py): " app_source
 
-if [ ! -f "$py_file" ]; then
-    echo "Error: File '$py_file' not found."
+if [ ! -e "$app_source" ]; then
+    echo "Error: '$app_source' not found."
     exit 1
 fi
 
-archive_xz="${py_file%.*}.tar.xz"
-archive_zpkg="${py_file%.*}.zpkg"
+# The real work (manifest, compression) is done by the zpkg build tool.
+zpkg_tool="$(dirname "$0")/ZOS GUI/zpkg.py"
 
-echo "Compressing '$py_file' to '$archive_xz'..."
-tar -cJf "$archive_xz" "$py_file"
+echo "Packaging '$app_source'..."
+python3 "$zpkg_tool" build "$app_source" "$@"
 
-if [ $? -eq 0 ]; then
-    echo "Renaming '$archive_xz' to '$archive_zpkg'..."
-    mv "$archive_xz" "$archive_zpkg"
-    echo "Successfully created '$archive_zpkg'."
-else
-    echo "Error: 'tar' command failed. Aborting."
+if [ $? -ne 0 ]; then
+    echo "Error: packaging failed. Aborting."
+    exit 1
 fi
 
 exit 0
-
@@ -0,0 +1,82 @@
+"""Shared setup for the tests: ZOS modules on the path, a throwaway cache
+folder and a local HTTP server whose answers each test scripts."""
+import os
+import sys
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ZOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ZOS GUI')
+if ZOS_DIR not in sys.path:
+    sys.path.insert(0, ZOS_DIR)
+# Must be set before zpkg is imported, which every network module does.
+CACHE_DIR = tempfile.mkdtemp(prefix='zos-test-cache-')
+os.environ.setdefault('ZOS_CACHE_DIR', CACHE_DIR)
+
+
+class StubServer:
+    """An http.server on 127.0.0.1 that hands each GET to `handle`.
+
+    handle(request) returns (status, headers, body) and may read
+    request.path and request.headers. Every request is recorded in
+    `requests` as (path, headers).
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                status, headers, body = stub.handle(self)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path=''):
+        return f"http://127.0.0.1:{self.server.server_port}/{path.lstrip('/')}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def temp_dir(test):
+    """A temporary folder removed when `test` finishes."""
+    path = tempfile.mkdtemp(prefix='zos-test-')
+    test.addCleanup(shutil.rmtree, path, True)
+    return path
+
+
+def write_files(root, files):
+    """Creates `files` ({relative path: text}) under root; returns root."""
+    for relative, text in files.items():
+        path = os.path.join(root, *relative.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+    return root
+
+
+def stub_server(test, handle):
+    server = StubServer(handle)
+    test.addCleanup(server.close)
+    return server
@@ -0,0 +1,81 @@
+import os
+import unittest
+from unittest import mock
+
+import support
+from appindex import AppIndex
+
+
+class AppIndexTests(unittest.TestCase):
+    def setUp(self):
+        root = support.temp_dir(self)
+        self.apps_dir = support.write_files(os.path.join(root, 'Apps'), {
+            'Calculator/Calculator.zpkg': '',
+            'Calculator/icon.png': '',
+            'Timer/Timer.py': '',
+            'Settings/Settings.py': '',
+            'Gallery/Gallery.py': '',
+            '.NewApp.download/main.py': '',
+        })
+        self.index_file = os.path.join(root, 'apps.json')
+
+    def index(self):
+        index = AppIndex(self.apps_dir, index_file=self.index_file, default_icon='default.png')
+        index.load()
+        return index
+
+    def touch(self, relative=''):
+        # Folder mtimes move on every change; forced here so the test does
+        # not depend on the filesystem's timestamp resolution.
+        path = os.path.join(self.apps_dir, relative)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    def names(self, apps):
+        return [app['name'] for app in apps]
+
+    def test_lists_apps(self):
+        apps = self.index().refresh()
+        # Hidden folders are left out; Settings always comes last.
+        self.assertEqual(self.names(apps), ['Calculator', 'Timer', 'Settings'])
+        calculator = apps[0]
+        self.assertEqual(calculator['kind'], 'zpkg')
+        self.assertEqual(calculator['icon'], os.path.join(self.apps_dir, 'Calculator', 'icon.png'))
+        self.assertEqual(apps[1]['icon'], 'default.png')
+
+    def test_unchanged_folders_are_not_listed_again(self):
+        self.index().refresh()
+        index = self.index()
+        with mock.patch.object(index, '_scan_folder', wraps=index._scan_folder) as scan:
+            self.assertEqual(self.names(index.refresh()), ['Calculator', 'Timer', 'Settings'])
+        self.assertEqual(scan.call_count, 0)
+
+    def test_changed_folder_is_listed_again(self):
+        index = self.index()
+        index.refresh()
+        support.write_files(self.apps_dir, {'Timer/Stopwatch.py': ''})
+        self.touch('Timer')
+        with mock.patch.object(index, '_scan_folder', wraps=index._scan_folder) as scan:
+            apps = index.refresh()
+        self.assertEqual(self.names(apps), ['Calculator', 'Stopwatch', 'Timer', 'Settings'])
+        self.assertEqual(scan.call_count, 1)
+
+    def test_added_and_removed_folders(self):
+        index = self.index()
+        index.refresh()
+        os.rename(os.path.join(self.apps_dir, '.NewApp.download'), os.path.join(self.apps_dir, 'NewApp'))
+        self.touch()
+        self.assertEqual(self.names(index.refresh()), ['Calculator', 'main', 'Timer', 'Settings'])
+        os.remove(os.path.join(self.apps_dir, 'Timer', 'Timer.py'))
+        os.rmdir(os.path.join(self.apps_dir, 'Timer'))
+        self.touch()
+        self.assertEqual(self.names(index.refresh()), ['Calculator', 'main', 'Settings'])
+        self.assertNotIn('Timer', self.index().folders)
+
+    def test_missing_apps_folder(self):
+        index = AppIndex(os.path.join(self.apps_dir, 'nope'), index_file=self.index_file)
+        self.assertEqual(index.refresh(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import json
+import unittest
+
+import support
+from catalog import Catalog, CatalogError
+from net import HttpClient
+
+APPS = [{'id': f"App{i}", 'name': f"App {i}", 'version': '1.0',
+         'url': f"https://github.com/u/r/tree/main/App{i}"} for i in range(5)]
+
+
+class CatalogServer:
+    """Serves revision `revision` of the index with ETag "r<revision>";
+    `delta` (if set) answers ?since= requests instead of the full index."""
+
+    def __init__(self, test):
+        self.revision = 1
+        self.apps = list(APPS)
+        self.delta = None
+        self.server = support.stub_server(test, self.handle)
+
+    def handle(self, request):
+        etag = f'"r{self.revision}"'
+        if request.headers.get('If-None-Match') == etag:
+            return 304, {}, b''
+        if self.delta is not None and 'since=' in request.path:
+            body = self.delta
+        else:
+            body = {'revision': self.revision, 'apps': self.apps}
+        return 200, {'ETag': etag}, json.dumps(body).encode()
+
+
+class CatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.remote = CatalogServer(self)
+        self.cache_file = os.path.join(support.temp_dir(self), 'catalog.json')
+        self.catalog = self.open()
+
+    def open(self):
+        client = HttpClient(cache_dir=os.path.dirname(self.cache_file))
+        return Catalog(url=self.remote.server.url('catalog.json'), cache_file=self.cache_file, client=client)
+
+    def refresh(self, catalog=None):
+        return (catalog or self.catalog).refresh().result(timeout=10)
+
+    def test_first_refresh_replaces_builtin_list(self):
+        self.assertTrue(self.refresh())
+        self.assertEqual(sorted(self.catalog.apps), [app['id'] for app in APPS])
+        self.assertEqual(self.catalog.etag, '"r1"')
+
+    def test_unchanged_index_is_a_304(self):
+        self.refresh()
+        self.assertIs(self.refresh(), False)
+        path, headers = self.remote.server.requests[-1]
+        self.assertEqual(headers.get('If-None-Match'), '"r1"')
+        self.assertIn('since=1', path)
+
+    def test_cache_survives_restart(self):
+        self.refresh()
+        reopened = self.open()
+        self.assertEqual(reopened.revision, 1)
+        self.assertEqual(sorted(reopened.apps), sorted(self.catalog.apps))
+        self.assertIs(self.refresh(reopened), False)
+
+    def test_delta_is_applied(self):
+        self.refresh()
+        self.remote.revision = 2
+        self.remote.delta = {'revision': 2, 'base': 1, 'removed': ['App1'],
+                             'apps': [dict(APPS[0], version='2.0')]}
+        self.assertTrue(self.refresh())
+        self.assertEqual(self.catalog.revision, 2)
+        self.assertEqual(self.catalog.apps['App0']['version'], '2.0')
+        self.assertNotIn('App1', self.catalog.apps)
+        self.assertIn('App4', self.catalog.apps)
+
+    def test_delta_against_wrong_base_refetches_full_index(self):
+        self.refresh()
+        self.remote.revision = 3
+        self.remote.apps = APPS[:2]
+        self.remote.delta = {'revision': 3, 'base': 99, 'apps': []}
+        self.assertTrue(self.refresh())
+        # The retry asked for everything, without validators.
+        path, headers = self.remote.server.requests[-1]
+        self.assertNotIn('since=', path)
+        self.assertNotIn('If-None-Match', headers)
+        self.assertEqual(self.catalog.revision, 3)
+        self.assertEqual(sorted(self.catalog.apps), ['App0', 'App1'])
+
+    def test_server_that_only_sends_deltas_gives_up(self):
+        self.refresh()
+        # Answers even the full-index retry with a delta against another base.
+        delta = json.dumps({'revision': 4, 'base': 99, 'apps': []}).encode()
+        self.remote.server.handle = lambda request: (200, {}, delta)
+        with self.assertRaises(CatalogError):
+            self.refresh()
+        # The first fetch, the delta request and one full retry.
+        self.assertEqual(len(self.remote.server.requests), 3)
+        self.assertEqual(self.catalog.revision, 1)
+        self.assertEqual(sorted(self.catalog.apps), [app['id'] for app in APPS])
+
+    def test_unsafe_entries_are_dropped(self):
+        self.remote.apps = APPS + [dict(APPS[0], id='../ZOS GUI'), dict(APPS[0], id='Evil', folder='/tmp')]
+        self.refresh()
+        self.assertEqual(sorted(self.catalog.apps), [app['id'] for app in APPS])
+
+
+if __name__ == '__main__':
+    unittest.main()
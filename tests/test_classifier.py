@@ -0,0 +1,91 @@
+import os
+import unittest
+from textwrap import dedent
+from unittest import mock
+
+import support
+import classifier
+from classifier import Classifier, scan_source
+
+
+class ScanSourceTests(unittest.TestCase):
+    def test_cli_app(self):
+        source = "name = input('Name: ')\nprint('Hello', name)\n"
+        self.assertEqual(scan_source(source), {'kind': 'cli', 'app_class': None})
+
+    def test_kivy_app(self):
+        source = dedent("""\
+            from kivy.app import App
+
+            class ClockApp(App):
+                pass
+
+            ClockApp().run()
+        """)
+        self.assertEqual(scan_source(source), {'kind': 'kivy', 'app_class': 'ClockApp'})
+
+    def test_aliased_and_dotted_bases(self):
+        aliased = "from kivy.app import App as KivyApp\nclass Notes(KivyApp):\n    pass\n"
+        self.assertEqual(scan_source(aliased)['app_class'], 'Notes')
+        dotted = "import kivy.app\nclass Notes(kivy.app.App):\n    pass\n"
+        self.assertEqual(scan_source(dotted), {'kind': 'kivy', 'app_class': 'Notes'})
+
+    def test_prefers_the_class_that_is_run(self):
+        source = dedent("""\
+            from kivy.app import App
+
+            class BaseApp(App):
+                pass
+
+            class PaintApp(BaseApp):
+                pass
+
+            if __name__ == '__main__':
+                PaintApp().run()
+        """)
+        self.assertEqual(scan_source(source)['app_class'], 'PaintApp')
+        # Without a run call the first App subclass is taken.
+        self.assertEqual(scan_source(source.split('if __name__')[0])['app_class'], 'BaseApp')
+
+    def test_unparsable_source_falls_back_to_markers(self):
+        self.assertEqual(scan_source("from kivy.app import App\ndef broken(:\n"),
+                         {'kind': 'kivy', 'app_class': None})
+        self.assertEqual(scan_source("print('hi'\n"), {'kind': 'cli', 'app_class': None})
+
+
+class ClassifierTests(unittest.TestCase):
+    def setUp(self):
+        root = support.temp_dir(self)
+        self.app = os.path.join(support.write_files(root, {
+            'Clock.py': "from kivy.app import App\nclass ClockApp(App):\n    pass\n",
+        }), 'Clock.py')
+        self.cache_file = os.path.join(root, 'kinds.json')
+
+    def test_unchanged_file_is_not_read_again(self):
+        kinds = Classifier(self.cache_file)
+        self.assertEqual(kinds.classify(self.app), {'kind': 'kivy', 'app_class': 'ClockApp'})
+        # A fresh classifier answers from the file on disk, without a scan.
+        reopened = Classifier(self.cache_file)
+        with mock.patch.object(classifier, 'scan_source') as scan, \
+                mock.patch('builtins.open', wraps=open) as opened:
+            self.assertEqual(reopened.classify(self.app)['app_class'], 'ClockApp')
+        scan.assert_not_called()
+        self.assertEqual([call.args[0] for call in opened.call_args_list], [self.cache_file])
+
+    def test_changed_file_is_scanned_again(self):
+        kinds = Classifier(self.cache_file)
+        kinds.classify(self.app)
+        with open(self.app, 'w') as f:
+            f.write("print('now a CLI app')\n")
+        st = os.stat(self.app)
+        os.utime(self.app, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(kinds.classify(self.app), {'kind': 'cli', 'app_class': None})
+
+    def test_results_are_copies(self):
+        kinds = Classifier(self.cache_file)
+        kinds.classify(self.app)['kind'] = 'cli'
+        self.assertEqual(kinds.classify(self.app)['kind'], 'kivy')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import hashlib
+import unittest
+from unittest import mock
+
+import support
+import downloads
+from downloads import DownloadEngine, DownloadError
+
+DATA = bytes(range(256)) * 1024
+
+
+def serve_file(data, honor_range=True, bodies=None):
+    """A handler serving `data`, or `bodies` (a list) one per request."""
+    def handle(request):
+        body = bodies.pop(0) if bodies else data
+        requested = request.headers.get('Range')
+        if requested and honor_range:
+            start = int(requested.split('=')[1].rstrip('-'))
+            if start >= len(body):
+                return 416, {}, b''
+            return 206, {'Content-Range': f"bytes {start}-{len(body) - 1}/{len(body)}"}, body[start:]
+        return 200, {}, body
+    return handle
+
+
+class DownloadTests(unittest.TestCase):
+    def setUp(self):
+        self.apps_dir = support.temp_dir(self)
+        self.engine = DownloadEngine(max_workers=2, retries=2, timeout=5, chunk_size=4096)
+
+    def file(self, server, path='main.py', data=DATA):
+        return {'path': path, 'url': server.url(path), 'size': len(data),
+                'sha256': hashlib.sha256(data).hexdigest()}
+
+    def leave_part(self, folder, path, data):
+        # What an interrupted install leaves behind in the staging folder.
+        staging = os.path.join(self.apps_dir, f".{folder}.download")
+        os.makedirs(staging, exist_ok=True)
+        with open(os.path.join(staging, path + '.part'), 'wb') as f:
+            f.write(data)
+
+    def read(self, folder, path):
+        with open(os.path.join(self.apps_dir, folder, path), 'rb') as f:
+            return f.read()
+
+    def test_resumes_with_range(self):
+        server = support.stub_server(self, serve_file(DATA))
+        self.leave_part('App', 'main.py', DATA[:100000])
+        self.engine.install([self.file(server)], self.apps_dir, 'App')
+        self.assertEqual(self.read('App', 'main.py'), DATA)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(server.requests[0][1].get('Range'), 'bytes=100000-')
+
+    def test_server_ignoring_range_starts_over(self):
+        server = support.stub_server(self, serve_file(DATA, honor_range=False))
+        self.leave_part('App', 'main.py', DATA[:100000])
+        self.engine.install([self.file(server)], self.apps_dir, 'App')
+        self.assertEqual(self.read('App', 'main.py'), DATA)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_complete_part_is_not_downloaded_again(self):
+        server = support.stub_server(self, serve_file(DATA))
+        self.leave_part('App', 'main.py', DATA)
+        self.engine.install([self.file(server)], self.apps_dir, 'App')
+        self.assertEqual(self.read('App', 'main.py'), DATA)
+        self.assertEqual(server.requests[0][1].get('Range'), f"bytes={len(DATA)}-")
+
+    def test_hash_mismatch_refetches(self):
+        corrupt = DATA[:-1] + b'\0'
+        server = support.stub_server(self, serve_file(DATA, bodies=[corrupt]))
+        self.engine.install([self.file(server)], self.apps_dir, 'App')
+        self.assertEqual(self.read('App', 'main.py'), DATA)
+        self.assertEqual(len(server.requests), 2)
+        # The corrupt copy was dropped, not resumed from.
+        self.assertNotIn('Range', server.requests[1][1])
+
+    def test_hash_mismatch_every_time_fails(self):
+        server = support.stub_server(self, serve_file(DATA[:-1] + b'\0'))
+        with self.assertRaises(DownloadError):
+            self.engine.install([self.file(server)], self.apps_dir, 'App')
+        self.assertFalse(os.path.exists(os.path.join(self.apps_dir, 'App')))
+
+    def test_update_swaps_in_whole_folder(self):
+        old_dir = os.path.join(self.apps_dir, 'App')
+        os.makedirs(old_dir)
+        with open(os.path.join(old_dir, 'old.py'), 'w') as f:
+            f.write('old')
+        server = support.stub_server(self, serve_file(DATA))
+        files = [self.file(server, 'main.py'), self.file(server, 'lib/util.py')]
+        target = self.engine.install(files, self.apps_dir, 'App', extra_files={'zstore.json': b'{}'})
+        self.assertEqual(target, old_dir)
+        self.assertEqual(sorted(os.listdir(old_dir)), ['lib', 'main.py', 'zstore.json'])
+        self.assertEqual(self.read('App', 'lib/util.py'), DATA)
+        # No staging folder or old copy is left next to it.
+        self.assertEqual(os.listdir(self.apps_dir), ['App'])
+
+    def test_failed_file_leaves_old_version(self):
+        old_dir = os.path.join(self.apps_dir, 'App')
+        os.makedirs(old_dir)
+        with open(os.path.join(old_dir, 'main.py'), 'w') as f:
+            f.write('old')
+
+        def handle(request):
+            if request.path.endswith('missing.py'):
+                return 404, {}, b''
+            return 200, {}, DATA
+        server = support.stub_server(self, handle)
+        files = [self.file(server, 'main.py'), self.file(server, 'missing.py')]
+        with self.assertRaises(DownloadError):
+            self.engine.install(files, self.apps_dir, 'App')
+        self.assertEqual(os.listdir(old_dir), ['main.py'])
+        self.assertEqual(self.read('App', 'main.py'), b'old')
+        # Kept so the next attempt resumes.
+        self.assertTrue(os.path.isdir(os.path.join(self.apps_dir, '.App.download')))
+
+    def test_swap_rolls_back_when_rename_fails(self):
+        old_dir = os.path.join(self.apps_dir, 'App')
+        os.makedirs(old_dir)
+        with open(os.path.join(old_dir, 'main.py'), 'w') as f:
+            f.write('old')
+        server = support.stub_server(self, serve_file(DATA))
+        rename = os.rename
+
+        def failing_rename(src, dst):
+            if src.endswith('.App.download'):
+                raise OSError("disk full")
+            rename(src, dst)
+        with mock.patch.object(downloads.os, 'rename', failing_rename):
+            with self.assertRaises(OSError):
+                self.engine.install([self.file(server)], self.apps_dir, 'App')
+        self.assertEqual(self.read('App', 'main.py'), b'old')
+        self.assertEqual(sorted(os.listdir(self.apps_dir)), ['.App.download', 'App'])
+
+    def test_unsafe_folder_is_refused(self):
+        server = support.stub_server(self, serve_file(DATA))
+        for folder in ('..', '../App', '.hidden', os.path.abspath('/tmp/App'), ''):
+            with self.assertRaises(DownloadError):
+                self.engine.install([self.file(server)], self.apps_dir, folder)
+        self.assertEqual(server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
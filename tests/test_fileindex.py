@@ -0,0 +1,135 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import support
+import fileindex
+from fileindex import FileIndex
+
+FILES = {
+    'notes.txt': 'buy milk\n',
+    'docs/notes.md': 'hello world\n',
+    'docs/old notes.txt': 'hello there\n',
+    'docs/readme.md': 'nothing to see\n',
+    'photos/cat.jpg': 'hello world, in a picture\n',
+}
+
+
+class FileIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = support.temp_dir(self)
+        self.root = support.write_files(os.path.join(self.dir, 'home'), FILES)
+        self.index = self.open()
+
+    def open(self):
+        return FileIndex(self.root, index_file=os.path.join(self.dir, 'index.json'))
+
+    def touch(self, relative):
+        # Forced so the test does not depend on timestamp resolution.
+        path = os.path.join(self.root, relative)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    def paths(self, results):
+        return [path for path, is_dir in results]
+
+    def test_search_ranking(self):
+        self.index.refresh()
+        # Names starting with the word, shortest path first, then the rest.
+        self.assertEqual(self.paths(self.index.search('notes')), ['notes.txt', 'docs/notes.md', 'docs/old notes.txt'])
+        self.assertEqual(self.index.search('DOCS'), [('docs', True)])
+        self.assertEqual(self.paths(self.index.search('txt old')), ['docs/old notes.txt'])
+        self.assertEqual(self.index.search('   '), [])
+        self.assertEqual(self.paths(self.index.search('notes', limit=1)), ['notes.txt'])
+
+    def test_refresh_only_relists_changed_folders(self):
+        self.assertTrue(self.index.refresh())
+        self.assertFalse(self.index.refresh())
+        support.write_files(self.root, {'docs/todo.txt': ''})
+        self.touch('docs')
+        with mock.patch.object(self.index, '_list', wraps=self.index._list) as listed:
+            self.assertTrue(self.index.refresh())
+        self.assertEqual(listed.call_count, 1)
+        self.assertEqual(self.paths(self.index.search('todo')), ['docs/todo.txt'])
+
+        shutil.rmtree(os.path.join(self.root, 'photos'))
+        self.touch('')
+        self.assertTrue(self.index.refresh())
+        self.assertEqual(self.index.search('cat'), [])
+        self.assertNotIn('photos', self.index.dirs)
+
+    def test_index_is_kept_on_disk(self):
+        self.index.refresh()
+        reopened = self.open()
+        reopened.load()
+        self.assertEqual(self.paths(reopened.search('readme')), ['docs/readme.md'])
+        self.assertFalse(reopened.refresh())
+
+    def test_refreshing_flag_is_cleared_on_failure(self):
+        with mock.patch.object(self.index, '_refresh', side_effect=OSError("gone")):
+            with self.assertRaises(OSError):
+                self.index.refresh()
+        self.assertFalse(self.index.refreshing)
+
+
+class ContentIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = support.temp_dir(self)
+        self.root = support.write_files(os.path.join(self.dir, 'home'), FILES)
+        self.index = self.open()
+
+    def open(self):
+        index = FileIndex(self.root, index_file=os.path.join(self.dir, 'index.json'))
+        index.enable_content()
+        return index
+
+    def test_only_built_when_enabled(self):
+        index = FileIndex(self.root, index_file=os.path.join(self.dir, 'names.json'))
+        index.refresh()
+        self.assertEqual(index.search_content('hello'), [])
+        self.assertFalse(os.path.exists(index.content_file))
+
+    def test_searches_text_files(self):
+        self.index.refresh()
+        self.assertEqual(self.paths('hello'), ['docs/notes.md', 'docs/old notes.txt'])
+        self.assertEqual(self.paths('HELLO WORLD'), ['docs/notes.md'])
+        # Pictures are not text, and two letters make no trigram.
+        self.assertEqual(self.paths('picture'), [])
+        self.assertEqual(self.paths('he'), [])
+
+    def paths(self, query):
+        return sorted(path for path, is_dir in self.index.search_content(query))
+
+    def test_changed_and_removed_files(self):
+        self.index.refresh()
+        support.write_files(self.root, {'notes.txt': 'hello again, and milk\n'})
+        os.remove(os.path.join(self.root, 'docs', 'notes.md'))
+        self.assertTrue(self.index.refresh())
+        self.assertEqual(self.paths('hello'), ['docs/old notes.txt', 'notes.txt'])
+        self.assertEqual(self.paths('world'), [])
+
+    def test_content_index_is_kept_on_disk(self):
+        self.index.refresh()
+        reopened = self.open()
+        with mock.patch('builtins.open', wraps=open) as opened:
+            self.assertFalse(reopened.refresh())
+        # Only the two index files were read; no text file was.
+        self.assertEqual(sorted(call.args[0] for call in opened.call_args_list),
+                         sorted([reopened.index_file, reopened.content_file]))
+        self.index = reopened
+        self.assertEqual(self.paths('there'), ['docs/old notes.txt'])
+
+    def test_files_past_the_postings_cap_wait(self):
+        with mock.patch.object(fileindex, 'MAX_POSTINGS', 1):
+            self.index.refresh()
+        # The first file read fills the cap; the others are skipped.
+        self.assertEqual(len(self.index.content_files), 1)
+        self.assertEqual(self.index.content_skipped, 3)
+        self.assertTrue(self.index.refresh())
+        self.assertEqual(self.index.content_skipped, 0)
+        self.assertEqual(self.paths('hello'), ['docs/notes.md', 'docs/old notes.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import support
+import modcache
+from modcache import CodeCache, load_module, unload_all
+from zpkg import build
+from zpkgimport import open_package
+
+
+class CodeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.root = support.temp_dir(self)
+        self.cache = CodeCache(self.root)
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.root) if name.endswith('.code'))
+
+    def test_second_compile_is_a_hit(self):
+        code = self.cache.get_code(b"X = 1\n", 'app.py')
+        with mock.patch('builtins.compile') as compile_:
+            again = CodeCache(self.root).get_code(b"X = 1\n", 'app.py')
+        compile_.assert_not_called()
+        self.assertEqual(again, code)
+        # The same source under another name compiles on its own.
+        self.cache.get_code(b"X = 1\n", 'other.py')
+        self.assertEqual(len(self.entries()), 2)
+
+    def add(self, source, used):
+        """Compiles `source`; returns its entry, last used at time `used`."""
+        before = set(self.entries())
+        self.cache.get_code(source, 'app.py')
+        entry, = set(self.entries()) - before
+        os.utime(os.path.join(self.root, entry), (used, used))
+        return entry
+
+    def test_least_recently_used_entries_are_evicted(self):
+        one = self.add(b"X = 1\n", 1000)
+        two = self.add(b"X = 2\n", 2000)
+        self.cache.max_bytes = 2 * os.path.getsize(os.path.join(self.root, one))
+        # A hit makes "X = 1" the most recently used, so "X = 2" goes.
+        self.cache.get_code(b"X = 1\n", 'app.py')
+        three = self.add(b"X = 3\n", 3000)
+        self.assertEqual(self.entries(), sorted([one, three]))
+        self.assertNotIn(two, self.entries())
+
+    def test_stale_temporary_files_are_removed(self):
+        support.write_files(self.root, {'old.tmp': 'x', 'live.tmp': 'x'})
+        os.utime(os.path.join(self.root, 'old.tmp'), (1000, 1000))
+        self.cache.evict()
+        self.assertEqual(sorted(os.listdir(self.root)), ['live.tmp'])
+
+
+class Session:
+    """Stands in for sessions.AppSession, which only needs add_module."""
+
+    def __init__(self):
+        self.modules = []
+
+    def add_module(self, module):
+        self.modules.append(module)
+
+
+def app_files(value):
+    # Two apps with the same layout: a sibling module under the same name.
+    return {'app.py': "import utils\nV = utils.X\n", 'utils.py': f"X = {value!r}\n"}
+
+
+class MultiFileAppTests(unittest.TestCase):
+    def setUp(self):
+        root = support.temp_dir(self)
+        self.a = support.write_files(os.path.join(root, 'a'), app_files('a'))
+        self.b = support.write_files(os.path.join(root, 'b'), app_files('b'))
+        self.addCleanup(unload_all)
+
+    def test_sibling_modules_do_not_collide(self):
+        self.assertEqual(load_module(os.path.join(self.a, 'app.py')).V, 'a')
+        self.assertEqual(load_module(os.path.join(self.b, 'app.py')).V, 'b')
+        self.assertNotIn('utils', sys.modules)
+
+    def test_sibling_modules_in_archives_do_not_collide(self):
+        values = []
+        for folder in (self.a, self.b):
+            path, manifest = build(folder, entry='app.py')
+            loader = open_package(path).loader('app.py')
+            values.append(load_module(loader.path, loader=loader).V)
+        self.assertEqual(values, ['a', 'b'])
+        self.assertNotIn('utils', sys.modules)
+
+    def test_kept_modules_belong_to_the_session(self):
+        session = Session()
+        module = load_module(os.path.join(self.a, 'app.py'), keep_loaded=True, session=session)
+        self.assertEqual([m.__name__ for m in session.modules], [module.__name__, 'utils'])
+        self.assertIs(sys.modules['utils'], module.utils)
+
+        # What AppSession.close() does; the next app gets its own utils.
+        for added in session.modules:
+            del sys.modules[added.__name__]
+        self.assertEqual(load_module(os.path.join(self.b, 'app.py')).V, 'b')
+
+        # Relaunching reuses the kept module and puts its siblings back.
+        again = Session()
+        self.assertIs(load_module(os.path.join(self.a, 'app.py'), keep_loaded=True, session=again), module)
+        self.assertEqual(again.modules, session.modules)
+        self.assertIs(sys.modules['utils'], module.utils)
+
+        unload_all()
+        self.assertNotIn('utils', sys.modules)
+        self.assertNotIn(module.__name__, sys.modules)
+        self.assertEqual(modcache.loaded_modules, {})
+
+    def launch(self, path, keep_loaded=True):
+        # One launch and the AppSession.close() that ends it.
+        session = Session()
+        module = load_module(path, keep_loaded=keep_loaded, session=session)
+        for added in session.modules:
+            if sys.modules.get(added.__name__) is added:
+                del sys.modules[added.__name__]
+        return module
+
+    def test_kept_module_is_reused_until_the_file_changes(self):
+        path = os.path.join(self.a, 'app.py')
+        module = self.launch(path)
+        self.assertIs(self.launch(path), module)
+        support.write_files(self.a, {'app.py': "import utils\nV = utils.X * 2\n"})
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        changed = self.launch(path)
+        self.assertIsNot(changed, module)
+        self.assertEqual(changed.V, 'aa')
+        # Without keep_loaded every launch runs the app afresh.
+        self.assertIsNot(self.launch(path, keep_loaded=False), changed)
+        self.assertNotIn(path, modcache.loaded_modules)
+
+    def test_failed_import_leaves_nothing_behind(self):
+        support.write_files(self.a, {'app.py': "import utils\nraise RuntimeError('broken')\n"})
+        before = set(sys.modules)
+        with self.assertRaises(RuntimeError):
+            load_module(os.path.join(self.a, 'app.py'), keep_loaded=True)
+        self.assertEqual(set(sys.modules), before)
+        self.assertNotIn(self.a, sys.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+import support
+from net import HttpClient
+
+
+class HttpClientTests(unittest.TestCase):
+    def setUp(self):
+        self.body = b'first'
+        self.release = threading.Event()
+        self.release.set()
+        self.server = support.stub_server(self, self.handle)
+        self.client = HttpClient(cache_dir=support.temp_dir(self))
+
+    def handle(self, request):
+        self.release.wait(10)
+        return 200, {}, self.body
+
+    def test_concurrent_fetches_share_one_request(self):
+        self.release.clear()
+        url = self.server.url('weather')
+        futures = [self.client.fetch(url) for _ in range(5)]
+        self.assertEqual(len({id(future) for future in futures}), 1)
+        self.release.set()
+        responses = [future.result(timeout=10) for future in futures]
+        self.assertEqual([response['text'] for response in responses], ['first'] * 5)
+        self.assertEqual(len(self.server.requests), 1)
+        # Finished requests are not joined any more.
+        self.client.fetch(url).result(timeout=10)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_fresh_cache_skips_network(self):
+        url = self.server.url('weather')
+        self.client.fetch(url).result(timeout=10)
+        seen = []
+        self.client.get(url, 60, seen.append)
+        self.assertEqual(len(seen), 1)
+        self.assertFalse(seen[0]['stale'])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_entry_is_served_while_revalidating(self):
+        url = self.server.url('weather')
+        self.client.fetch(url).result(timeout=10)
+        self.body = b'second'
+        self.release.clear()
+        done = threading.Event()
+        seen = []
+
+        def callback(response):
+            seen.append(response)
+            if not response['stale']:
+                done.set()
+        self.client.get(url, 0, callback)
+        # The stale copy arrives at once, before the server has answered.
+        self.assertEqual([(r['text'], r['stale']) for r in seen], [('first', True)])
+        self.release.set()
+        self.assertTrue(done.wait(10))
+        self.assertEqual([(r['text'], r['stale']) for r in seen], [('first', True), ('second', False)])
+        # And the cache now holds the new copy, on disk too.
+        self.assertEqual(HttpClient(cache_dir=self.client.cache_dir).cached(url)['text'], 'second')
+
+    def test_failed_request_gives_none(self):
+        self.server.close()
+        seen = []
+        done = threading.Event()
+        self.client.get(self.server.url('weather'), 60, lambda response: (seen.append(response), done.set()))
+        self.assertTrue(done.wait(10))
+        self.assertEqual(seen, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
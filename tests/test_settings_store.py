@@ -0,0 +1,96 @@
+import io
+import os
+import time
+import unittest
+from unittest import mock
+
+import support
+import settings_store
+from settings_store import SettingsStore, get_settings
+
+
+class SettingsStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = support.temp_dir(self)
+        self.path = os.path.join(self.dir, 'settings.txt')
+        with open(self.path, 'w') as f:
+            f.write("theme=dark\nnot a setting\nwallpaper=a=b.png\n")
+        self.store = SettingsStore(self.path, flush_delay=0.05)
+        self.addCleanup(self.store.flush_pending)
+        self.changes = []
+        self.store.subscribe(self.changes.append)
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_reads_the_file_once(self):
+        self.assertTrue(self.store.exists())
+        with mock.patch('builtins.open') as opened:
+            self.assertEqual(self.store.get('theme'), 'dark')
+            self.assertEqual(self.store.get('missing', 'x'), 'x')
+        opened.assert_not_called()
+        self.assertEqual(self.store.all(), {'theme': 'dark', 'wallpaper': 'a=b.png'})
+        self.assertFalse(SettingsStore(os.path.join(self.dir, 'none.txt')).exists())
+
+    def test_changes_are_announced(self):
+        self.store.set('volume', 7)
+        self.store.remove('theme')
+        self.store.update({'volume': '7', 'wallpaper': 'a=b.png'})
+        # Values are kept as strings, and no-op updates announce nothing.
+        self.assertEqual(self.changes, [{'volume': '7'}, {'theme': None}])
+
+    def test_subscribers_only_hear_their_keys(self):
+        theme = []
+        self.store.subscribe(theme.append, keys=['theme'])
+        self.store.set('volume', '3')
+        self.store.replace({'theme': 'light', 'volume': '3'})
+        self.assertEqual(theme, [{'theme': 'light'}])
+        self.store.unsubscribe(theme.append)
+        self.store.set('theme', 'dark')
+        self.assertEqual(theme, [{'theme': 'light'}])
+
+    def test_failing_subscriber_does_not_stop_the_rest(self):
+        self.store.subscribers.insert(0, (lambda changes: 1 / 0, None))
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.store.set('volume', '3')
+        self.assertEqual(self.changes, [{'volume': '3'}])
+        self.assertIn("Error in settings subscriber", stdout.getvalue())
+
+    def test_burst_of_changes_is_one_write(self):
+        with mock.patch.object(settings_store.os, 'replace', wraps=os.replace) as replace:
+            for volume in range(5):
+                self.store.set('volume', volume)
+            self.assertIn('theme=dark', self.read())
+            deadline = time.monotonic() + 10
+            while 'volume' not in self.read() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(replace.call_count, 1)
+        self.assertEqual(self.read(), "theme=dark\nwallpaper=a=b.png\nvolume=4\n")
+        self.assertEqual(os.listdir(self.dir), ['settings.txt'])
+
+    def test_new_file_is_written_even_without_changes(self):
+        path = os.path.join(self.dir, 'new', 'settings.txt')
+        store = SettingsStore(path, flush_delay=60)
+        store.replace({})
+        store.flush_pending()
+        self.assertTrue(os.path.exists(path))
+
+    def test_reload_picks_up_outside_edits(self):
+        self.store.load()
+        with open(self.path, 'w') as f:
+            f.write("theme=light\n")
+        self.store.reload()
+        self.assertEqual(self.store.all(), {'theme': 'light'})
+        self.assertEqual(self.changes, [{'theme': 'light', 'wallpaper': None}])
+
+    def test_one_store_per_file(self):
+        store = get_settings(self.path)
+        self.addCleanup(settings_store.stores.pop, os.path.normcase(os.path.abspath(self.path)))
+        relative = os.path.relpath(self.path)
+        self.assertIs(get_settings(relative), store)
+        self.assertIsNot(get_settings(self.path), self.store)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import io
+import os
+import sys
+import time
+import signal
+import subprocess
+import unittest
+from unittest import mock
+
+import support
+from supervisor import EXITED, RUNNING, SUSPENDED, CgroupManager, ResourcePolicy, Supervisor, resource
+
+SLEEPER = "import time\ntime.sleep(30)\n"
+# Says "ready" once it ignores SIGTERM, so stop() has to escalate.
+STUBBORN = "import signal, time\nsignal.signal(signal.SIGTERM, signal.SIG_IGN)\nprint('ready', flush=True)\ntime.sleep(30)\n"
+
+
+class SupervisorTests(unittest.TestCase):
+    def setUp(self):
+        # Not a cgroup, so a ZOS_CGROUP in the environment is not touched.
+        self.supervisor = Supervisor(cgroup_root=support.temp_dir(self))
+        self.addCleanup(self.kill_all)
+
+    def kill_all(self):
+        for task in self.supervisor.running():
+            task.process.kill()
+            task.process.wait()
+
+    def spawn(self, code, name='App', **kwargs):
+        return self.supervisor.spawn(name, [sys.executable, '-c', code], **kwargs)
+
+    def wait_for_exit(self, task, timeout=10):
+        deadline = time.monotonic() + timeout
+        while task.state != EXITED and time.monotonic() < deadline:
+            self.supervisor.reap()
+            time.sleep(0.02)
+        self.assertEqual(task.state, EXITED)
+
+    def test_apps_run_side_by_side(self):
+        first = self.spawn(SLEEPER, 'First')
+        second = self.spawn("raise SystemExit(3)", 'Second')
+        self.wait_for_exit(second)
+        self.assertEqual(second.returncode, 3)
+        self.assertEqual(second.exit_message(), "Process exited with code 3")
+        self.assertEqual(self.supervisor.running(), [first])
+        self.assertEqual(first.state, RUNNING)
+        self.assertEqual(len(self.supervisor.tasks()), 2)
+        self.supervisor.forget(second)
+        self.assertEqual(self.supervisor.tasks(), [first])
+
+    def test_exit_callbacks_fire_once(self):
+        task = self.spawn("pass")
+        seen = []
+        task.on_exit.append(seen.append)
+        self.wait_for_exit(task)
+        self.supervisor.reap()
+        self.assertEqual(seen, [task])
+
+    def test_suspend_and_resume(self):
+        task = self.spawn(SLEEPER)
+        self.supervisor.suspend(task)
+        self.assertEqual(task.state, SUSPENDED)
+        self.supervisor.resume(task)
+        self.assertEqual(task.state, RUNNING)
+        # A suspended app still gets to act on its SIGTERM.
+        self.supervisor.suspend(task)
+        self.supervisor.terminate(task)
+        self.wait_for_exit(task)
+        self.assertEqual(task.returncode, -signal.SIGTERM)
+
+    def test_stop_kills_an_app_that_ignores_it(self):
+        task = self.spawn(STUBBORN, stdout=subprocess.PIPE)
+        self.addCleanup(task.process.stdout.close)
+        self.assertEqual(task.process.stdout.readline(), b'ready\n')
+        self.supervisor.stop(task, grace=0.2)
+        self.supervisor.reap()
+        self.assertEqual(task.state, RUNNING)
+        self.wait_for_exit(task)
+        self.assertTrue(task.killed)
+        self.assertEqual(task.returncode, -signal.SIGKILL)
+        self.assertEqual(task.exit_message(), "Process killed after ignoring the request to stop")
+
+    def test_stop_all_waits_then_kills(self):
+        polite = self.spawn(SLEEPER)
+        stubborn = self.spawn(STUBBORN, stdout=subprocess.PIPE)
+        self.addCleanup(stubborn.process.stdout.close)
+        stubborn.process.stdout.readline()
+        self.supervisor.stop_all(grace=0.5)
+        self.assertEqual(self.supervisor.running(), [])
+        self.assertEqual(polite.returncode, -signal.SIGTERM)
+        self.assertTrue(stubborn.killed)
+
+    def test_samples_usage_of_live_apps(self):
+        task = self.spawn("x = bytearray(20 * 1024 * 1024)\nimport time\ntime.sleep(30)\n")
+        time.sleep(0.3)
+        self.supervisor.reap()
+        if not task.proc_fds:
+            self.skipTest("no /proc here")
+        self.assertGreater(task.rss, 20 * 1024 * 1024)
+        self.assertEqual(task.stats()['pid'], task.pid)
+        self.supervisor.terminate(task)
+        self.wait_for_exit(task)
+        # The /proc files are closed with the app.
+        self.assertEqual(task.proc_fds, {})
+
+
+    @unittest.skipUnless(resource is not None and hasattr(resource, 'prlimit'), "needs prlimit")
+    def test_policy_is_applied_to_the_app(self):
+        task = self.spawn(SLEEPER, policy=ResourcePolicy(max_files=64, nice=7))
+        self.assertEqual(resource.prlimit(task.pid, resource.RLIMIT_NOFILE), (64, 64))
+        self.assertGreaterEqual(os.getpriority(os.PRIO_PROCESS, task.pid), 7)
+
+    @unittest.skipUnless(resource is not None and hasattr(resource, 'prlimit'), "needs prlimit")
+    def test_cpu_limit_stops_the_app(self):
+        task = self.spawn("while True:\n    pass\n", policy=ResourcePolicy(cpu_seconds=1))
+        self.wait_for_exit(task, timeout=30)
+        self.assertEqual(task.exit_message(), "Process stopped: CPU time limit reached")
+
+
+class ResourcePolicyTests(unittest.TestCase):
+    def test_settings_then_manifest_limits(self):
+        settings = {'app_memory_mb': 512, 'app_max_files': '128', 'app_cpu_percent': ''}
+        policy = ResourcePolicy.from_settings(settings, {'memory_mb': 256, 'max_tasks': 32})
+        self.assertEqual(policy.as_dict(), {'memory_mb': 256, 'max_files': 128, 'nice': 5, 'max_tasks': 32})
+
+    def test_bad_limits_are_skipped(self):
+        policy = ResourcePolicy(memory_mb=256)
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            policy.update({'memory_mb': 'lots', 'colour': 'red', 'nice': '3'})
+        self.assertEqual(policy.as_dict(), {'memory_mb': 256, 'nice': 3})
+        self.assertEqual(stderr.getvalue().splitlines(), ["Invalid value for resource limit 'memory_mb': 'lots'",
+                                                          "Unknown resource limit 'colour'"])
+
+    def test_parse(self):
+        self.assertEqual(ResourcePolicy.parse(['memory_mb=256', 'cpu_percent=50']),
+                         {'memory_mb': 256, 'cpu_percent': 50})
+        for pair in ('memory_mb', 'colour=red', 'memory_mb=lots'):
+            with self.assertRaises(ValueError):
+                ResourcePolicy.parse([pair])
+
+    def test_cgroup_limits(self):
+        policy = ResourcePolicy(cpu_percent=50, memory_mb=1, max_tasks=16, max_files=64)
+        self.assertEqual(policy.cgroup_limits(), {'cpu.max': '50000 100000', 'memory.max': '1048576', 'pids.max': '16'})
+        self.assertEqual(ResourcePolicy(max_files=64).cgroup_limits(), {})
+
+
+class CgroupManagerTests(unittest.TestCase):
+    def test_needs_a_cgroup_directory(self):
+        self.assertFalse(CgroupManager(support.temp_dir(self)).available)
+        self.assertFalse(CgroupManager(None).available)
+
+    def test_places_the_app_in_its_own_group(self):
+        # A stand-in for a delegated cgroup v2 directory.
+        root = support.write_files(support.temp_dir(self), {'cgroup.controllers': 'cpu memory pids\n'})
+        cgroups = CgroupManager(root)
+        path = cgroups.place(1234, {'memory.max': '1048576'})
+        self.assertEqual(path, os.path.join(root, 'zos-app-1234'))
+        with open(os.path.join(path, 'memory.max')) as f:
+            self.assertEqual(f.read(), '1048576')
+        with open(os.path.join(path, 'cgroup.procs')) as f:
+            self.assertEqual(f.read(), '1234')
+        self.assertIsNone(cgroups.place(1235, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
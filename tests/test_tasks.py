@@ -0,0 +1,108 @@
+import sys
+import types
+import threading
+import unittest
+from unittest import mock
+
+import support  # noqa: F401  (puts ZOS GUI on sys.path)
+from tasks import TaskQueueFull, TaskRuntime, current_task
+
+
+class Owner:
+    pass
+
+
+class TaskRuntimeTests(unittest.TestCase):
+    def setUp(self):
+        self.runtime = TaskRuntime(max_workers=2, max_pending=2, long_workers=1)
+        self.addCleanup(self.runtime.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        # call_on_ui schedules through kivy's Clock; the test drains by hand.
+        self.clock = mock.Mock()
+        kivy_clock = types.ModuleType('kivy.clock')
+        kivy_clock.Clock = self.clock
+        patcher = mock.patch.dict(sys.modules, {'kivy.clock': kivy_clock})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def blocked(self):
+        self.release.wait(10)
+        return 'released'
+
+    def drain_ui(self):
+        while self.runtime.ui_queue:
+            self.runtime._run_ui(0)
+
+    def test_runs_work_and_reports_back_on_the_ui_thread(self):
+        results, errors = [], []
+        task = self.runtime.submit(lambda: current_task().name, name='job', on_done=results.append)
+        self.assertEqual(task.result(timeout=10), 'job')
+        failing = self.runtime.submit(lambda: 1 / 0, on_error=errors.append)
+        with self.assertRaises(ZeroDivisionError):
+            failing.result(timeout=10)
+        # Nothing runs until the UI thread gets to it.
+        self.assertEqual((results, errors), ([], []))
+        self.clock.schedule_once.assert_called_once_with(self.runtime._run_ui)
+        self.drain_ui()
+        self.assertEqual(results, ['job'])
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+        self.assertIsNone(current_task())
+
+    def test_same_key_supersedes_the_older_task(self):
+        owner = Owner()
+        first = self.runtime.submit(self.blocked, owner=owner, key='search')
+        second = self.runtime.submit(lambda: 'second', owner=owner, key='search')
+        self.assertTrue(first.cancelled)
+        self.assertFalse(second.cancelled)
+        self.assertEqual(second.result(timeout=10), 'second')
+
+    def test_full_queue_pushes_back_on_the_ui_thread(self):
+        tasks = [self.runtime.submit(self.blocked) for _ in range(2)]
+        with self.assertRaises(TaskQueueFull):
+            self.runtime.submit(self.blocked)
+        self.release.set()
+        for task in tasks:
+            task.result(timeout=10)
+        # Finished tasks give their slots back.
+        self.assertEqual(self.runtime.submit(lambda: 'room').result(timeout=10), 'room')
+
+    def test_worker_runs_the_task_itself_when_the_queue_is_full(self):
+        def outer():
+            inner = self.runtime.submit(threading.current_thread)
+            return inner.done(), inner.result()
+
+        self.runtime.submit(self.blocked)
+        done, thread = self.runtime.submit(outer).result(timeout=10)
+        # Ran there and then, on the submitting worker, instead of waiting.
+        self.assertTrue(done)
+        self.assertTrue(thread.name.startswith('zos-worker'))
+
+    def test_long_jobs_do_not_hold_up_regular_work(self):
+        runtime = TaskRuntime(max_workers=1, long_workers=1)
+        self.addCleanup(runtime.shutdown)
+        long_task = runtime.submit(self.blocked, long=True)
+        self.assertEqual(runtime.submit(lambda: 'quick').result(timeout=10), 'quick')
+        self.assertFalse(long_task.done())
+
+    def test_cancel_owner(self):
+        self.runtime = TaskRuntime(max_workers=1)
+        self.addCleanup(self.runtime.shutdown)
+        owner, other = Owner(), Owner()
+        results = []
+        running = self.runtime.submit(self.blocked, owner=owner, on_done=results.append)
+        queued = self.runtime.submit(self.blocked, owner=owner, on_done=results.append)
+        kept = self.runtime.submit(lambda: 'kept', owner=other, on_done=results.append)
+        late = self.runtime.ui_callback(results.append, owner=owner)
+        self.runtime.cancel_owner(owner)
+        self.assertTrue(running.cancelled and queued.cancelled)
+        self.assertFalse(kept.cancelled)
+        self.release.set()
+        kept.result(timeout=10)
+        late('late')
+        self.drain_ui()
+        self.assertEqual(results, ['kept'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import hashlib
+import subprocess
+import unittest
+
+import support
+from zpkg import ExtractionCache, build, open_archive, read_manifest
+
+
+class ExtractionCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = support.temp_dir(self)
+        self.cache = ExtractionCache(root=os.path.join(self.dir, 'cache'), max_bytes=10 ** 9, min_age=0)
+
+    def package(self, name, size=1000):
+        source = support.write_files(os.path.join(self.dir, 'src', name),
+                                     {'main.py': 'print(1)\n', 'data.txt': 'x' * size})
+        return build(source, output=os.path.join(self.dir, f"{name}.zpkg"))[0]
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.cache.root) if not name.startswith('.'))
+
+    def age(self, files_dir, seconds):
+        meta = os.path.join(os.path.dirname(files_dir), 'meta.json')
+        when = time.time() - seconds
+        os.utime(meta, (when, when))
+
+    def test_extracts_once(self):
+        path = self.package('A')
+        files_dir = self.cache.extract(path)
+        with open(os.path.join(files_dir, 'main.py')) as f:
+            self.assertEqual(f.read(), 'print(1)\n')
+        self.assertEqual(self.cache.extract(path), files_dir)
+        # A rebuilt package gets a fresh entry.
+        time.sleep(0.01)
+        os.utime(path)
+        self.assertNotEqual(self.cache.extract(path), files_dir)
+
+    def test_evicts_least_recently_used(self):
+        dirs = [self.cache.extract(self.package(name, 5000)) for name in 'ABC']
+        for age, files_dir in zip((30, 20, 10), dirs):
+            self.cache.release(files_dir)
+            self.age(files_dir, age)
+        self.cache.max_bytes = 11000
+        self.cache.evict()
+        self.assertFalse(os.path.exists(dirs[0]))
+        self.assertTrue(os.path.exists(dirs[1]) and os.path.exists(dirs[2]))
+        self.assertEqual([name for name in os.listdir(self.cache.root) if name.startswith('.')], [])
+
+    def test_pinned_and_recent_entries_stay(self):
+        pinned = self.cache.extract(self.package('A'))
+        recent = self.cache.extract(self.package('B'))
+        self.cache.release(recent)
+        self.cache.max_bytes = 0
+        self.cache.min_age = 60
+        self.cache.evict()
+        self.assertTrue(os.path.exists(pinned) and os.path.exists(recent))
+        self.cache.min_age = 0
+        self.cache.evict()
+        self.assertTrue(os.path.exists(pinned))
+        self.assertFalse(os.path.exists(recent))
+
+    def test_entry_pinned_by_another_process_stays(self):
+        path = self.package('A')
+        # The other process could be `zos_cli.py run` while the GUI evicts.
+        child = subprocess.Popen(
+            [sys.executable, '-c',
+             "import sys; sys.path.insert(0, sys.argv[1]); from zpkg import ExtractionCache\n"
+             "print(ExtractionCache(root=sys.argv[2]).extract(sys.argv[3]), flush=True); sys.stdin.read()",
+             support.ZOS_DIR, self.cache.root, path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.addCleanup(child.wait)
+        self.addCleanup(child.stdout.close)
+        self.addCleanup(child.stdin.close)
+        files_dir = child.stdout.readline().strip()
+        self.age(files_dir, 3600)
+        self.cache.max_bytes = 0
+        self.cache.evict()
+        self.assertTrue(os.path.isdir(files_dir))
+
+        child.stdin.close()
+        child.wait()
+        self.cache.evict()
+        self.assertFalse(os.path.exists(files_dir))
+        self.assertEqual(self.entries(), [])
+
+
+class BuildTests(unittest.TestCase):
+    APP = {
+        'Clock.py': "from kivy.app import App\nclass ClockApp(App):\n    pass\n",
+        'lib/helpers.py': "X = 1\n",
+        'icon.png': "not really a png",
+        '.hidden': "skipped",
+    }
+
+    def setUp(self):
+        self.dir = support.temp_dir(self)
+        self.source = support.write_files(os.path.join(self.dir, 'Clock'), self.APP)
+
+    def build(self, name, **kwargs):
+        return build(self.source, output=os.path.join(self.dir, name), **kwargs)
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_manifest(self):
+        path, manifest = self.build('a.zpkg')
+        self.assertEqual(read_manifest(path), manifest)
+        self.assertEqual(manifest['entry'], 'Clock.py')
+        self.assertEqual((manifest['kind'], manifest['app_class']), ('kivy', 'ClockApp'))
+        self.assertEqual(manifest['icon'], 'icon.png')
+        self.assertEqual(sorted(manifest['files']), ['Clock.py', 'icon.png', 'lib/helpers.py'])
+        self.assertEqual(manifest['files']['lib/helpers.py'],
+                         'sha256:' + hashlib.sha256(b"X = 1\n").hexdigest())
+        with open_archive(path) as tar:
+            self.assertEqual(tar.getnames(), ['zpkg.json', 'Clock.py', 'icon.png', 'lib/helpers.py'])
+
+    def test_reproducible(self):
+        first = self.read(self.build('a.zpkg')[0])
+        # Touching the files changes their mtimes, not the package.
+        time.sleep(0.01)
+        for root, dirs, files in os.walk(self.source):
+            for name in files:
+                os.utime(os.path.join(root, name))
+        self.assertEqual(self.read(self.build('b.zpkg')[0]), first)
+
+    def test_block_count_does_not_change_output(self):
+        support.write_files(self.source, {'data.bin': os.urandom(300000).hex()})
+        outputs = {self.read(self.build(f"{jobs}.zpkg", jobs=jobs, block_size=65536)[0]) for jobs in (1, 2, 4)}
+        self.assertEqual(len(outputs), 1)
+        with open_archive(os.path.join(self.dir, '1.zpkg')) as tar:
+            self.assertIn('data.bin', tar.getnames())
+
+    def test_codecs(self):
+        for codec in ('xz', 'gz', 'stored'):
+            path = self.build(f"{codec}.zpkg", codec=codec)[0]
+            self.assertEqual(read_manifest(path)['entry'], 'Clock.py')
+        with self.assertRaises(ValueError):
+            self.build('bad.zpkg', codec='rar')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import subprocess
+import unittest
+
+import support
+from zpkg import build
+from zpkgimport import PackageArchive, open_package, runner_argv
+
+FILES = {
+    'main.py': "import sys\nimport helpers\nprint(helpers.greet(sys.argv[1]))\n",
+    'helpers.py': "def greet(name):\n    return 'hello ' + name\n",
+    'lib/tools/__init__.py': "from .text import shout\n",
+    'lib/tools/text.py': "def shout(text):\n    return text.upper()\n",
+    'data/words.txt': "alpha beta\n",
+}
+
+
+class PackageArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = support.temp_dir(self)
+        self.source = support.write_files(os.path.join(self.dir, 'Greeter'), FILES)
+
+    def package(self, codec='xz'):
+        return build(self.source, output=os.path.join(self.dir, f"Greeter-{codec}.zpkg"),
+                     codec=codec, entry='main.py')[0]
+
+    def test_reads_members(self):
+        for codec in ('xz', 'stored'):
+            archive = PackageArchive(self.package(codec))
+            self.assertEqual(archive.entry(), 'main.py')
+            self.assertEqual(archive.read('data/words.txt'), b"alpha beta\n")
+            self.assertTrue(archive.isdir('lib/tools'))
+            self.assertFalse(archive.exists('lib/tools'))
+            path = archive.member_path('data/words.txt')
+            self.assertEqual(path, os.path.join(archive.path, 'data', 'words.txt'))
+            self.assertEqual(archive.member_name(path), 'data/words.txt')
+            with self.assertRaises(FileNotFoundError):
+                archive.member_name(os.path.join(archive.path, 'missing.txt'))
+
+    def test_open_package_is_shared_until_the_file_changes(self):
+        path = self.package()
+        archive = open_package(path)
+        self.assertIs(open_package(path), archive)
+        time.sleep(0.01)
+        os.utime(path)
+        self.assertIsNot(open_package(path), archive)
+
+    def test_imports_from_a_package_on_sys_path(self):
+        path = self.package()
+        sys.path.insert(0, os.path.join(path, 'lib'))
+        self.addCleanup(sys.path.remove, os.path.join(path, 'lib'))
+        for name in ('tools', 'tools.text'):
+            self.addCleanup(sys.modules.pop, name, None)
+        import tools
+        self.assertEqual(tools.shout('hi'), 'HI')
+        self.assertEqual(tools.__file__, os.path.join(path, 'lib', 'tools', '__init__.py'))
+        loader = tools.__spec__.loader
+        self.assertEqual(loader.get_data(os.path.join(path, 'data', 'words.txt')), b"alpha beta\n")
+
+    def test_runs_a_cli_package(self):
+        result = subprocess.run(runner_argv(self.package(), ['world']), capture_output=True, text=True,
+                                timeout=60, env=dict(os.environ, PYTHONPATH=support.ZOS_DIR))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "hello world\n")
+
+
+if __name__ == '__main__':
+    unittest.main()